@@ -80,6 +80,7 @@ INSTALLED_APPS = [
 MIDDLEWARE = [
     'django.middleware.security.SecurityMiddleware',
     'whitenoise.middleware.WhiteNoiseMiddleware',
+    'employee.routers.ReplicaPinningMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'corsheaders.middleware.CorsMiddleware',
@@ -153,7 +154,7 @@ CORS_ALLOW_METHODS = [
 
 REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': [
-        'rest_framework.authentication.TokenAuthentication',  # Token-based for Angular
+        'employee.authentication.CachedTokenAuthentication',  # Token-based for Angular, identities cached in memory
         'rest_framework.authentication.SessionAuthentication',  # Still OK for admin/API UI
     ],
     'DEFAULT_PERMISSION_CLASSES': [
@@ -161,6 +162,47 @@ REST_FRAMEWORK = {
     ],
 }
 
+# Seconds a worker keeps site/pump targets and user sites in memory (see employee/targets.py)
+TARGET_CACHE_TTL = int(os.getenv('TARGET_CACHE_TTL', 300))
+
+# Seconds a worker keeps token -> user/employee identities in memory; also how long a revoked token
+# can still authenticate on other workers (see employee/authentication.py)
+AUTH_CACHE_TTL = int(os.getenv('AUTH_CACHE_TTL', 60))
+
+# Run target-change recomputes on a background thread after commit (False runs them inline)
+RECOMPUTE_JOBS_ASYNC = os.getenv('RECOMPUTE_JOBS_ASYNC', 'True') == 'True'
+
+# Seconds without a progress heartbeat after which a running recompute job counts as abandoned and is requeued
+RECOMPUTE_JOB_LEASE = int(os.getenv('RECOMPUTE_JOB_LEASE', 600))
+
+# Summary response cache: per-process memory by default, CACHE_BACKEND=file to share it between workers
+# (invalidation is shared either way: the data versions live in the database, see employee/caching.py).
+# A read replica needs the shared one: it also holds the users pinned to the primary (employee/routers.py)
+if os.getenv('CACHE_BACKEND', 'locmem') == 'file':
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+            'LOCATION': os.getenv('CACHE_LOCATION', str(BASE_DIR / '.cache')),
+            'OPTIONS': {'MAX_ENTRIES': int(os.getenv('CACHE_MAX_ENTRIES', 5000))},
+        }
+    }
+else:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+            'OPTIONS': {'MAX_ENTRIES': int(os.getenv('CACHE_MAX_ENTRIES', 5000))},
+        }
+    }
+
+# Seconds a cached summary response may live (writes invalidate it earlier)
+SUMMARY_CACHE_TTL = int(os.getenv('SUMMARY_CACHE_TTL', 3600))
+
+# Rows fetched per round trip by the streaming CSV/NDJSON exports (see employee/exports.py)
+EXPORT_CHUNK_SIZE = int(os.getenv('EXPORT_CHUNK_SIZE', 2000))
+
+# Covering indexes (Index.include) are PostgreSQL-only; on SQLite they are created as plain composite indexes
+SILENCED_SYSTEM_CHECKS = ['models.W040']
+
 CRISPY_TEMPLATE_PACK = 'bootstrap5'  # or 'bootstrap4' if using Bootstrap 5
 
 STATICFILES_STORAGE = "whitenoise.storage.CompressedManifestStaticFilesStorage"
@@ -187,9 +229,10 @@ WSGI_APPLICATION = 'backend.wsgi.application'
 
 DATABASES = {}
 
-if 'DATABASE_URL' in os.environ:
-    db_url = urlparse(os.getenv('DATABASE_URL'))
-    DATABASES['default'] = {
+
+def postgres_database(url):
+    db_url = urlparse(url)
+    return {
         'ENGINE': 'django.db.backends.postgresql',
         'NAME': db_url.path[1:],  # removes leading '/'
         'USER': db_url.username,
@@ -201,12 +244,43 @@ if 'DATABASE_URL' in os.environ:
             'sslmode': 'require',
         },
     }
+
+
+if 'DATABASE_URL' in os.environ:
+    DATABASES['default'] = postgres_database(os.getenv('DATABASE_URL'))
 else:
     DATABASES['default'] = {
         'ENGINE': 'django.db.backends.sqlite3',
         'NAME': BASE_DIR / 'db.sqlite3',
     }
 
+# Optional read replica for GET traffic (see employee/routers.py); DATABASE_REPLICA_PATH is a
+# second SQLite file for trying it locally (keep it in sync with the primary yourself)
+if 'DATABASE_REPLICA_URL' in os.environ:
+    DATABASES['replica'] = postgres_database(os.getenv('DATABASE_REPLICA_URL'))
+elif 'DATABASE_REPLICA_PATH' in os.environ:
+    DATABASES['replica'] = {
+        'ENGINE': 'django.db.backends.sqlite3',
+        'NAME': os.getenv('DATABASE_REPLICA_PATH'),
+    }
+if 'replica' in DATABASES:
+    # tests run against the primary only
+    DATABASES['replica']['TEST'] = {'MIRROR': 'default'}
+
+# Persistent, health-checked connections (seconds; 0 closes after every request)
+for database in DATABASES.values():
+    database['CONN_MAX_AGE'] = int(os.getenv('DB_CONN_MAX_AGE', 60))
+    database['CONN_HEALTH_CHECKS'] = True
+
+DATABASE_ROUTERS = ['employee.routers.ReplicaRouter']
+
+# Seconds a client that wrote keeps reading from the primary while the replica catches up
+REPLICA_LAG_TOLERANCE = int(os.getenv('REPLICA_LAG_TOLERANCE', 5))
+
+# Password given to imported employees, who must change it at their first login
+# (unset: imported accounts get an unusable password until an admin sets one)
+INITIAL_PASSWORD = os.getenv('INITIAL_PASSWORD', '')
+
 # Password validation
 # https://docs.djangoproject.com/en/5.1/ref/settings/#auth-password-validators
 
@@ -4,12 +4,61 @@
 from django.contrib import admin
 from django.contrib.auth.admin import UserAdmin
 from .models import( Employee, PumpTarget, CustomUser, Captain, ShopTarget, FuelSales, ShopSales,
-                    WeeklyEvaluation, AttendanceRegister, AttendantEvaluation)
+                    WeeklyEvaluation, AttendanceRegister, AttendantEvaluation, RecomputeJob)
 from import_export.admin import ImportExportModelAdmin
+from django import forms
+from django.contrib import messages
+from django.shortcuts import redirect
+from django.template.response import TemplateResponse
+from django.urls import path
+from .importers import import_excel
+
+
+class ExcelImportForm(forms.Form):
+    file = forms.FileField(help_text='.xlsx; the first sheet is read, with column names in the first row')
+    chunk_size = forms.IntegerField(initial=1000, min_value=1, max_value=10000, help_text='Rows written per transaction')
+
+
+class ExcelImportMixin:
+    """'Import from Excel' page streaming an .xlsx upload through employee.importers (for large files use manage.py import_excel)"""
+    excel_import_kind = None
+    change_list_template = 'admin/employee/change_list_excel.html'
+
+    def get_urls(self):
+        info = self.model._meta.app_label, self.model._meta.model_name
+        return [
+            path('import-excel/', self.admin_site.admin_view(self.excel_import_view), name='%s_%s_excel_import' % info),
+        ] + super().get_urls()
+
+    def excel_import_view(self, request):
+        if not self.has_add_permission(request):
+            return redirect('admin:index')
+
+        form = ExcelImportForm(request.POST or None, request.FILES or None)
+        result = None
+        if request.method == 'POST' and form.is_valid():
+            try:
+                result = import_excel(form.cleaned_data['file'], self.excel_import_kind, form.cleaned_data['chunk_size'])
+            except Exception as e:  # unreadable workbook
+                messages.error(request, f'Could not read the file: {e}')
+            else:
+                messages.success(request, f'{result.rows} rows in {result.seconds:.1f}s ({result.rows_per_second:.0f} rows/s): '
+                                          f'{result.created} created, {result.updated} updated, {result.skipped} skipped, '
+                                          f'{result.failed} failed')
+
+        context = {
+            **self.admin_site.each_context(request),
+            'opts': self.model._meta,
+            'title': f'Import {self.model._meta.verbose_name_plural} from Excel',
+            'form': form,
+            'result': result,
+        }
+        return TemplateResponse(request, 'admin/employee/import_excel.html', context)
 
 
 @admin.register(Employee)
-class EmployeeAdmin(ImportExportModelAdmin):
+class EmployeeAdmin(ExcelImportMixin, ImportExportModelAdmin):
+    excel_import_kind = 'employees'
     list_display = ('name', 'job_description', 'status', 'site')
     list_filter = ('status', 'job_description', 'site')
     search_fields = ('name', 'contact')
@@ -41,13 +90,13 @@ class ShopTargetAdmin(admin.ModelAdmin):
     pass
 
 @admin.register(FuelSales)
-class FuelSalesAdmin(ImportExportModelAdmin):
-    pass
+class FuelSalesAdmin(ExcelImportMixin, ImportExportModelAdmin):
+    excel_import_kind = 'fuel-sales'
 
 
 @admin.register(ShopSales)
-class ShopSalesAdmin(ImportExportModelAdmin):
-    pass
+class ShopSalesAdmin(ExcelImportMixin, ImportExportModelAdmin):
+    excel_import_kind = 'shop-sales'
 
 
 @admin.register(WeeklyEvaluation)
@@ -65,6 +114,16 @@ class AttendanceRegisterAdmin(ImportExportModelAdmin):
 class AttendantEvaluationAdmin(ImportExportModelAdmin):
     pass
 
+@admin.register(RecomputeJob)
+class RecomputeJobAdmin(admin.ModelAdmin):
+    list_display = ('id', 'kind', 'site', 'pump', 'status', 'requests', 'processed', 'updated', 'created_at', 'finished_at')
+    list_filter = ('status', 'kind', 'site')
+    readonly_fields = [f.name for f in RecomputeJob._meta.fields]
+
+    def has_add_permission(self, request):
+        return False
+
+
 @admin.register(Captain)
 class CaptainAdmin(admin.ModelAdmin):
     pass
@@ -76,7 +135,7 @@ class CustomUserAdmin(UserAdmin):
 
     # Add other roles to the regular (edit) form
     fieldsets = UserAdmin.fieldsets + (
-        (None, {'fields': ('is_manager', 'is_supervisor', 'is_noRole', 'is_captain')}),
+        (None, {'fields': ('is_manager', 'is_supervisor', 'is_noRole', 'is_captain', 'must_change_password')}),
     )
 
     # Add other roles to the add user form
@@ -4,3 +4,7 @@ from django.apps import AppConfig
 class EmployeeConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'employee'
+
+    def ready(self):
+        from . import signals  # noqa: F401  (registers the model signal receivers)
+        from . import bootstrap, viewset  # noqa: F401  (declare the models their ETags and caches read)
@@ -1,12 +1,32 @@
+from django.contrib.auth.password_validation import validate_password
+from django.core.exceptions import ValidationError
+from rest_framework import status
 from rest_framework.authtoken.views import ObtainAuthToken
 from rest_framework.authtoken.models import Token
 from rest_framework.response import Response
 
+from .bootstrap import bootstrap_payload
+
 class CustomAuthToken(ObtainAuthToken):
     def post(self, request, *args, **kwargs):
         serializer = self.serializer_class(data=request.data, context={'request': request})
         serializer.is_valid(raise_exception=True)
         user = serializer.validated_data['user']
+
+        # imported accounts start with a shared initial password: no token until it is replaced
+        if user.must_change_password:
+            new_password = request.data.get('new_password')
+            if not new_password:
+                return Response({'detail': 'Password change required.', 'password_change_required': True},
+                                status=status.HTTP_403_FORBIDDEN)
+            try:
+                validate_password(new_password, user)
+            except ValidationError as e:
+                return Response({'new_password': e.messages}, status=status.HTTP_400_BAD_REQUEST)
+            user.set_password(new_password)
+            user.must_change_password = False
+            user.save(update_fields=['password', 'must_change_password'])
+
         token, created = Token.objects.get_or_create(user=user)
 
         # Try to get related employee
@@ -18,7 +38,7 @@ class CustomAuthToken(ObtainAuthToken):
         except:
             employee_id = None  # If no employee profile exists
 
-        return Response({
+        data = {
             'token': token.key,
             'mid': employee_id,  # Return employee.id here instead of User.id
             'usid': user.id,
@@ -30,4 +50,10 @@ class CustomAuthToken(ObtainAuthToken):
             'isnoRole': user.is_noRole,
             'job':job
             
-        })
+        }
+
+        # login and first screen in one round trip (see employee/bootstrap.py)
+        if request.data.get('bootstrap') or request.query_params.get('bootstrap'):
+            data['bootstrap'], _ = bootstrap_payload(user)
+
+        return Response(data)
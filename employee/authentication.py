@@ -0,0 +1,72 @@
+"""
+Token authentication served from memory.
+
+DRF's TokenAuthentication reads the token and its user on every request, and
+most views then read ``request.user.employee_profile`` as well.
+CachedTokenAuthentication loads token, user and employee profile together in
+one query on a miss and keeps them in a LocalTTLCache, so a request from a
+known token spends no queries on identity: the user comes back with its
+profile (site, job) attached, the roles are the user's is_* flags, and the
+user's site is primed in employee.targets.user_sites.
+
+Signals (employee/signals.py) clear the cache when a token is deleted or a
+user or employee is saved or deleted. Like the other local caches, other
+worker processes notice after AUTH_CACHE_TTL seconds, which is therefore the
+longest a revoked token or deactivated user can still get through elsewhere.
+"""
+import copy
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS
+from django.utils.translation import gettext_lazy as _
+from rest_framework import exceptions
+from rest_framework.authentication import TokenAuthentication
+
+from .caching import LocalTTLCache
+from .models import Employee
+from .targets import user_sites
+
+
+AUTH_CACHE_TTL = getattr(settings, 'AUTH_CACHE_TTL', 60)
+
+token_identities = LocalTTLCache('token_identities', ttl=AUTH_CACHE_TTL)  # token key -> (token, user, profile or None)
+
+PROFILE_FIELD = Employee._meta.get_field('user')
+
+
+def _attach(user, profile):
+    """Cache the user <-> profile relation both ways (None makes user.employee_profile raise as usual)"""
+    PROFILE_FIELD.remote_field.set_cached_value(user, profile)
+    if profile is not None:
+        PROFILE_FIELD.set_cached_value(profile, user)
+
+
+class CachedTokenAuthentication(TokenAuthentication):
+    """TokenAuthentication with token -> (user, employee profile) cached in memory"""
+
+    def load_identity(self, key):
+        model = self.get_model()
+        try:
+            # from the primary: replica pinning only knows the user once this returns
+            token = model.objects.using(DEFAULT_DB_ALIAS).select_related('user__employee_profile').get(key=key)
+        except model.DoesNotExist:
+            raise exceptions.AuthenticationFailed(_('Invalid token.'))  # not cached: a new token must work at once
+
+        user = token.user
+        profile = getattr(user, 'employee_profile', None)
+        return token, user, profile
+
+    def authenticate_credentials(self, key):
+        token, user, profile = token_identities.get_or_load(key, lambda: self.load_identity(key))
+
+        if not user.is_active:
+            raise exceptions.AuthenticationFailed(_('User inactive or deleted.'))
+
+        # copies, so nothing a view does to request.user leaks into the next request
+        user, profile = copy.copy(user), copy.copy(profile)
+        _attach(user, profile)
+        token = copy.copy(token)
+        token.user = user
+        if profile is not None:
+            user_sites.get_or_load(user.pk, lambda: profile.site)
+        return user, token
@@ -0,0 +1,702 @@
+"""
+Query benchmarks, run with ``manage.py benchmark <scenario>``.
+
+Each scenario builds a synthetic multi-year dataset, times its queries and
+rolls everything back (rows and, where the backend allows it, schema
+changes), so it can be pointed at a development database without leaving
+anything behind. Scenarios register themselves with @scenario and receive
+the parsed command options plus a ``report`` callable for output lines.
+"""
+import math
+import os
+import random
+import statistics
+import tempfile
+import time
+from contextlib import contextmanager
+from datetime import date, timedelta
+from decimal import Decimal
+from importlib import import_module
+from itertools import cycle
+
+from django.apps import apps
+from django.contrib.auth import get_user_model
+from django.db import connection, transaction
+from django.db.migrations import AddIndex
+from django.db.models import Avg, F, Sum
+from django.db.models.functions import ExtractMonth, ExtractQuarter
+
+from .models import (SITE_CHOICES, PUMP_CHOICES, Employee, Captain, FuelSales, ShopSales, PumpTarget, ShopTarget,
+                     WeeklyEvaluation, AttendantEvaluation, AttendanceDate, AttendanceRegister, FuelSalesDaily)
+from .periods import Period
+from .viewsummary import PERFORMANCE_SUMS, _average, combined_performance
+from .rollups import refresh_fuel_rollups, refresh_shop_rollups
+from .scorecards import KINDS, scorecard_summary, refresh_scorecards
+from .leaderboard import METRICS, site_leaderboard
+
+
+SCENARIOS = {}
+
+
+def scenario(name, help=''):
+    """Register a benchmark: func(options, report)"""
+    def decorator(func):
+        func.help = help
+        SCENARIOS[name] = func
+        return func
+    return decorator
+
+
+class _Rollback(Exception):
+    pass
+
+
+@contextmanager
+def rolled_back():
+    """Run the block in one transaction and always roll it back"""
+    try:
+        with transaction.atomic():
+            yield
+            raise _Rollback
+    except _Rollback:
+        pass
+
+
+@contextmanager
+def throwaway_database():
+    """
+    A fresh, committed test database, dropped afterwards. For scenarios whose
+    queries run on other threads, which cannot see a rolled_back() transaction.
+    SQLite gets a temporary file (the default in-memory test database is not
+    a fair stand-in for concurrent readers).
+    """
+    original_name = connection.settings_dict['NAME']
+    test_settings = connection.settings_dict['TEST']
+    original_test_name = test_settings.get('NAME')
+    if connection.vendor == 'sqlite':
+        test_settings['NAME'] = os.path.join(tempfile.mkdtemp(), 'benchmark.sqlite3')
+    connection.creation.create_test_db(verbosity=0, autoclobber=True, serialize=False)
+    try:
+        yield
+    finally:
+        connection.creation.destroy_test_db(original_name, verbosity=0)
+        test_settings['NAME'] = original_test_name
+
+
+def analyze():
+    """Refresh planner statistics after bulk loads"""
+    if connection.vendor in ('sqlite', 'postgresql'):
+        with connection.cursor() as cursor:
+            cursor.execute('ANALYZE')
+
+
+# ===== timing =====
+
+def measure(func, repeat):
+    """Run ``func`` once to warm up, then ``repeat`` times; returns the samples in ms"""
+    func()
+    samples = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        func()
+        samples.append((time.perf_counter() - started) * 1000)
+    return samples
+
+
+def percentile(samples, pct):
+    ordered = sorted(samples)
+    return ordered[max(0, math.ceil(pct / 100 * len(ordered)) - 1)]
+
+
+def summarize(samples):
+    return {'median': statistics.median(samples), 'p95': percentile(samples, 95)}
+
+
+def report_comparison(report, rows, before_label='before', after_label='after'):
+    """Print ``(name, before_samples, after_samples)`` rows as a median/p95 table"""
+    report(f'{"query":<30} {before_label + " med/p95 ms":>22} {after_label + " med/p95 ms":>22} {"speedup":>8}')
+    for name, before, after in rows:
+        before, after = summarize(before), summarize(after)
+        speedup = before['median'] / after['median'] if after['median'] else float('inf')
+        report(f'{name:<30} {before["median"]:>10.2f} / {before["p95"]:<9.2f} '
+               f'{after["median"]:>10.2f} / {after["p95"]:<9.2f} {speedup:>7.1f}x')
+
+
+# ===== dataset =====
+
+class Dataset:
+    """Ids and date range of the rows created by generate_dataset()"""
+
+    def __init__(self, **kwargs):
+        self.__dict__.update(kwargs)
+
+
+def generate_dataset(years=3, attendants=60, seed=1):
+    """
+    Bulk-create ``years`` of daily fuel/shop sales, weekly evaluations and
+    attendance for ``attendants`` employees spread over every site, plus one
+    pump and one shop captain per site. Rollups and scorecards are rebuilt at
+    the end.
+    """
+    rng = random.Random(seed)
+    User = get_user_model()
+    sites = [site for site, _ in SITE_CHOICES]
+    pumps = [pump for pump, _ in PUMP_CHOICES]
+    end = date.today()
+    start = end - timedelta(days=365 * years)
+    days = [start + timedelta(days=n) for n in range((end - start).days + 1)]
+
+    # users: attendants first, then two captains per site
+    users = User.objects.bulk_create(
+        [User(username=f'bench{n:05d}', password='!') for n in range(attendants + 2 * len(sites))]
+    )
+
+    def employee(user, n, site, job):
+        return Employee(user=user, name=f'Bench {n}', gender='M', contact=user.username, dob=date(1990, 1, 1),
+                        location='bench', guarantor_name='bench', guarantor_contact='0', job_description=job,
+                        date_employed=start, training_start=start, training_end=start, site=site,
+                        status='active' if n % 10 else 'inactive')
+
+    jobs = ['customer_champion', 'service_champion']
+    employees = Employee.objects.bulk_create(
+        [employee(user, n, sites[n % len(sites)], jobs[n % 2]) for n, user in enumerate(users[:attendants])]
+        + [employee(user, attendants + n, sites[n // 2], jobs[n % 2]) for n, user in enumerate(users[attendants:])]
+    )
+    captains = Captain.objects.bulk_create(
+        [Captain(user=user, site=sites[n // 2]) for n, user in enumerate(users[attendants:])]
+    )
+    pump_captains = {captain.site: captain for captain in captains[0::2]}
+    shop_captains = {captain.site: captain for captain in captains[1::2]}
+
+    PumpTarget.objects.bulk_create([PumpTarget(site=site, pump=pump, target=3000) for site in sites for pump in pumps])
+    ShopTarget.objects.bulk_create([ShopTarget(site=site, target=800) for site in sites])
+
+    def money(low, high):
+        return Decimal(rng.randint(low * 100, high * 100)) / 100
+
+    fuel, shop = [], []
+    for n, emp in enumerate(employees[:attendants]):
+        for day in days:
+            if emp.job_description == 'customer_champion':
+                fuel.append(FuelSales(user_id=emp.user_id, site=emp.site, date=day, pump=pumps[(n + day.day) % len(pumps)],
+                                      captain=pump_captains[emp.site], pms_sales=money(500, 2500),
+                                      dx_sales=money(100, 800), vp_sales=money(0, 200), performance=money(20, 120)))
+            else:
+                shop.append(ShopSales(user_id=emp.user_id, site=emp.site, date=day, captain=shop_captains[emp.site],
+                                      sales=money(100, 900), performance=money(20, 120)))
+    FuelSales.objects.bulk_create(fuel, batch_size=2000)
+    ShopSales.objects.bulk_create(shop, batch_size=2000)
+
+    weeks = WeeklyEvaluation.objects.bulk_create([WeeklyEvaluation(date=day) for day in days[::7]])
+    AttendantEvaluation.objects.bulk_create([
+        AttendantEvaluation(weekly_evaluation=week, attendant=emp, raw_score=raw, percentage_score=round(raw / 7 * 100, 2))
+        for week in weeks for emp in employees[:attendants] for raw in [rng.randint(3, 7)]
+    ], batch_size=2000)
+
+    register_days = AttendanceDate.objects.bulk_create([AttendanceDate(date=day) for day in days])
+    AttendanceRegister.objects.bulk_create([
+        AttendanceRegister(attendance_date=day, attendant=emp, raw_score=raw, percentage_mark=raw / 2 * 100)
+        for day in register_days for emp in employees[:attendants] for raw in [rng.choice([2, 2, 2, 1, 0])]
+    ], batch_size=2000)
+
+    refresh_fuel_rollups()
+    refresh_shop_rollups()
+    refresh_scorecards()
+    analyze()
+
+    return Dataset(
+        start=start, end=end, sites=sites,
+        fuel_users=[e.user_id for e in employees[:attendants] if e.job_description == 'customer_champion'],
+        shop_users=[e.user_id for e in employees[:attendants] if e.job_description == 'service_champion'],
+        employees=[e.id for e in employees[:attendants]],
+        pump_captains=[c.id for c in pump_captains.values()],
+        shop_captains=[c.id for c in shop_captains.values()],
+        fuel_rows=len(fuel), shop_rows=len(shop),
+    )
+
+
+def describe(data, report):
+    report(f'dataset: {data.start} .. {data.end}, {data.fuel_rows} fuel / {data.shop_rows} shop sales, '
+           f'{len(data.employees)} attendants over {len(data.sites)} sites')
+
+
+# ===== scenarios =====
+
+def _migration_indexes(app_label, migration_name):
+    """(model, index) pairs added by one migration's AddIndex operations"""
+    migration = import_module(f'{app_label}.migrations.{migration_name}').Migration
+    return [
+        (apps.get_model(app_label, operation.model_name), operation.index)
+        for operation in migration.operations if isinstance(operation, AddIndex)
+    ]
+
+
+def index_queries(data):
+    """The summary/list access paths covered by migration 0004, as callables"""
+    quarter = (data.end - timedelta(days=91), data.end)
+    month = (data.end.replace(day=1), data.end)
+    fuel_users, shop_users = cycle(data.fuel_users), cycle(data.shop_users)
+    employees = cycle(data.employees)
+    pump_captains, shop_captains = cycle(data.pump_captains), cycle(data.shop_captains)
+    sites = cycle(data.sites)
+    middle = data.start + (data.end - data.start) / 2
+    fuel_total = Sum(F('pms_sales') + F('dx_sales') + F('vp_sales'))
+
+    return [
+        ('fuel user quarter', lambda: FuelSales.objects.filter(
+            user_id=next(fuel_users), date__range=quarter).aggregate(Avg('performance'), total=fuel_total)),
+        ('fuel captain month', lambda: FuelSales.objects.filter(
+            captain_id=next(pump_captains), date__range=month).aggregate(total=fuel_total)),
+        ('shop captain month', lambda: ShopSales.objects.filter(
+            captain_id=next(shop_captains), date__range=month).aggregate(Sum('sales'))),
+        ('active attendants at site', lambda: list(Employee.objects.filter(
+            site=next(sites), status='active', job_description='customer_champion').values_list('id', flat=True))),
+        ('evaluations quarter', lambda: list(AttendantEvaluation.objects.filter(
+            attendant_id=next(employees), weekly_evaluation__date__range=quarter
+        ).order_by('-weekly_evaluation__date').values_list('percentage_score', flat=True)[:10])),
+        ('attendance quarter', lambda: list(AttendanceRegister.objects.filter(
+            attendant_id=next(employees), attendance_date__date__range=quarter
+        ).order_by('-attendance_date__date').values_list('percentage_mark', flat=True)[:10])),
+        ('fuel list page (keyset)', lambda: list(FuelSales.objects.filter(
+            date__lt=middle).order_by('-date', '-id').values_list('id', flat=True)[:30])),
+        ('shop list page (keyset)', lambda: list(ShopSales.objects.filter(
+            date__lt=middle).order_by('-date', '-id').values_list('id', flat=True)[:30])),
+    ]
+
+
+@scenario('indexes', 'Summary and list queries with and without the 0004 composite indexes')
+def benchmark_indexes(options, report):
+    if not connection.features.can_rollback_ddl:
+        report(f'{connection.vendor} cannot roll back DDL; run this scenario on SQLite or PostgreSQL')
+        return
+
+    indexes = _migration_indexes('employee', '0004_sales_access_path_indexes')
+
+    with rolled_back():
+        data = generate_dataset(options['years'], options['attendants'], options['seed'])
+        describe(data, report)
+        queries = index_queries(data)
+        after = [measure(query, options['repeat']) for _, query in queries]
+
+        with connection.cursor() as cursor:
+            for _, index in indexes:
+                cursor.execute(f'DROP INDEX {connection.ops.quote_name(index.name)}')
+        analyze()
+        before = [measure(query, options['repeat']) for _, query in queries]
+
+    report_comparison(report, [(name, b, a) for (name, _), b, a in zip(queries, before, after)],
+                      before_label='no index', after_label='indexed')
+
+
+def period_queries(data):
+    """(name, extraction-based query, range-based query) pairs over the same slices"""
+    year = data.end.year - 1
+    selected_year = Period.year(year)
+    quarter, month = Period.quarter(year, 2), Period.month(year, 6)
+    fuel_users, sites = cycle(data.fuel_users), cycle(data.sites)
+    fuel_total = Sum(F('pms_sales') + F('dx_sales') + F('vp_sales'))
+
+    def user_quarters_extract():
+        user = next(fuel_users)
+        return [
+            FuelSales.objects.filter(user_id=user, date__year=year, date__month__gte=3 * q - 2,
+                                     date__month__lte=3 * q).aggregate(Avg('performance'))
+            for q in range(1, 5)
+        ]
+
+    def user_quarters_range():
+        return list(FuelSales.objects.filter(selected_year.q('date'), user_id=next(fuel_users))
+                    .values(quarter=ExtractQuarter('date'))
+                    .annotate(Avg('performance')).order_by())
+
+    return [
+        ('user quarter avg (raw)',
+         lambda: FuelSales.objects.filter(user_id=next(fuel_users), date__year=year, date__month__gte=4,
+                                          date__month__lte=6).aggregate(Avg('performance')),
+         lambda: FuelSales.objects.filter(quarter.q('date'), user_id=next(fuel_users)).aggregate(Avg('performance'))),
+        ('user year by quarter (raw)', user_quarters_extract, user_quarters_range),
+        ('user year by month (rollup)',
+         lambda: list(FuelSalesDaily.objects.filter(user_id=next(fuel_users), day__year=year)
+                      .values('day__month').annotate(total=fuel_total).order_by('day__month')),
+         lambda: list(FuelSalesDaily.objects.filter(selected_year.q('day'), user_id=next(fuel_users))
+                      .values(month=ExtractMonth('day'))
+                      .annotate(total=fuel_total).order_by('month'))),
+        ('site year by month (rollup)',
+         lambda: list(FuelSalesDaily.objects.filter(site=next(sites), day__year=year)
+                      .values('day__month').annotate(total=fuel_total).order_by()),
+         lambda: list(FuelSalesDaily.objects.filter(selected_year.q('day'), site=next(sites))
+                      .values(month=ExtractMonth('day'))
+                      .annotate(total=fuel_total).order_by())),
+        ('site month by captain (rollup)',
+         lambda: list(FuelSalesDaily.objects.filter(site=next(sites), day__year=year, day__month=6)
+                      .values('captain').annotate(total=fuel_total).order_by()),
+         lambda: list(FuelSalesDaily.objects.filter(month.q('day'), site=next(sites))
+                      .values('captain').annotate(total=fuel_total).order_by())),
+        ('all fuel in a month (raw)',
+         lambda: FuelSales.objects.filter(date__year=year, date__month=6).aggregate(total=fuel_total),
+         lambda: FuelSales.objects.filter(month.q('date')).aggregate(total=fuel_total)),
+    ]
+
+
+@scenario('periods', 'date__year/date__month extraction filters vs Period range predicates')
+def benchmark_periods(options, report):
+    with rolled_back():
+        data = generate_dataset(options['years'], options['attendants'], options['seed'])
+        describe(data, report)
+        rows = []
+        for name, extract, ranged in period_queries(data):
+            rows.append((name, measure(extract, options['repeat']), measure(ranged, options['repeat'])))
+
+    report_comparison(report, rows, before_label='extract', after_label='range')
+
+
+def _combined_reference(user_id, year, last_n_days):
+    """CombinedPerformanceView as it was before the one-fetch rewrite: one query per series"""
+    user_days = FuelSalesDaily.objects.filter(user_id=user_id)
+    selected_year = Period.year(year)
+    year_days = user_days.filter(selected_year.q('day'))
+    avg_performance = _average(user_days.aggregate(**PERFORMANCE_SUMS))
+
+    quarter_periods = selected_year.buckets('quarter')
+    by_quarter = {
+        item['quarter'] - 1: _average(item)
+        for item in year_days.values(quarter=ExtractQuarter('day')).annotate(**PERFORMANCE_SUMS).order_by()
+    }
+    quarters = [{'quarter': quarter.label, 'average': round(float(by_quarter.get(index, 0)), 2)}
+                for index, quarter in enumerate(quarter_periods)]
+
+    month_periods = selected_year.buckets('month')
+    monthly_data = [
+        {'month': month_periods[item['month'] - 1].label, 'performance': round(float(_average(item)), 2)}
+        for item in year_days.values(month=ExtractMonth('day')).annotate(
+            **PERFORMANCE_SUMS).order_by('month')
+    ]
+
+    since = Period.rolling_days(last_n_days).start
+    daily_data = [
+        {'date': item['day'].strftime('%Y-%m-%d'), 'day': item['day'].strftime('%a'),
+         'performance': round(float(_average(item)), 2)}
+        for item in year_days.filter(day__gte=since).values('day').annotate(**PERFORMANCE_SUMS).order_by('day')
+    ]
+
+    evaluations = AttendantEvaluation.objects.filter(attendant=user_id).order_by('-weekly_evaluation__date')[:10]
+    average_score = round(
+        sum(e.percentage_score for e in evaluations) / evaluations.count(), 2
+    ) if evaluations.exists() else 0.0
+    performance_history = [
+        {'date': e.weekly_evaluation.date.strftime('%Y-%m-%d'), 'performance': e.percentage_score}
+        for e in evaluations
+    ]
+
+    return {
+        'average_performance': round(float(avg_performance), 2),
+        'average_score': average_score,
+        'quarterly_performance': quarters,
+        'monthly_performance': monthly_data,
+        'daily_performance': daily_data,
+        'performance_history': performance_history,
+        'meta': {'year': year, 'last_n_days': last_n_days, 'current_quarter': Period.of('quarter').label},
+    }
+
+
+@scenario('combined', 'CombinedPerformanceView: per-series queries vs one fetch + NumPy')
+def benchmark_combined(options, report):
+    with rolled_back():
+        data = generate_dataset(options['years'], options['attendants'], options['seed'])
+        describe(data, report)
+
+        # same payload for every user / year / window (generated_at aside)
+        cases = [(user, year, window) for user in data.fuel_users[:5] + data.shop_users[:1]
+                 for year in (data.end.year, data.end.year - 1) for window in (30, 400)]
+        for case in cases:
+            current = combined_performance(*case)
+            current['meta'].pop('generated_at')
+            if current != _combined_reference(*case):
+                report(f'payload mismatch for user/year/window {case}')
+                return
+        report(f'payloads identical for {len(cases)} user/year/window combinations')
+
+        users = cycle(data.fuel_users)
+        year = data.end.year
+        rows = [(f'user year, last {window} days',
+                 measure(lambda: _combined_reference(next(users), year, window), options['repeat']),
+                 measure(lambda: combined_performance(next(users), year, window), options['repeat']))
+                for window in (30, 365)]
+
+    report_comparison(report, rows, before_label='per-query', after_label='one fetch')
+
+
+def _scorecard_reference(kind, employee_id, day):
+    """Evaluation/AttendanceSummaryView as they were before the scorecards: every row of the quarter"""
+    kind = KINDS[kind]
+    date_field = f'{kind.parent_field}__date'
+    rows = kind.model.objects.filter(
+        Period.of('quarter', day).q(date_field), attendant_id=employee_id,
+    ).select_related(kind.parent_field).order_by(f'-{date_field}')
+
+    if rows.exists():
+        average = round(sum(getattr(row, kind.score_field) for row in rows) / rows.count(), 2)
+    else:
+        average = 0.0
+    history = [{'date': getattr(row, kind.parent_field).date.isoformat(), 'score': getattr(row, kind.score_field)}
+               for row in rows[:10]]
+    return {'qtr_score': average, 'score_history': history}
+
+
+@scenario('scorecards', 'Evaluation/attendance summaries: quarter scan vs QuarterlyScorecard lookup')
+def benchmark_scorecards(options, report):
+    with rolled_back():
+        data = generate_dataset(options['years'], options['attendants'], options['seed'])
+        describe(data, report)
+
+        quarter_days = [Period.of('quarter', data.end).start - timedelta(days=1 + 91 * n) for n in range(4)]
+        cases = [(kind, employee, day) for kind in KINDS for employee in data.employees
+                 for day in [data.end, *quarter_days]]
+        for case in cases:
+            if scorecard_summary(*case) != _scorecard_reference(*case):
+                report(f'summary mismatch for kind/employee/day {case}')
+                return
+        report(f'summaries identical for {len(cases)} kind/employee/quarter combinations')
+
+        employees = cycle(data.employees)
+        rows = [(f'{kind} summary',
+                 measure(lambda: _scorecard_reference(kind, next(employees), data.end), options['repeat']),
+                 measure(lambda: scorecard_summary(kind, next(employees), data.end), options['repeat']))
+                for kind in KINDS]
+
+        # write side: one attendance mark, including its scorecard update
+        register_day = AttendanceDate.objects.create(date=data.end + timedelta(days=1))
+        write = summarize(measure(lambda: AttendanceRegister.objects.create(
+            attendance_date=register_day, attendant_id=next(employees), raw_score=2), options['repeat']))
+
+    report_comparison(report, rows, before_label='quarter scan', after_label='scorecard')
+    report(f'attendance mark insert incl. scorecard update: {write["median"]:.2f} / {write["p95"]:.2f} ms med/p95')
+
+
+def _leaderboard_reference(site, period, order_by, limit):
+    """The leaderboard the way managers built it: four aggregates per attendant, ranked in Python"""
+    attendants = Employee.objects.filter(
+        site=site, status='active', job_description__in=['customer_champion', 'service_champion'],
+    ).order_by('name', 'id')
+
+    scores = {}
+    for emp in attendants:
+        scores[emp.id] = {
+            'fuel': FuelSales.objects.filter(period.q('date'), site=site, user_id=emp.user_id).aggregate(
+                avg=Avg('performance'))['avg'],
+            'shop': ShopSales.objects.filter(period.q('date'), site=site, user_id=emp.user_id).aggregate(
+                avg=Avg('performance'))['avg'],
+            'evaluation': AttendantEvaluation.objects.filter(period.q('weekly_evaluation__date'), attendant=emp).aggregate(
+                avg=Avg('percentage_score'))['avg'],
+            'attendance': AttendanceRegister.objects.filter(period.q('attendance_date__date'), attendant=emp).aggregate(
+                avg=Avg('percentage_mark'))['avg'],
+        }
+
+    def ranked(metric, value):
+        if value is None:
+            return {'score': None, 'rank': None, 'percent_rank': None}
+        others = [s[metric] for s in scores.values() if s[metric] is not None]
+        rank = 1 + sum(other > value for other in others)
+        return {'score': round(float(value), 2), 'rank': rank,
+                'percent_rank': round((rank - 1) / (len(others) - 1), 4) if len(others) > 1 else 0.0}
+
+    results = [
+        {'employee_id': emp.id, 'user_id': emp.user_id, 'name': emp.name, 'job_description': emp.job_description,
+         **{metric: ranked(metric, scores[emp.id][metric]) for metric in METRICS}}
+        for emp in attendants
+    ]
+    results.sort(key=lambda entry: (entry[order_by]['rank'] is None, entry[order_by]['rank'] or 0))
+    return results[:limit]
+
+
+def _same_leaderboard(results, reference):
+    """Same attendants, order and ranks; scores may differ by a cent (SQL float vs Decimal averages)"""
+    def scores(rows):
+        return [row[metric]['score'] for row in rows for metric in METRICS]
+
+    def without_scores(rows):
+        return [{key: ({**value, 'score': None} if key in METRICS else value) for key, value in row.items()} for row in rows]
+
+    return without_scores(results) == without_scores(reference) and all(
+        (a is None) == (b is None) and (a is None or abs(a - b) <= 0.01) for a, b in zip(scores(results), scores(reference))
+    )
+
+
+@scenario('leaderboard', 'Site leaderboard: per-attendant aggregates vs one windowed query')
+def benchmark_leaderboard(options, report):
+    with rolled_back():
+        data = generate_dataset(options['years'], options['attendants'], options['seed'])
+        describe(data, report)
+
+        periods = [Period.of('month', data.end), Period.of('quarter', data.end), Period.of('year', data.end)]
+        cases = [(site, period, metric) for site in data.sites for period in periods for metric in METRICS]
+        for site, period, metric in cases:
+            if not _same_leaderboard(site_leaderboard(site, period, metric, 10)['results'],
+                                     _leaderboard_reference(site, period, metric, 10)):
+                report(f'leaderboard mismatch for site/period/metric {site} {period.label} {metric}')
+                return
+        report(f'rankings match for {len(cases)} site/period/metric combinations (scores within a cent)')
+
+        sites = cycle(data.sites)
+        rows = [(f'{period.label} leaderboard',
+                 measure(lambda: _leaderboard_reference(next(sites), period, 'fuel', 10), options['repeat']),
+                 measure(lambda: site_leaderboard(next(sites), period, 'fuel', 10), options['repeat']))
+                for period in periods]
+
+    report_comparison(report, rows, before_label='per attendant', after_label='one query')
+
+
+def _traced(func):
+    """(result, peak traced memory in MB) of one call"""
+    import tracemalloc
+
+    tracemalloc.start()
+    try:
+        result = func()
+        return result, tracemalloc.get_traced_memory()[1] / 2 ** 20
+    finally:
+        tracemalloc.stop()
+
+
+@scenario('exports', 'Fuel sales CSV export: import-export (tablib) vs streaming values_list().iterator()')
+def benchmark_exports(options, report):
+    from import_export.resources import modelresource_factory
+    from .exports import EXPORTS, csv_lines, export_rows
+
+    export = EXPORTS['fuel-sales']
+    headers = [header for header, _ in export.columns]
+    chunk_size = 2000
+
+    def tablib_csv(queryset):
+        return modelresource_factory(FuelSales)().export(queryset=queryset).csv
+
+    def streamed_csv(queryset):
+        return sum(len(chunk) for chunk in csv_lines(headers, export_rows(export, queryset, chunk_size), chunk_size))
+
+    def first_rows(queryset):
+        # the header line goes out before the query runs; time the first chunk of rows
+        lines = csv_lines(headers, export_rows(export, queryset, chunk_size), chunk_size)
+        next(lines)
+        return next(lines, '')
+
+    with rolled_back():
+        data = generate_dataset(options['years'], options['attendants'], options['seed'])
+        describe(data, report)
+        repeat = min(options['repeat'], 3)  # whole-table exports are slow
+
+        report(f'{"window":<12} {"rows":>7} {"tablib s":>9} {"peak MB":>8} {"streamed s":>11} {"peak MB":>8} {"first rows ms":>14}')
+        for label, days in (('1 month', 30), ('1 year', 365), ('everything', None)):
+            queryset = FuelSales.objects.all()
+            if days:
+                queryset = queryset.filter(date__gt=data.end - timedelta(days=days))
+            rows = queryset.count()
+
+            tablib_time = summarize(measure(lambda: tablib_csv(queryset), repeat))['median'] / 1000
+            streamed_time = summarize(measure(lambda: streamed_csv(queryset), repeat))['median'] / 1000
+            first_ms = summarize(measure(lambda: first_rows(queryset), repeat))['median']
+            _, tablib_peak = _traced(lambda: tablib_csv(queryset))
+            _, streamed_peak = _traced(lambda: streamed_csv(queryset))
+            report(f'{label:<12} {rows:>7} {tablib_time:>9.2f} {tablib_peak:>8.1f} {streamed_time:>11.2f} '
+                   f'{streamed_peak:>8.1f} {first_ms:>14.1f}')
+
+
+def _load_json_reference(records, model, update_existing=False):
+    """
+    The row-at-a-time load_json_to_model this replaced: field names rebuilt and full_clean() (with its
+    uniqueness and foreign key queries) per record, one update_or_create per record when updating.
+    Foreign keys are passed as ``<field>_id``, which the old loader could not take by id.
+    """
+    from .recompute import recompute_imported
+    from .rollups import record_bulk_created
+    from .targets import stamp_sites
+
+    success_count, instances = 0, []
+    with transaction.atomic():
+        for record in records:
+            model_fields = {f.name for f in model._meta.get_fields()} | {f.attname for f in model._meta.concrete_fields}
+            mapped_data = {field: value for field, value in record.items() if field in model_fields}
+            if update_existing and 'id' in mapped_data:
+                model.objects.update_or_create(id=mapped_data['id'], defaults=mapped_data)
+            else:
+                instance = model(**mapped_data)
+                instance.full_clean()
+                instances.append(instance)
+            success_count += 1
+
+        if not update_existing and instances:
+            if model in (FuelSales, ShopSales):
+                stamp_sites(instances)
+            model.objects.bulk_create(instances)
+            record_bulk_created(model, instances)
+            recompute_imported(model, instances)
+    return success_count
+
+
+@scenario('loader', 'load_json_to_model: row-at-a-time reference vs chunked batch validation and upsert (rows/s)')
+def benchmark_loader(options, report):
+    import json
+    from .functions import load_json_to_model
+
+    def timed(func):
+        # each load starts from the same data
+        queries = []
+
+        def count(execute, sql, params, many, context):
+            queries.append(1)
+            return execute(sql, params, many, context)
+
+        with rolled_back(), connection.execute_wrapper(count):
+            started = time.perf_counter()
+            loaded = func()
+            return loaded, time.perf_counter() - started, len(queries)
+
+    with rolled_back():
+        data = generate_dataset(options['years'], options['attendants'], options['seed'])
+        describe(data, report)
+        rng = random.Random(options['seed'])
+        folder = tempfile.mkdtemp()
+
+        def new_days(users):
+            for n in cycle(range(1, 10 ** 6)):
+                for user in users:
+                    yield user, (data.end + timedelta(days=n)).isoformat()
+
+        def fuel_records(size):
+            pairs = new_days(data.fuel_users)
+            return [{'user_id': user, 'captain_id': data.pump_captains[0], 'date': day, 'pump': 'pump1',
+                     'pms_sales': rng.randint(500, 2500), 'dx_sales': rng.randint(100, 800), 'vp_sales': 0}
+                    for (user, day), _ in zip(pairs, range(size))]
+
+        def shop_records(size):
+            pairs = new_days(data.shop_users)
+            return [{'user_id': user, 'captain_id': data.shop_captains[0], 'date': day, 'sales': rng.randint(100, 900)}
+                    for (user, day), _ in zip(pairs, range(size))]
+
+        def shop_updates(size):
+            ids = ShopSales.objects.order_by('-id').values_list('id', flat=True)[:size]
+            return [{'id': pk, 'sales': rng.randint(100, 900)} for pk in ids]
+
+        report(f'{"load":<22} {"rows":>6} {"reference s":>12} {"rows/s":>8} {"queries":>8} '
+               f'{"batch s":>8} {"rows/s":>8} {"queries":>8} {"speedup":>8}')
+        for label, model, make, update_existing in (
+            ('fuel sales insert', FuelSales, fuel_records, False),
+            ('shop sales insert', ShopSales, shop_records, False),
+            ('shop sales upsert', ShopSales, shop_updates, True),
+        ):
+            for size in (1000, 10000):
+                records = make(size)
+                path = os.path.join(folder, f'{model.__name__}-{size}.json')
+                with open(path, 'w') as f:
+                    json.dump(records, f)
+
+                def reference():
+                    with open(path) as f:
+                        return _load_json_reference(json.load(f), model, update_existing)
+
+                ref_rows, ref_time, ref_queries = timed(reference)
+                (rows, failed, errors), batch_time, batch_queries = timed(
+                    lambda: load_json_to_model(path, model, update_existing=update_existing))
+                if failed or rows != ref_rows:
+                    report(f'  ⚠️ {label}: {failed} failed, first error: {errors[0]["error"] if errors else None}')
+                report(f'{label:<22} {len(records):>6} {ref_time:>12.2f} {ref_rows / ref_time:>8.0f} {ref_queries:>8} '
+                       f'{batch_time:>8.2f} {rows / batch_time:>8.0f} {batch_queries:>8} {ref_time / batch_time:>7.1f}x')
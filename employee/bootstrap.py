@@ -0,0 +1,88 @@
+"""
+Login bootstrap: everything the app's first screen needs in one response.
+
+After logging in the Angular app used to call employees/me, captains-pump,
+captains-shop, active-attendants and the site sales summaries one after the
+other. GET /api/bootstrap/ (or POST /api/token-auth/ with ``bootstrap``
+set) returns all of it at once:
+
+- user: id, username and role flags (as in the token response)
+- profile: the employees/me payload (None without an employee profile)
+- captains_pump, captains_shop, active_attendants: the reference lists
+- fuel_sales_summary, shop_sales_summary: the site dashboards
+
+The identity comes from the request's user (no queries with
+CachedTokenAuthentication). The rest is built from a fixed number of queries
+and cached per site under the same write-driven scope versions as the
+summary views, so it is recomputed only after the site's sales, captains or
+employees change.
+"""
+from django.core.cache import cache
+from django.utils.timezone import now
+from rest_framework.permissions import IsAuthenticated
+from rest_framework.response import Response
+from rest_framework.views import APIView
+
+from .caching import ALL_SCOPES, _digest, model_scope, scope_versions, store_summary, watch_models
+from .models import Captain, Employee
+from .serializers import CaptainSerializer, EmployeeSerializer
+from .viewset import ActiveAttendantViewSet, CaptainViewSet, CaptainViewSetShop
+from .viewsummary import fuel_sales_summary, shop_sales_summary
+
+
+watch_models(Captain, Employee)
+
+
+def _site_data(site, year, month):
+    # same querysets as the list endpoints, so the payload matches what the app fetched separately
+    return {
+        'captains_pump': CaptainSerializer(CaptainViewSet.queryset.all(), many=True).data,
+        'captains_shop': CaptainSerializer(CaptainViewSetShop.queryset.all(), many=True).data,
+        'active_attendants': EmployeeSerializer(ActiveAttendantViewSet.queryset.all(), many=True).data,
+        'fuel_sales_summary': fuel_sales_summary(site, year, month) if site else None,
+        'shop_sales_summary': shop_sales_summary(site, year, month) if site else None,
+    }
+
+
+def cached_site_data(site, year, month):
+    """(site data, cache hit) for one site, cached until its sales, captains or employees change"""
+    scopes = [ALL_SCOPES, f'fuel:site:{site}', f'shop:site:{site}', model_scope(Captain), model_scope(Employee)]
+    key = 'bootstrap:site:' + _digest(site, year, month, now().date().isoformat(), scopes, scope_versions(scopes))
+    data = cache.get(key)
+    if data is not None:
+        return data, True
+    data = _site_data(site, year, month)
+    store_summary(key, data)
+    return data, False
+
+
+def bootstrap_payload(user, year=None):
+    """(payload, cache hit) for ``user``'s first screen"""
+    profile = getattr(user, 'employee_profile', None)
+    site = profile.site if profile else ''
+    today = now().date()
+    site_data, hit = cached_site_data(site, year or today.year, today.month)
+    return {
+        'user': {
+            'usid': user.id,
+            'username': user.username,
+            'isCaptain': user.is_captain,
+            'isManager': user.is_manager,
+            'isSupervisor': user.is_supervisor,
+            'isnoRole': user.is_noRole,
+        },
+        'profile': EmployeeSerializer(profile).data if profile else None,
+        'site': site or None,
+        **site_data,
+    }, hit
+
+
+class BootstrapView(APIView):
+    permission_classes = [IsAuthenticated]
+
+    def get(self, request):
+        year = int(request.query_params.get('year', now().year))
+        payload, hit = bootstrap_payload(request.user, year)
+        response = Response(payload)
+        response['X-Cache'] = 'HIT' if hit else 'MISS'
+        return response
@@ -0,0 +1,210 @@
+"""
+Batch writers for sales submitted many rows at a time.
+
+Entries are validated without touching the database, then users, captains
+and targets are each resolved with a single query for the whole batch.
+Performance is computed in one vectorised pass and the valid rows are
+written together. Invalid entries come back as per-item errors and do not
+stop the valid ones.
+"""
+from django.contrib.auth import get_user_model
+from django.db import transaction
+from rest_framework.exceptions import ValidationError
+
+from .models import Captain, FuelSales, PumpTarget, ShopSales, ShopTarget
+from .rollups import lock_sales_users, record_fuel_sales, record_shop_sales
+from .serializers import FuelSalesBulkItemSerializer, ShopSalesBulkItemSerializer
+from .targets import performance_array
+
+
+MAX_BULK_ENTRIES = 1000
+
+NOT_ENTERABLE = 'You may only enter your own sales, or sales for the users at the site you captain.'
+
+
+def _validate(entries, serializer_class):
+    """(index, validated_data) for valid entries plus an error list for the rest"""
+    # one serializer for the batch: building its fields again for every entry costs more than validating it
+    serializer = serializer_class()
+    valid, errors = [], []
+    for index, entry in enumerate(entries):
+        try:
+            valid.append((index, serializer.run_validation(entry)))
+        except ValidationError as e:
+            errors.append({'index': index, 'errors': e.detail})
+    return valid, errors
+
+
+def _user_sites(user_ids):
+    """{user_id: site} for users with an employee profile (one query)"""
+    User = get_user_model()
+    return dict(
+        User.objects.filter(id__in=user_ids, employee_profile__isnull=False)
+        .values_list('id', 'employee_profile__site')
+    )
+
+
+def _enterable(submitter, sites):
+    """
+    Users in ``sites`` ({user_id: site}) the submitter may enter sales for.
+
+    Staff may enter for anyone and a captain for the users at their site.
+    Everyone else may enter only their own sales. A None submitter (imports)
+    is trusted.
+    """
+    if submitter is None or submitter.is_staff:
+        return set(sites)
+    others = {user_id: site for user_id, site in sites.items() if user_id != submitter.id}
+    captained = set(Captain.objects.filter(user=submitter).values_list('site', flat=True)) if others else ()
+    return {submitter.id} | {user_id for user_id, site in others.items() if site in captained}
+
+
+def create_fuel_sales(entries, default_user):
+    """
+    Validate and insert a batch of fuel sales.
+
+    Args:
+        entries (list): dicts with captain, date, pump, pms/dx/vp_sales and optionally user
+        default_user: the submitter, recorded for entries without a ``user``; a ``user`` other than
+            themselves needs staff or the captaincy of that user's site (None: imports, ``user`` required)
+
+    Returns:
+        tuple: (created FuelSales list with the request index of each, error list)
+    """
+    valid, errors = _validate(entries, FuelSalesBulkItemSerializer)
+    default_id = default_user.id if default_user else None
+
+    user_ids = {data.get('user', default_id) for _, data in valid}
+    sites = _user_sites(user_ids)
+    enterable = _enterable(default_user, sites)
+    captains = set(Captain.objects.filter(id__in={data['captain'] for _, data in valid}).values_list('id', flat=True))
+
+    targets = {}
+    for site, pump, target in PumpTarget.objects.filter(site__in=set(sites.values())).order_by('-id').values_list('site', 'pump', 'target'):
+        targets[(site, pump)] = target  # oldest row wins, as in employee.targets
+
+    rows, indexes = [], []
+    for index, data in valid:
+        user_id = data.get('user', default_id)
+        if user_id not in sites:
+            errors.append({'index': index, 'errors': {'user': ['User does not exist or has no employee profile.']}})
+            continue
+        if user_id not in enterable:
+            errors.append({'index': index, 'errors': {'user': [NOT_ENTERABLE]}})
+            continue
+        if data['captain'] not in captains:
+            errors.append({'index': index, 'errors': {'captain': ['Captain does not exist.']}})
+            continue
+        rows.append(FuelSales(
+            user_id=user_id,
+            site=sites[user_id],
+            captain_id=data['captain'],
+            date=data['date'],
+            pump=data['pump'],
+            pms_sales=data['pms_sales'],
+            dx_sales=data['dx_sales'],
+            vp_sales=data['vp_sales'],
+        ))
+        indexes.append(index)
+
+    performances = performance_array(
+        [row.total_sales for row in rows],
+        [targets.get((row.site, row.pump)) for row in rows],
+    )
+    for row, performance in zip(rows, performances):
+        row.performance = performance
+
+    if rows:
+        with transaction.atomic():
+            FuelSales.objects.bulk_create(rows)
+            record_fuel_sales(rows)
+
+    errors.sort(key=lambda error: error['index'])
+    return list(zip(indexes, rows)), errors
+
+
+def upsert_shop_sales(entries, default_user):
+    """
+    Insert or update a batch of shop sales on their (user, date) key.
+
+    New rows are stamped with the user's current site. Updated rows keep the
+    site they were entered at, and their performance is measured against
+    that site's target.
+
+    Args:
+        entries (list): dicts with captain, date, sales and optionally user
+        default_user: the submitter, as for create_fuel_sales
+
+    Returns:
+        tuple: (inserted count, updated count, error list)
+    """
+    valid, errors = _validate(entries, ShopSalesBulkItemSerializer)
+    default_id = default_user.id if default_user else None
+
+    # one row per (user, date): a later entry replaces an earlier one in the same batch
+    latest = {}
+    for index, data in valid:
+        key = (data.get('user', default_id), data['date'])
+        if key in latest:
+            errors.append({'index': latest[key][0], 'errors': {
+                'non_field_errors': [f'Replaced by entry {index} for the same user and date.']
+            }})
+        latest[key] = (index, data)
+
+    sites = _user_sites({user_id for user_id, _ in latest})
+    enterable = _enterable(default_user, sites)
+    captains = set(Captain.objects.filter(id__in={data['captain'] for _, data in latest.values()}).values_list('id', flat=True))
+
+    rows = []
+    for (user_id, _), (index, data) in latest.items():
+        if user_id not in sites:
+            errors.append({'index': index, 'errors': {'user': ['User does not exist or has no employee profile.']}})
+            continue
+        if user_id not in enterable:
+            errors.append({'index': index, 'errors': {'user': [NOT_ENTERABLE]}})
+            continue
+        if data['captain'] not in captains:
+            errors.append({'index': index, 'errors': {'captain': ['Captain does not exist.']}})
+            continue
+        rows.append(ShopSales(user_id=user_id, site=sites[user_id], captain_id=data['captain'],
+                              date=data['date'], sales=data['sales']))
+
+    updated = 0
+    if rows:
+        keys = {(row.user_id, row.date) for row in rows}
+        with transaction.atomic():
+            # new sales have no row to lock yet, so lock their users: a concurrent insert waits for this commit
+            lock_sales_users({user_id for user_id, _ in keys})
+            # current versions of the rows being replaced (one query), for their sites, the counts and the rollups
+            previous = [
+                sale for sale in ShopSales.objects.select_for_update().filter(
+                    user_id__in={user_id for user_id, _ in keys},
+                    date__in={day for _, day in keys},
+                )
+                if (sale.user_id, sale.date) in keys
+            ]
+            # a corrected row keeps the site it was entered at, even if the user has transferred since
+            entered_at = {(sale.user_id, sale.date): sale.site for sale in previous}
+            for row in rows:
+                row.site = entered_at.get((row.user_id, row.date), row.site)
+
+            # unstamped rows are measured against the user's current site, as in ShopSales.calculate_performance
+            target_sites = [row.site or sites[row.user_id] for row in rows]
+            targets = {}
+            for site, target in ShopTarget.objects.filter(site__in=set(target_sites)).order_by('-id').values_list('site', 'target'):
+                targets[site] = target  # oldest row wins, as in employee.targets
+            performances = performance_array([row.sales for row in rows], [targets.get(site) for site in target_sites])
+            for row, performance in zip(rows, performances):
+                row.performance = performance
+
+            ShopSales.objects.bulk_create(
+                rows,
+                update_conflicts=True,
+                unique_fields=['user', 'date'],
+                update_fields=['captain', 'sales', 'performance'],
+            )
+            record_shop_sales(rows, removed=previous)
+        updated = len(previous)
+
+    errors.sort(key=lambda error: error['index'])
+    return len(rows) - updated, updated, errors
@@ -0,0 +1,332 @@
+"""
+Caching helpers.
+
+LocalTTLCache: in-process caches for hot lookups (targets, user sites). Each
+keeps entries for ``ttl`` seconds and carries a version number: invalidate()
+bumps the version so every entry loaded before the change is ignored. Other
+worker processes pick the change up once their own entries expire, so the
+TTL is the upper bound on cross-process staleness.
+
+cached_response: summary responses stored in Django's cache (local-memory
+or file based, see CACHES). Each key embeds the current version of the data
+scopes the view reads (e.g. ``fuel:site:ofankor``, ``evaluation:employee:12``).
+Model signals bump those versions on write, so a change makes exactly the
+affected entries unreachable instead of flushing everything. The versions
+live in the ScopeVersion table on the primary database, not in the cache,
+so a write from any worker, management command or background job
+invalidates the entries of every process (one indexed read per lookup).
+
+The same versions double as ETags: cached summaries and ConditionalListMixin
+list endpoints answer ``If-None-Match`` with 304 Not Modified after reading
+only the versions.
+"""
+import functools
+import hashlib
+import threading
+import time
+from collections import OrderedDict, defaultdict
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import DEFAULT_DB_ALIAS, transaction
+from django.db.models import F, Value
+from django.db.models.functions import Greatest
+from django.utils.http import parse_etags
+from django.utils.timezone import now
+
+from .models import ScopeVersion
+from .routers import pin_if_recent
+
+
+class LocalTTLCache:
+    """Thread-safe in-process cache with TTL, version invalidation and hit/miss counters"""
+
+    registry = {}
+
+    def __init__(self, name, ttl=None):
+        self.name = name
+        self._ttl = ttl
+        self._data = {}
+        self._lock = threading.Lock()
+        self.version = 0
+        self.hits = 0
+        self.misses = 0
+        LocalTTLCache.registry[name] = self
+
+    @property
+    def ttl(self):
+        if self._ttl is not None:
+            return self._ttl
+        return getattr(settings, 'LOCAL_CACHE_TTL', 300)
+
+    def get_or_load(self, key, loader):
+        """Return the cached value for ``key``, calling ``loader()`` on a miss"""
+        now = time.monotonic()
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is not None and entry[0] == self.version and entry[1] > now:
+                self.hits += 1
+                return entry[2]
+            self.misses += 1
+            version = self.version
+
+        value = loader()
+
+        with self._lock:
+            # don't store a value loaded before an invalidation
+            if version == self.version:
+                self._data[key] = (version, now + self.ttl, value)
+        return value
+
+    def invalidate(self, key=None):
+        """Drop one key, or everything (bumping the version) when no key is given"""
+        with self._lock:
+            if key is None:
+                self.version += 1
+                self._data.clear()
+            else:
+                self._data.pop(key, None)
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_ratio': round(self.hits / lookups, 4) if lookups else None,
+                'size': len(self._data),
+                'version': self.version,
+                'ttl': self.ttl,
+            }
+
+
+def local_cache_stats():
+    """Counters for every LocalTTLCache in this process"""
+    return {name: cache.stats() for name, cache in LocalTTLCache.registry.items()}
+
+
+# ===== Summary response cache =====
+
+ALL_SCOPES = 'all'  # part of every key; bumped by full rebuilds
+
+_stats_lock = threading.Lock()
+_view_stats = defaultdict(lambda: {'hits': 0, 'misses': 0, 'hit_ms': 0.0, 'miss_ms': 0.0})
+_key_timings = OrderedDict()  # most recent compute/serve times per key
+KEY_TIMINGS_KEPT = 200
+
+
+def _versions():
+    # always the primary: a lagging replica would hand out versions older than the data
+    return ScopeVersion.objects.using(DEFAULT_DB_ALIAS)
+
+
+def scope_versions(scopes):
+    """Current version (time of the last write, in ns) of each scope; a missing version is seeded from the clock"""
+    versions = dict(_versions().filter(scope__in=scopes).values_list('scope', 'version'))
+    missing = [scope for scope in scopes if scope not in versions]
+    if missing:
+        # the clock seed keeps a scope first seen after a reset from reusing keys cached before it
+        seed = time.time_ns()
+        _versions().bulk_create([ScopeVersion(scope=scope, version=seed) for scope in missing], ignore_conflicts=True)
+        versions.update(_versions().filter(scope__in=missing).values_list('scope', 'version'))
+    versions = [versions[scope] for scope in scopes]
+    # data written moments ago may not be on the read replica yet
+    pin_if_recent(max(versions))
+    return versions
+
+
+def bump_scopes(*scopes):
+    """Invalidate every cached response (in any process) that depends on any of ``scopes``"""
+    # the write time, kept moving forward on coarse or skewed clocks
+    version = time.time_ns()
+    bumped = _versions().filter(scope__in=scopes).update(version=Greatest(F('version') + 1, Value(version)))
+    if bumped < len(set(scopes)):
+        _versions().bulk_create([ScopeVersion(scope=scope, version=version) for scope in set(scopes)],
+                                ignore_conflicts=True)
+
+
+class _PendingBumps:
+    """Scopes written in the current transaction, bumped together when it commits"""
+
+    def __init__(self):
+        self.scopes = set()
+
+    def __call__(self):
+        _pending.batch = None
+        bump_scopes(*self.scopes)
+
+
+_pending = threading.local()
+
+
+def bump_scopes_on_commit(*scopes):
+    """bump_scopes once the current transaction commits: one bump for every scope the transaction wrote"""
+    connection = transaction.get_connection()
+    if not connection.in_atomic_block:
+        bump_scopes(*scopes)
+        return
+    batch = getattr(_pending, 'batch', None)
+    # a batch whose transaction (or savepoint) was rolled back is no longer registered
+    if batch is None or not any(entry[1] is batch for entry in connection.run_on_commit):
+        batch = _pending.batch = _PendingBumps()
+        transaction.on_commit(batch)
+    batch.scopes.update(scopes)
+
+
+def model_scope(model):
+    """Write counter of one model, bumped on every save/delete/bulk write"""
+    return f'model:{model._meta.label_lower}'
+
+
+# models whose write counters something reads (list ETags, the bootstrap cache); only these are bumped on save
+watched_models = set()
+
+
+def watch_models(*models):
+    watched_models.update(models)
+
+
+def bump_models(*models):
+    bump_scopes(*(model_scope(model) for model in models))
+
+
+def bump_models_on_commit(*models):
+    bump_scopes_on_commit(*(model_scope(model) for model in models))
+
+
+def _digest(*parts):
+    return hashlib.md5(repr(parts).encode()).hexdigest()
+
+
+def response_cache_key(view_name, scopes, request, kwargs):
+    params = sorted(request.query_params.lists())
+    digest = _digest(view_name, sorted(kwargs.items()), params, now().date().isoformat(), scopes, scope_versions(scopes))
+    return f'summary:response:{view_name}:{digest}'
+
+
+def etag_matches(request, etag):
+    tags = parse_etags(request.headers.get('If-None-Match', ''))
+    return '*' in tags or etag in tags
+
+
+def _not_modified(etag):
+    from rest_framework.response import Response
+
+    return Response(status=304, headers={'ETag': etag})
+
+
+def _record(view_name, key, hit, elapsed_ms):
+    with _stats_lock:
+        stats = _view_stats[view_name]
+        stats['hits' if hit else 'misses'] += 1
+        stats['hit_ms' if hit else 'miss_ms'] += elapsed_ms
+        _key_timings[key] = {'view': view_name, 'hit': hit, 'ms': round(elapsed_ms, 2)}
+        _key_timings.move_to_end(key)
+        while len(_key_timings) > KEY_TIMINGS_KEPT:
+            _key_timings.popitem(last=False)
+
+
+def summary_cache_key(view_name, scope_list, request, kwargs):
+    """(cache key, ETag) of one summary request"""
+    key = response_cache_key(view_name, [ALL_SCOPES, *scope_list], request, kwargs)
+    return key, f'"{key.rsplit(":", 1)[-1]}"'
+
+
+def store_summary(key, data):
+    cache.set(key, data, getattr(settings, 'SUMMARY_CACHE_TTL', 3600))
+
+
+def finish_summary(response, view_name, key, etag, hit, started):
+    """Record the lookup and set the X-Cache / Server-Timing / ETag headers"""
+    elapsed_ms = (time.perf_counter() - started) * 1000
+    _record(view_name, key, hit, elapsed_ms)
+    response['X-Cache'] = 'HIT' if hit else 'MISS'
+    response['Server-Timing'] = f'summary;dur={elapsed_ms:.1f}'
+    if response.status_code == 200:
+        response['ETag'] = etag
+    return response
+
+
+def cached_response(scopes):
+    """
+    Cache a view's 200 responses per (view, url kwargs, query params, day, data versions).
+
+    Args:
+        scopes: callable(view, request, **kwargs) returning the data scopes the
+            response depends on, or None to bypass the cache for this request
+    """
+    def decorator(method):
+        @functools.wraps(method)
+        def wrapper(self, request, *args, **kwargs):
+            scope_list = scopes(self, request, **kwargs)
+            if not scope_list:
+                return method(self, request, *args, **kwargs)
+
+            from rest_framework.response import Response
+
+            view_name = type(self).__name__
+            started = time.perf_counter()
+            key, etag = summary_cache_key(view_name, scope_list, request, kwargs)
+            if etag_matches(request, etag):
+                return _not_modified(etag)
+
+            data = cache.get(key)
+
+            if data is not None:
+                response = Response(data)
+                hit = True
+            else:
+                response = method(self, request, *args, **kwargs)
+                if response.status_code == 200:
+                    store_summary(key, response.data)
+                hit = False
+
+            return finish_summary(response, view_name, key, etag, hit, started)
+        return wrapper
+    return decorator
+
+
+class ConditionalListMixin:
+    """
+    ETag / 304 Not Modified for a viewset's list().
+
+    The tag covers the query string, the user, today's date and the write
+    counters of ``etag_models`` (default: the queryset's model), so it changes
+    whenever any of those models is written, by any process.
+    """
+    etag_models = None
+
+    def __init_subclass__(cls, **kwargs):
+        super().__init_subclass__(**kwargs)
+        queryset = getattr(cls, 'queryset', None)
+        watch_models(*(cls.etag_models or ((queryset.model,) if queryset is not None else ())))
+
+    def list(self, request, *args, **kwargs):
+        models = self.etag_models or (self.get_queryset().model,)
+        scopes = [ALL_SCOPES, *(model_scope(model) for model in models)]
+        # versions are read before the queryset: a write landing mid-request only costs the next poll a full response
+        etag = '"%s"' % _digest(type(self).__name__, request.user.pk, sorted(request.query_params.lists()),
+                                now().date().isoformat(), scope_versions(scopes))
+        if etag_matches(request, etag):
+            return _not_modified(etag)
+
+        response = super().list(request, *args, **kwargs)
+        if response.status_code == 200:
+            response['ETag'] = etag
+        return response
+
+
+def response_cache_stats():
+    """Hit ratio and average latency per view, plus recent per-key timings (this process)"""
+    with _stats_lock:
+        views = {}
+        for view_name, stats in _view_stats.items():
+            lookups = stats['hits'] + stats['misses']
+            views[view_name] = {
+                'hits': stats['hits'],
+                'misses': stats['misses'],
+                'hit_ratio': round(stats['hits'] / lookups, 4) if lookups else None,
+                'avg_hit_ms': round(stats['hit_ms'] / stats['hits'], 2) if stats['hits'] else None,
+                'avg_miss_ms': round(stats['miss_ms'] / stats['misses'], 2) if stats['misses'] else None,
+            }
+        return {'views': views, 'recent_keys': dict(reversed(_key_timings.items()))}
@@ -0,0 +1,148 @@
+"""
+Streaming CSV / NDJSON exports of the sales, credit and attendance tables.
+
+The admin's import-export "Export" builds the whole dataset with tablib
+before sending a byte. These endpoints stream instead: rows are read with
+values_list().iterator(chunk_size=...) (a server-side cursor on PostgreSQL,
+fetchmany() batches on SQLite) and written out a chunk at a time, so memory
+stays flat however many rows are exported.
+
+    GET /api/export/fuel-sales.csv?date_from=2025-01-01&date_to=2025-12-31&site=ofankor
+    GET /api/export/attendance.ndjson?site=ofankor&attendant=12
+
+Filters are the list endpoints' filter sets (employee/filters.py). Responses
+stream under WSGI; under ASGI Django buffers synchronous iterators.
+"""
+import csv
+from collections import namedtuple
+from itertools import islice
+
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.http import StreamingHttpResponse
+from django.utils.timezone import now
+from django_filters.utils import translate_validation
+from rest_framework import permissions
+from rest_framework.exceptions import NotFound
+from rest_framework.negotiation import BaseContentNegotiation
+from rest_framework.renderers import JSONRenderer
+from rest_framework.views import APIView
+
+from .filters import (AttendanceRegisterFilter, CreditCollectionFilter, CreditSalesFilter, FuelSalesFilter,
+                      ShopSalesFilter)
+from .models import AttendanceRegister, CreditCollection, CreditSales, FuelSales, ShopSales
+
+
+# columns are (header, values_list lookup); names follow the list serializers
+Export = namedtuple('Export', 'model filterset ordering columns')
+EXPORTS = {
+    'fuel-sales': Export(FuelSales, FuelSalesFilter, ('date', 'id'), (
+        ('id', 'id'), ('date', 'date'), ('site', 'site'), ('pump', 'pump'),
+        ('user', 'user_id'), ('employee_name', 'user__employee_profile__name'),
+        ('captain', 'captain_id'), ('captain_name', 'captain__user__employee_profile__name'),
+        ('pms_sales', 'pms_sales'), ('dx_sales', 'dx_sales'), ('vp_sales', 'vp_sales'),
+        ('performance', 'performance'),
+    )),
+    'shop-sales': Export(ShopSales, ShopSalesFilter, ('date', 'id'), (
+        ('id', 'id'), ('date', 'date'), ('site', 'site'),
+        ('user', 'user_id'), ('employee_name', 'user__employee_profile__name'),
+        ('captain', 'captain_id'), ('captain_name', 'captain__user__employee_profile__name'),
+        ('sales', 'sales'), ('performance', 'performance'),
+    )),
+    'credit-sales': Export(CreditSales, CreditSalesFilter, ('date', 'id'), (
+        ('id', 'id'), ('date', 'date'), ('user', 'user_id'), ('employee_name', 'user__employee_profile__name'),
+        ('customer', 'customer_id'), ('customer_name', 'customer__name'),
+        ('car_number', 'car_number'), ('litres', 'litres'), ('amount', 'amount'),
+    )),
+    'credit-collections': Export(CreditCollection, CreditCollectionFilter, ('date', 'id'), (
+        ('id', 'id'), ('date', 'date'), ('customer', 'customer_id'), ('customer_name', 'customer__name'),
+        ('amount', 'amount'),
+    )),
+    'attendance': Export(AttendanceRegister, AttendanceRegisterFilter, ('attendance_date__date', 'id'), (
+        ('id', 'id'), ('date', 'attendance_date__date'), ('site', 'attendant__site'),
+        ('attendant', 'attendant_id'), ('attendant_name', 'attendant__name'),
+        ('raw_score', 'raw_score'), ('percentage_mark', 'percentage_mark'),
+    )),
+}
+
+
+def _chunks(rows, size):
+    rows = iter(rows)
+    while chunk := list(islice(rows, size)):
+        yield chunk
+
+
+class _Echo:
+    """File-like object for csv.writer that hands back each line instead of storing it"""
+
+    def write(self, value):
+        return value
+
+
+def csv_lines(headers, rows, chunk_size):
+    writer = csv.writer(_Echo())
+    yield writer.writerow(headers)
+    for chunk in _chunks(rows, chunk_size):
+        yield ''.join(writer.writerow(row) for row in chunk)
+
+
+def ndjson_lines(headers, rows, chunk_size):
+    # decimals and dates as strings, like the API's JSON
+    encode = DjangoJSONEncoder(separators=(',', ':')).encode
+    for chunk in _chunks(rows, chunk_size):
+        yield ''.join(encode(dict(zip(headers, row))) + '\n' for row in chunk)
+
+
+FORMATS = {
+    'csv': ('text/csv', csv_lines),
+    'ndjson': ('application/x-ndjson', ndjson_lines),
+}
+
+
+def export_rows(export, queryset, chunk_size):
+    """The export's columns for ``queryset``, read in ``chunk_size`` batches"""
+    lookups = [lookup for _, lookup in export.columns]
+    return queryset.order_by(*export.ordering).values_list(*lookups).iterator(chunk_size=chunk_size)
+
+
+class CanExport(permissions.BasePermission):
+    """Staff, managers and supervisors"""
+
+    def has_permission(self, request, view):
+        user = request.user
+        return bool(user and user.is_authenticated and (user.is_staff or user.is_manager or user.is_supervisor))
+
+
+class _URLFormatNegotiation(BaseContentNegotiation):
+    """The export format comes from the URL; errors are JSON whatever the Accept header asks for"""
+
+    def select_parser(self, request, parsers):
+        return parsers[0] if parsers else None
+
+    def select_renderer(self, request, renderers, format_suffix=None):
+        return renderers[0], renderers[0].media_type
+
+
+class ExportView(APIView):
+    permission_classes = [CanExport]
+    renderer_classes = [JSONRenderer]
+    content_negotiation_class = _URLFormatNegotiation
+
+    def get(self, request, dataset, fmt):
+        export = EXPORTS.get(dataset)
+        if export is None or fmt not in FORMATS:
+            raise NotFound(f'No export {dataset}.{fmt}; datasets: {", ".join(EXPORTS)}; formats: {", ".join(FORMATS)}.')
+
+        filterset = export.filterset(request.query_params, queryset=export.model.objects.all(), request=request)
+        if not filterset.is_valid():
+            raise translate_validation(filterset.errors)
+        # pick the database now: the rows are read after the view (and the replica routing of its request) returns
+        queryset = filterset.qs.using(filterset.qs.db)
+
+        chunk_size = getattr(settings, 'EXPORT_CHUNK_SIZE', 2000)
+        content_type, lines = FORMATS[fmt]
+        headers = [header for header, _ in export.columns]
+        response = StreamingHttpResponse(lines(headers, export_rows(export, queryset, chunk_size), chunk_size),
+                                         content_type=content_type)
+        response['Content-Disposition'] = f'attachment; filename="{dataset}-{now().date().isoformat()}.{fmt}"'
+        return response
@@ -0,0 +1,65 @@
+"""
+Filter sets for the list endpoints.
+
+Date filters are plain ``>=``/``<=`` comparisons on the column, so they can
+use the (…, date) indexes rather than wrapping the column in EXTRACT().
+"""
+from django_filters import rest_framework as filters
+
+from .models import (Employee, FuelSales, ShopSales, CreditSales, CreditCollection, AttendanceRegister,
+                     SITE_CHOICES, STATUS_CHOICES, JOB_DESCRIPTION_CHOICES)
+
+
+class DateRangeFilterSet(filters.FilterSet):
+    date_from = filters.DateFilter(field_name='date', lookup_expr='gte')
+    date_to = filters.DateFilter(field_name='date', lookup_expr='lte')
+
+
+class FuelSalesFilter(DateRangeFilterSet):
+    site = filters.ChoiceFilter(choices=SITE_CHOICES)
+
+    class Meta:
+        model = FuelSales
+        fields = ['user', 'captain', 'pump']
+
+
+class ShopSalesFilter(DateRangeFilterSet):
+    site = filters.ChoiceFilter(choices=SITE_CHOICES)
+
+    class Meta:
+        model = ShopSales
+        fields = ['user', 'captain']
+
+
+class CreditSalesFilter(DateRangeFilterSet):
+    site = filters.ChoiceFilter(field_name='user__employee_profile__site', choices=SITE_CHOICES)
+
+    class Meta:
+        model = CreditSales
+        fields = ['user', 'customer']
+
+
+class CreditCollectionFilter(DateRangeFilterSet):
+    class Meta:
+        model = CreditCollection
+        fields = ['customer']
+
+
+class AttendanceRegisterFilter(filters.FilterSet):
+    date_from = filters.DateFilter(field_name='attendance_date__date', lookup_expr='gte')
+    date_to = filters.DateFilter(field_name='attendance_date__date', lookup_expr='lte')
+    site = filters.ChoiceFilter(field_name='attendant__site', choices=SITE_CHOICES)
+
+    class Meta:
+        model = AttendanceRegister
+        fields = ['attendant']
+
+
+class EmployeeFilter(filters.FilterSet):
+    site = filters.ChoiceFilter(choices=SITE_CHOICES)
+    status = filters.ChoiceFilter(choices=STATUS_CHOICES)
+    job_description = filters.ChoiceFilter(choices=JOB_DESCRIPTION_CHOICES)
+
+    class Meta:
+        model = Employee
+        fields = ['site', 'status', 'job_description']
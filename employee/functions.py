@@ -86,7 +86,16 @@ years = list(range(2020, datetime.now().year + 1))
 
 
 
+import io
+import os
+from collections import defaultdict
+from itertools import islice
+from django.core.exceptions import NON_FIELD_ERRORS
 from django.db import transaction
+from django.contrib.auth import get_user_model
+from .models import AttendanceRegister, AttendantEvaluation, Employee, FuelSales, ShopSales
+from .rollups import record_bulk_created
+from .targets import stamp_performance, stamp_sites
 
 def reset_model_data(model):
     """
@@ -213,94 +222,359 @@ def excel_to_json(file_path, output_path=None):
 
 
 
-def load_json_to_model(json_data, model, mapping=None, update_existing=False):
+JSON_READ_SIZE = 64 * 1024
+JSON_WHITESPACE = ' \t\n\r'
+LOAD_CHUNK_SIZE = 1000
+
+
+def iter_json_records(stream, read_size=JSON_READ_SIZE):
+    """
+    Yield the items of a JSON array (or a single top-level object) from a text stream.
+
+    The text is read ``read_size`` characters at a time and decoded with
+    JSONDecoder.raw_decode, so only the current block and record are in memory.
+    Raises json.JSONDecodeError on malformed input.
+    """
+    decoder = json.JSONDecoder()
+    buffer, position, eof = '', 0, False
+
+    def read_more():
+        nonlocal buffer, position, eof
+        block = stream.read(read_size)
+        eof = not block
+        buffer, position = buffer[position:] + block, 0
+
+    def skip_whitespace():
+        nonlocal position
+        while True:
+            while position < len(buffer) and buffer[position] in JSON_WHITESPACE:
+                position += 1
+            if position < len(buffer) or eof:
+                return
+            read_more()
+
+    skip_whitespace()
+    if position == len(buffer):
+        raise json.JSONDecodeError('Expecting value', buffer, position)
+    array = buffer[position] == '['
+    if array:
+        position += 1
+
+    first = True
+    while True:
+        skip_whitespace()
+        if position == len(buffer):
+            if array:
+                raise json.JSONDecodeError('Unterminated array', buffer, position)
+            return
+        if array and buffer[position] == ']':
+            return
+        if not array and not first:
+            raise json.JSONDecodeError('Extra data', buffer, position)
+        if array and not first:
+            if buffer[position] != ',':
+                raise json.JSONDecodeError("Expecting ',' delimiter", buffer, position)
+            position += 1
+            skip_whitespace()
+
+        while True:
+            try:
+                record, end = decoder.raw_decode(buffer, position)
+            except json.JSONDecodeError:
+                if eof:
+                    raise
+                read_more()  # the record continues in the next block
+                continue
+            if end == len(buffer) and not eof:
+                read_more()  # a number at the end of the block may go on
+                continue
+            break
+        position = end
+        first = False
+        yield record
+
+
+def _json_records(json_data):
+    """Records from a file path, a JSON string, an open file, a list or a single dict"""
+    if isinstance(json_data, dict):
+        yield json_data
+    elif isinstance(json_data, list):
+        yield from json_data
+    elif isinstance(json_data, str) and os.path.isfile(json_data):
+        with open(json_data) as f:
+            yield from iter_json_records(f)
+    elif isinstance(json_data, str):
+        yield from iter_json_records(io.StringIO(json_data))
+    else:
+        yield from iter_json_records(json_data)
+
+
+class _LoadPlan:
+    """What loading one model needs, worked out once per load instead of once per record"""
+
+    def __init__(self, model, mapping):
+        opts = model._meta
+        self.model = model
+        self.mapping = mapping
+        self.pk = opts.pk
+        # keys accepted in records: field names and attnames (``user`` or ``user_id``)
+        self.fields = {}
+        for field in opts.concrete_fields:
+            self.fields[field.name] = self.fields[field.attname] = field
+        self.foreign_keys = [field for field in opts.concrete_fields if field.is_relation]
+        self.excluded = {field.name for field in self.foreign_keys}  # checked per chunk instead
+
+        unique_sets = [(field.name,) for field in opts.concrete_fields if field.unique]
+        unique_sets += [tuple(names) for names in opts.unique_together]
+        unique_sets += [tuple(constraint.fields) for constraint in opts.total_unique_constraints]
+        self.unique_sets = list(dict.fromkeys(unique_sets))
+
+    def prepare(self, record):
+        """{attname: value} for one record, with the date and contact clean-ups the Excel exports need"""
+        if self.mapping:
+            items = ((model_field, record.get(json_field)) for json_field, model_field in self.mapping.items())
+        else:
+            items = record.items()
+
+        data = {}
+        for key, value in items:
+            field = self.fields.get(key)
+            if field is None:
+                continue
+            if field.is_relation:
+                # ids as the related model stores them; '' from excel_to_json means no value
+                value = None if value in (None, '') else field.target_field.to_python(value)
+            elif field.primary_key:
+                value = None if value in (None, '') else field.to_python(value)
+            data[field.attname] = value
+
+        # Convert date strings to date objects
+        if isinstance(data.get('date'), str):
+            try:
+                data['date'] = datetime.strptime(data['date'], '%Y-%m-%d').date()
+            except ValueError:
+                # Try fallback format or slice datetime string
+                data['date'] = datetime.strptime(data['date'][:10], '%Y-%m-%d').date()
+
+        # Format contact number as string
+        if data.get('contact'):
+            if isinstance(data['contact'], (int, float)):
+                data['contact'] = str(int(data['contact']))
+            data['contact'] = data['contact'].zfill(10)
+        return data
+
+
+def _related_objects(plan, rows):
+    """{field: {id: related object}} for every foreign key of the {attname: value} rows, one IN query per field"""
+    related = {}
+    for field in plan.foreign_keys:
+        ids = {data[field.attname] for data in rows if data.get(field.attname) is not None}
+        manager = field.related_model._base_manager
+        related[field] = manager.in_bulk(ids, field_name=field.target_field.name) if ids else {}
+    return related
+
+
+def _build(plan, data, related):
+    """Unsaved instance for ``data`` (validated without queries), or a ValidationError"""
+    values, errors = dict(data), {}
+    for field in plan.foreign_keys:
+        value = values.pop(field.attname, None)
+        if value is None:
+            if not field.null and not field.has_default():
+                errors[field.name] = [field.error_messages['null']]
+        elif value not in related[field]:
+            errors[field.name] = [field.error_messages['invalid'] % {
+                'model': field.related_model._meta.verbose_name, 'pk': value,
+                'field': field.target_field.name, 'value': value,
+            }]
+        else:
+            values[field.name] = related[field][value]
+    if errors:
+        return ValidationError(errors)
+
+    instance = plan.model(**values)
+    try:
+        # foreign keys were resolved above; uniqueness is checked for the whole chunk
+        instance.full_clean(exclude=plan.excluded, validate_unique=False, validate_constraints=False)
+    except ValidationError as e:
+        return e
+    return instance
+
+
+def _unique_errors(plan, rows, update_existing):
+    """{row index: ValidationError} for rows clashing on a unique field set, one query per set"""
+    errors = {}
+    for names in plan.unique_sets:
+        if update_existing and names == (plan.pk.name,):
+            continue  # the upsert key: existing ids are updated
+        attnames = [plan.model._meta.get_field(name).attname for name in names]
+        keyed = {}
+        for index, instance in rows:
+            key = tuple(getattr(instance, attname) for attname in attnames)
+            if None in key:
+                continue
+            keyed.setdefault(key, []).append((index, instance))
+        if not keyed:
+            continue
+
+        lookups = {f'{attname}__in': {key[n] for key in keyed} for n, attname in enumerate(attnames)}
+        existing = {
+            tuple(row[1:]): row[0]
+            for row in plan.model._base_manager.filter(**lookups).values_list('pk', *attnames)
+        }
+        for key, clashing in keyed.items():
+            for position, (index, instance) in enumerate(clashing):
+                # later rows of the same chunk clash with the first one
+                stored = existing.get(key)
+                if position or (stored is not None and stored != instance.pk):
+                    message = instance.unique_error_message(plan.model, names)
+                    errors.setdefault(index, ValidationError({
+                        names[0] if len(names) == 1 else NON_FIELD_ERRORS: [message],
+                    }))
+    return errors
+
+
+PERCENTAGE_FIELDS = {AttendantEvaluation: 'percentage_score', AttendanceRegister: 'percentage_mark'}
+
+
+def _derive(model, instances):
+    """Set the fields the model's save() derives (bulk_create skips it); returns their names"""
+    if model in (FuelSales, ShopSales):
+        # performance is computed here so the rollups are written once
+        stamp_performance(stamp_sites(instances))
+        return ['site', 'performance']
+    if model in PERCENTAGE_FIELDS:
+        for instance in instances:
+            setattr(instance, PERCENTAGE_FIELDS[model], instance.calculate_percentage())
+        return [PERCENTAGE_FIELDS[model]]
+    if model is Employee:
+        # link the user whose username is the contact, one query for the chunk
+        unlinked = [instance for instance in instances if not instance.user_id]
+        contacts = {instance.contact for instance in unlinked}
+        users = get_user_model().objects.filter(username__in=contacts).values_list('username', 'id') if contacts else ()
+        users = dict(users)
+        for instance in unlinked:
+            instance.user_id = users.get(instance.contact)
+        return ['user']
+    return []
+
+
+def _write(plan, instances, data_fields, update_existing, current):
+    """bulk_create the chunk; rows with an id are upserted on it when ``update_existing``"""
+    model = plan.model
+    derived = _derive(model, instances)
+
+    inserts, upserts = [], {}
+    for instance in instances:
+        if update_existing and instance.pk is not None:
+            upserts[instance.pk] = instance  # the last record for an id wins, as with update_or_create
+        else:
+            inserts.append(instance)
+
+    model.objects.bulk_create(inserts)
+
+    # update_or_create only set the fields a record gave: one statement per set of fields
+    groups = defaultdict(list)
+    for instance in upserts.values():
+        groups[data_fields[id(instance)]].append(instance)
+    for fields, group in groups.items():
+        update_fields = [plan.fields[attname].name for attname in fields if attname != plan.pk.attname]
+        update_fields = list(dict.fromkeys(update_fields + derived))
+        if update_fields:
+            model.objects.bulk_create(group, update_conflicts=True, unique_fields=[plan.pk.name],
+                                      update_fields=update_fields)
+        else:
+            model.objects.bulk_create(group, ignore_conflicts=True)
+
+    written = inserts + list(upserts.values())
+    record_bulk_created(model, written, replaced=[current[pk] for pk in upserts if pk in current])
+
+
+def _load_chunk(plan, records, update_existing, errors):
+    """Validate and write one chunk of records; returns how many were written"""
+    rows, failed = [], {}  # failed: {position in the chunk: error}, reported in record order
+    for position, record in enumerate(records):
+        try:
+            rows.append((record, plan.prepare(record)))
+        except Exception as e:
+            failed[position] = {'record': record, 'error': str(e)}
+    positions = [position for position in range(len(records)) if position not in failed]
+
+    # rows being updated start from their stored values, as update_or_create(defaults=...) did
+    current = {}
+    if update_existing:
+        ids = {data[plan.pk.attname] for _, data in rows if data.get(plan.pk.attname) is not None}
+        current = plan.model._base_manager.select_for_update().in_bulk(ids) if ids else {}
+    merged = []
+    for record, data in rows:
+        stored = current.get(data.get(plan.pk.attname))
+        if stored is not None:
+            merged.append({**{field.attname: getattr(stored, field.attname) for field in plan.model._meta.concrete_fields},
+                           **data})
+        else:
+            merged.append(data)
+
+    related = _related_objects(plan, merged)
+    built, data_fields = [], {}
+    for index, ((record, data), values) in enumerate(zip(rows, merged)):
+        instance = _build(plan, values, related)
+        if isinstance(instance, ValidationError):
+            failed[positions[index]] = {'record': record, 'error': str(instance)}
+            continue
+        built.append((index, instance))
+        data_fields[id(instance)] = frozenset(data)
+
+    clashes = _unique_errors(plan, built, update_existing)
+    instances = []
+    for index, instance in built:
+        if index in clashes:
+            failed[positions[index]] = {'record': rows[index][0], 'error': str(clashes[index])}
+        else:
+            instances.append(instance)
+    errors.extend(failed[position] for position in sorted(failed))
+
+    if instances:
+        _write(plan, instances, data_fields, update_existing, current)
+    return len(instances)
+
+
+def load_json_to_model(json_data, model, mapping=None, update_existing=False, chunk_size=LOAD_CHUNK_SIZE):
     """
     Load JSON data into Django model with proper type conversion:
     - Handles date strings
     - Preserves contact number formatting
+    - Foreign keys given as ids (``user`` or ``user_id``)
+
+    Records are parsed from the file as they are read and handled ``chunk_size``
+    at a time: foreign keys and unique fields are checked with one IN query per
+    field for the chunk, rows are validated without further queries and written
+    with bulk_create. With ``update_existing``, records with an ``id`` are
+    upserted on it (bulk_create(update_conflicts=True)). The whole load is one
+    transaction; invalid records are reported and skipped.
 
     Args:
-        json_data (str/dict/list): JSON data or file path
+        json_data (str/dict/list): JSON data or file path (or an open file)
         model (django.db.models.Model): Model class to load into
         mapping (dict, optional): Field mapping between JSON and model
         update_existing (bool): Update existing records if True
+        chunk_size (int): Records validated and written together
 
     Returns:
         tuple: (success_count, error_count, errors)
     """
-    # Load JSON data
-    if isinstance(json_data, str):
-        try:
-            with open(json_data) as f:
-                data = json.load(f)
-        except FileNotFoundError:
-            try:
-                data = json.loads(json_data)
-            except json.JSONDecodeError:
-                raise ValidationError("Invalid JSON data or file path")
-    else:
-        data = json_data if isinstance(json_data, list) else [json_data]
-
+    plan = _LoadPlan(model, mapping)
     success_count = 0
-    error_count = 0
     errors = []
-    instances = []
 
-    with transaction.atomic():
-        for record in data:
-            try:
-                model_fields = {f.name for f in model._meta.get_fields()}
-                mapped_data = {}
-
-                # Apply field mapping if provided
-                if mapping:
-                    for json_field, model_field in mapping.items():
-                        if model_field in model_fields:
-                            mapped_data[model_field] = record.get(json_field)
-                else:
-                    for field in record:
-                        if field in model_fields:
-                            mapped_data[field] = record[field]
-
-                # Convert date strings to date objects
-                if 'date' in mapped_data and isinstance(mapped_data['date'], str):
-                    try:
-                        mapped_data['date'] = datetime.strptime(mapped_data['date'], '%Y-%m-%d').date()
-                    except ValueError:
-                        # Try fallback format or slice datetime string
-                        mapped_data['date'] = datetime.strptime(mapped_data['date'][:10], '%Y-%m-%d').date()
-
-                # Format contact number as string
-                if 'contact' in mapped_data and mapped_data['contact']:
-                    if isinstance(mapped_data['contact'], (int, float)):
-                        mapped_data['contact'] = str(int(mapped_data['contact']))
-                    mapped_data['contact'] = mapped_data['contact'].zfill(10)
-
-                # Update or create record
-                if update_existing and 'id' in mapped_data:
-                    instance, _ = model.objects.update_or_create(
-                        id=mapped_data['id'],
-                        defaults=mapped_data
-                    )
-                else:
-                    instance = model(**mapped_data)
-                    instance.full_clean()
-                    instances.append(instance)
-
-                success_count += 1
-
-            except Exception as e:
-                error_count += 1
-                errors.append({
-                    'record': record,
-                    'error': str(e)
-                })
-
-        # Bulk create if not updating
-        if not update_existing and instances:
-            model.objects.bulk_create(instances)
-
-    return success_count, error_count, errors
+    records = _json_records(json_data)
+    try:
+        with transaction.atomic():
+            while chunk := list(islice(records, chunk_size)):
+                success_count += _load_chunk(plan, chunk, update_existing, errors)
+    except json.JSONDecodeError:
+        raise ValidationError("Invalid JSON data or file path")
+
+    return success_count, len(errors), errors
 
 
 def convert_to_json(file):
@@ -0,0 +1,232 @@
+"""
+Streaming Excel (.xlsx) imports for employees and fuel/shop sales.
+
+functions.excel_to_json reads the whole workbook into pandas and writes it
+out as JSON before anything reaches the database. Here the first sheet is
+read in openpyxl's read-only mode one row at a time, each row is normalised
+as it is read, and rows are written in fixed-size chunks, each in its own
+transaction. Memory is bounded by the chunk size rather than the file, and a
+bad row only costs that row.
+
+- employees: one user (username = contact) and employee per row; contacts
+  that already have a user/employee are skipped, as in manage.py
+  create_employees. New users get the initial password (see
+  initial_password) and must change it at their first login.
+- fuel-sales / shop-sales: people are given by contact number (``contact``
+  for the attendant, ``captain`` for the captain) and resolved with one
+  query per chunk; the rows then go through the bulk API's batch writers
+  (employee/bulk.py). Shop sales are upserted on (user, date).
+
+Used by ``manage.py import_excel`` and the admin's "Import from Excel" pages.
+"""
+import time
+from datetime import datetime
+from itertools import islice
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import make_password
+from django.core.exceptions import ValidationError
+from django.db import transaction
+from openpyxl import load_workbook
+
+from .bulk import create_fuel_sales, upsert_shop_sales
+from .caching import bump_models
+from .models import Captain, Employee
+from .rollups import record_bulk_created
+
+
+CONTACT_COLUMNS = ('contact', 'guarantor_contact', 'captain')
+MONEY_COLUMNS = ('pms_sales', 'dx_sales', 'vp_sales', 'sales')
+MAX_REPORTED_ERRORS = 1000
+
+
+class ImportResult:
+    """Counts, per-row errors and timing of one import"""
+
+    def __init__(self):
+        self.rows = 0
+        self.created = 0
+        self.updated = 0
+        self.skipped = 0
+        self.failed = 0
+        self.errors = []  # first MAX_REPORTED_ERRORS of {'row': sheet row number, 'errors': ...}
+        self.started = time.perf_counter()
+        self.seconds = 0.0
+
+    def error(self, row, errors):
+        self.failed += 1
+        if len(self.errors) < MAX_REPORTED_ERRORS:
+            self.errors.append({'row': row, 'errors': errors})
+
+    @property
+    def rows_per_second(self):
+        return self.rows / self.seconds if self.seconds else 0.0
+
+
+def initial_password(password=None):
+    """Password for new imported users: ``password``, else settings.INITIAL_PASSWORD, else None (unusable)"""
+    return password or getattr(settings, 'INITIAL_PASSWORD', '') or None
+
+
+def format_contact(value):
+    """Phone numbers as 10-digit strings with the leading zero Excel drops"""
+    if value is None or value == '':
+        return ''
+    try:
+        return f'{int(float(value)):010d}'
+    except (TypeError, ValueError):
+        return str(value).strip()
+
+
+def normalise(record):
+    """Clean one sheet row: contacts as strings, datetimes as dates, text stripped"""
+    for key, value in record.items():
+        if key in CONTACT_COLUMNS:
+            record[key] = format_contact(value)
+        elif isinstance(value, datetime):
+            record[key] = value.date()
+        elif isinstance(value, str):
+            record[key] = value.strip()
+        elif key in MONEY_COLUMNS and isinstance(value, float):
+            record[key] = round(value, 2)  # binary float noise from Excel
+    return record
+
+
+def read_sheet(source):
+    """(sheet row number, normalised dict) for each non-empty row of the first sheet of an .xlsx path or file"""
+    workbook = load_workbook(source, read_only=True, data_only=True)
+    try:
+        rows = workbook.worksheets[0].iter_rows(values_only=True)
+        header = next(rows, None)
+        if header is None:
+            return
+        columns = [str(name).strip() if name is not None else None for name in header]
+        for number, values in enumerate(rows, start=2):
+            if all(value is None or value == '' for value in values):
+                continue
+            yield number, normalise({column: value for column, value in zip(columns, values) if column})
+    finally:
+        workbook.close()
+
+
+# ===== chunk writers: (chunk of (row number, record), result, context) =====
+
+EMPLOYEE_FIELDS = {field.name for field in Employee._meta.concrete_fields} - {'id', 'user'}
+
+
+def _employee_chunk(chunk, result, context):
+    User = get_user_model()
+    contacts = {record.get('contact') for _, record in chunk}
+    existing_users = dict(User.objects.filter(username__in=contacts).values_list('username', 'id'))
+    with_profile = set(Employee.objects.filter(user__username__in=contacts).values_list('user__username', flat=True))
+
+    employees = []
+    for number, record in chunk:
+        contact = record.get('contact')
+        if contact in with_profile or contact in context['seen']:
+            result.skipped += 1
+            continue
+        employee = Employee(**{field: value for field, value in record.items() if field in EMPLOYEE_FIELDS})
+        try:
+            # no per-row queries: users are matched per chunk and Employee has no unique fields
+            employee.full_clean(exclude=['user'], validate_unique=False)
+        except ValidationError as e:
+            result.error(number, e.message_dict)
+            continue
+        context['seen'].add(contact)
+        employees.append(employee)
+
+    if not employees:
+        return
+    with transaction.atomic():
+        new_users = User.objects.bulk_create([
+            User(username=employee.contact, password=context['password'], must_change_password=True)
+            for employee in employees if employee.contact not in existing_users
+        ])
+        user_ids = {**existing_users, **{user.username: user.id for user in new_users}}
+        for employee in employees:
+            employee.user_id = user_ids[employee.contact]
+        Employee.objects.bulk_create(employees)
+        record_bulk_created(Employee, employees)
+        transaction.on_commit(lambda: bump_models(User))
+    result.created += len(employees)
+
+
+def _sales_entries(chunk, result, fields):
+    """Bulk-API entries for sales rows, with contacts resolved to user/captain ids (one query each)"""
+    User = get_user_model()
+    users = dict(User.objects.filter(username__in={record.get('contact') for _, record in chunk})
+                 .values_list('username', 'id'))
+    captains = dict(Captain.objects.filter(user__username__in={record.get('captain') for _, record in chunk})
+                    .values_list('user__username', 'id'))
+
+    entries, numbers = [], []
+    for number, record in chunk:
+        if record.get('contact') not in users:
+            result.error(number, {'contact': [f'No user with contact {record.get("contact")!r}.']})
+        elif record.get('captain') not in captains:
+            result.error(number, {'captain': [f'No captain with contact {record.get("captain")!r}.']})
+        else:
+            entry = {field: record[field] for field in fields if record.get(field) not in (None, '')}
+            entries.append({**entry, 'user': users[record['contact']], 'captain': captains[record['captain']]})
+            numbers.append(number)
+    return entries, numbers
+
+
+def _report_errors(errors, numbers, result):
+    for error in errors:
+        result.error(numbers[error['index']], error['errors'])
+
+
+def _fuel_chunk(chunk, result, context):
+    entries, numbers = _sales_entries(chunk, result, ('date', 'pump', 'pms_sales', 'dx_sales', 'vp_sales'))
+    created, errors = create_fuel_sales(entries, None)
+    result.created += len(created)
+    _report_errors(errors, numbers, result)
+
+
+def _shop_chunk(chunk, result, context):
+    entries, numbers = _sales_entries(chunk, result, ('date', 'sales'))
+    inserted, updated, errors = upsert_shop_sales(entries, None)
+    result.created += inserted
+    result.updated += updated
+    _report_errors(errors, numbers, result)
+
+
+IMPORTERS = {
+    'employees': _employee_chunk,
+    'fuel-sales': _fuel_chunk,
+    'shop-sales': _shop_chunk,
+}
+
+
+def import_excel(source, kind, chunk_size=1000, progress=None, password=None):
+    """
+    Import the first sheet of an .xlsx file.
+
+    Args:
+        source: path or file object (e.g. an uploaded file)
+        kind (str): one of IMPORTERS
+        chunk_size (int): rows written per transaction
+        progress: optional callable(result) run after each chunk
+        password (str): initial password of new employees (default: see initial_password)
+
+    Returns:
+        ImportResult
+    """
+    write_chunk = IMPORTERS[kind]
+    result = ImportResult()
+    # one hash for the whole file: PBKDF2 per user would dominate the import
+    context = {'seen': set(), 'password': make_password(initial_password(password)) if kind == 'employees' else None}
+
+    rows = read_sheet(source)
+    while chunk := list(islice(rows, chunk_size)):
+        result.rows += len(chunk)
+        write_chunk(chunk, result, context)
+        result.seconds = time.perf_counter() - result.started
+        if progress:
+            progress(result)
+
+    result.seconds = time.perf_counter() - result.started
+    return result
@@ -0,0 +1,134 @@
+"""
+Background performance recomputes triggered by PumpTarget/ShopTarget changes.
+
+A target edit enqueues a RecomputeJob scoped to the affected (site, pump) for
+fuel or site for shop. Edits that arrive while an identical job is still
+queued are folded into it. Jobs run after the admin's transaction commits,
+on a per-process worker thread, using the chunked engine in
+employee/recompute.py.
+
+A running job renews ``heartbeat_at`` after every chunk. One whose heartbeat
+is older than RECOMPUTE_JOB_LEASE seconds was left behind by a crashed or
+restarted process: the next poll (any worker, or ``manage.py
+run_recompute_jobs``) requeues it and it resumes from ``last_id``. Failed
+jobs are requeued with ``run_recompute_jobs --retry-failed``.
+"""
+import logging
+import threading
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import connection, transaction
+from django.db.models import F
+from django.utils import timezone
+
+from .models import RecomputeJob
+from .recompute import recompute_fuel_performance, recompute_shop_performance
+
+
+logger = logging.getLogger(__name__)
+
+_worker_lock = threading.Lock()
+_worker = None
+_pending = threading.Event()
+
+
+def enqueue_recompute(kind, site, pump=''):
+    """Queue a recompute for one scope, reusing a job that is still queued for it"""
+    job = RecomputeJob.objects.filter(kind=kind, site=site, pump=pump or '', status='queued').first()
+    if job:
+        RecomputeJob.objects.filter(pk=job.pk).update(requests=F('requests') + 1)
+    else:
+        job = RecomputeJob.objects.create(kind=kind, site=site, pump=pump or '')
+
+    transaction.on_commit(start_worker)
+    return job
+
+
+def start_worker():
+    """Run queued jobs on this process's worker thread (or inline when RECOMPUTE_JOBS_ASYNC is off)"""
+    global _worker
+
+    if not getattr(settings, 'RECOMPUTE_JOBS_ASYNC', True):
+        run_pending_jobs()
+        return
+
+    with _worker_lock:
+        _pending.set()
+        if _worker is None or not _worker.is_alive():
+            _worker = threading.Thread(target=_work, name='recompute-jobs', daemon=True)
+            _worker.start()
+
+
+def _work():
+    try:
+        while True:
+            _pending.clear()
+            try:
+                run_pending_jobs()
+            except Exception:
+                # e.g. the database went away; run_recompute_jobs --retry-failed picks the job up again
+                logger.exception('Recompute worker stopped')
+                return
+            with _worker_lock:
+                if not _pending.is_set():
+                    return
+    finally:
+        connection.close()
+
+
+def requeue_abandoned_jobs():
+    """Requeue running jobs whose worker stopped renewing the lease; returns how many"""
+    expired = timezone.now() - timedelta(seconds=getattr(settings, 'RECOMPUTE_JOB_LEASE', 600))
+    requeued = RecomputeJob.objects.filter(status='running', heartbeat_at__lt=expired).update(status='queued')
+    if requeued:
+        logger.warning('Requeued %s abandoned recompute jobs', requeued)
+    return requeued
+
+
+def _claim_next():
+    """Mark the oldest queued job as running; None when the queue is empty"""
+    requeue_abandoned_jobs()
+    while True:
+        job = RecomputeJob.objects.filter(status='queued').order_by('id').first()
+        if job is None:
+            return None
+        claimed_at = timezone.now()
+        claimed = RecomputeJob.objects.filter(pk=job.pk, status='queued').update(
+            status='running', started_at=claimed_at, heartbeat_at=claimed_at
+        )
+        if claimed:
+            job.refresh_from_db()
+            return job
+
+
+def run_job(job):
+    """Run one claimed job, recording progress so a failed job can resume from ``last_id``"""
+    def progress(processed, updated, last_id):
+        RecomputeJob.objects.filter(pk=job.pk).update(
+            processed=job.processed + processed, updated=job.updated + updated, last_id=last_id,
+            heartbeat_at=timezone.now(),
+        )
+
+    scope = {'site': job.site, 'start_after': job.last_id, 'progress': progress}
+    try:
+        if job.kind == 'fuel':
+            recompute_fuel_performance(pump=job.pump or None, **scope)
+        else:
+            recompute_shop_performance(**scope)
+    except Exception as e:
+        logger.exception('Recompute job %s failed', job.pk)
+        RecomputeJob.objects.filter(pk=job.pk).update(status='failed', error=str(e), finished_at=timezone.now())
+    else:
+        RecomputeJob.objects.filter(pk=job.pk).update(status='done', error='', finished_at=timezone.now())
+
+
+def run_pending_jobs():
+    """Drain the queue; returns the number of jobs run"""
+    count = 0
+    while True:
+        job = _claim_next()
+        if job is None:
+            return count
+        run_job(job)
+        count += 1
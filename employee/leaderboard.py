@@ -0,0 +1,124 @@
+"""
+Site leaderboard: attendants ranked on fuel performance, shop performance,
+evaluation and attendance over one period, in a single query.
+
+Each metric is grouped once in its own CTE (fuel/shop from the daily rollups,
+evaluation/attendance from the raw score rows), the CTEs are LEFT JOINed onto
+the site's active attendants, and RANK() / PERCENT_RANK() windows rank every
+metric. Attendants without data for a metric get no rank for it: the windows
+are partitioned on ``metric IS NULL`` so they do not push down the others'
+percent ranks. The top-N cut is a plain LIMIT after the windows.
+
+The SQL sticks to what SQLite and PostgreSQL both support; table and column
+names come from the models.
+"""
+from django.db import connection
+
+from .models import (AttendanceDate, AttendanceRegister, AttendantEvaluation, Employee, FuelSalesDaily,
+                     ShopSalesDaily, WeeklyEvaluation)
+
+
+METRICS = ('fuel', 'shop', 'evaluation', 'attendance')
+ATTENDANT_JOBS = ('customer_champion', 'service_champion')
+
+
+def _table(model):
+    return connection.ops.quote_name(model._meta.db_table)
+
+
+def _column(model, field):
+    return connection.ops.quote_name(model._meta.get_field(field).column)
+
+
+def _rollup_cte(name, rollup):
+    """Performance average per user from the sales rollups at the site"""
+    user, site, day = (_column(rollup, field) for field in ('user', 'site', 'day'))
+    return f'''{name} AS (
+        SELECT {user} AS user_id,
+               SUM({_column(rollup, 'performance_sum')}) * 1.0 / NULLIF(SUM({_column(rollup, 'performance_count')}), 0) AS score
+        FROM {_table(rollup)}
+        WHERE {site} = %(site)s AND {day} >= %(start)s AND {day} < %(end)s
+        GROUP BY {user}
+    )'''
+
+
+def _score_cte(name, model, parent_field, score_field, parent):
+    """Average score per employee for score rows whose dated parent falls in the period"""
+    attendant = _column(model, 'attendant')
+    return f'''{name} AS (
+        SELECT s.{attendant} AS employee_id, AVG(s.{_column(model, score_field)}) AS score
+        FROM {_table(model)} s
+        JOIN {_table(parent)} p ON p.{_column(parent, 'id')} = s.{_column(model, parent_field)}
+        WHERE p.{_column(parent, 'date')} >= %(start)s AND p.{_column(parent, 'date')} < %(end)s
+        GROUP BY s.{attendant}
+    )'''
+
+
+def _rank_columns(metric):
+    partition = f'PARTITION BY ({metric}.score IS NULL) ORDER BY {metric}.score DESC'
+    return (
+        f'{metric}.score AS {metric}_score, '
+        f'CASE WHEN {metric}.score IS NULL THEN NULL ELSE RANK() OVER ({partition}) END AS {metric}_rank, '
+        f'CASE WHEN {metric}.score IS NULL THEN NULL ELSE PERCENT_RANK() OVER ({partition}) END AS {metric}_percent_rank'
+    )
+
+
+def leaderboard_sql(order_by):
+    """The leaderboard query, ordered by ``order_by``'s rank (unranked attendants last)"""
+    e = {field: _column(Employee, field) for field in ('id', 'user', 'name', 'job_description', 'site', 'status')}
+    ctes = ',\n'.join([
+        _rollup_cte('fuel', FuelSalesDaily),
+        _rollup_cte('shop', ShopSalesDaily),
+        _score_cte('evaluation', AttendantEvaluation, 'weekly_evaluation', 'percentage_score', WeeklyEvaluation),
+        _score_cte('attendance', AttendanceRegister, 'attendance_date', 'percentage_mark', AttendanceDate),
+    ])
+    return f'''
+    WITH {ctes}
+    SELECT e.{e['id']}, e.{e['user']}, e.{e['name']}, e.{e['job_description']},
+           {', '.join(_rank_columns(metric) for metric in METRICS)}
+    FROM {_table(Employee)} e
+    LEFT JOIN fuel ON fuel.user_id = e.{e['user']}
+    LEFT JOIN shop ON shop.user_id = e.{e['user']}
+    LEFT JOIN evaluation ON evaluation.employee_id = e.{e['id']}
+    LEFT JOIN attendance ON attendance.employee_id = e.{e['id']}
+    WHERE e.{e['site']} = %(site)s AND e.{e['status']} = 'active'
+      AND e.{e['job_description']} IN ({', '.join(f"'{job}'" for job in ATTENDANT_JOBS)})
+    ORDER BY {order_by}_rank NULLS LAST, e.{e['name']}, e.{e['id']}
+    LIMIT %(limit)s
+    '''
+
+
+def _round(value, digits):
+    return None if value is None else round(float(value), digits)
+
+
+def site_leaderboard(site, period, order_by='fuel', limit=10):
+    """Top ``limit`` attendants of ``site`` over ``period``, ranked on ``order_by``"""
+    if order_by not in METRICS:
+        raise ValueError(f'Unknown leaderboard metric: {order_by!r}')
+
+    params = {
+        'site': site,
+        'start': connection.ops.adapt_datefield_value(period.start),
+        'end': connection.ops.adapt_datefield_value(period.end),
+        'limit': limit,
+    }
+    with connection.cursor() as cursor:
+        cursor.execute(leaderboard_sql(order_by), params)
+        rows = cursor.fetchall()
+
+    results = []
+    for employee_id, user_id, name, job_description, *ranks in rows:
+        entry = {'employee_id': employee_id, 'user_id': user_id, 'name': name, 'job_description': job_description}
+        for index, metric in enumerate(METRICS):
+            score, rank, percent_rank = ranks[3 * index:3 * index + 3]
+            entry[metric] = {'score': _round(score, 2), 'rank': rank, 'percent_rank': _round(percent_rank, 4)}
+        results.append(entry)
+
+    return {
+        'site': site,
+        'period': {'label': period.label, 'start': period.start, 'end': period.last_day},
+        'order_by': order_by,
+        'limit': limit,
+        'results': results,
+    }
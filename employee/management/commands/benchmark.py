@@ -0,0 +1,32 @@
+import time
+from django.core.management.base import BaseCommand, CommandError
+from employee.benchmarks import SCENARIOS
+
+
+class Command(BaseCommand):
+    help = 'Time query scenarios on a generated dataset (everything is rolled back afterwards)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('scenarios', nargs='*', help='Scenarios to run (default: all); see --list')
+        parser.add_argument('--list', action='store_true', help='List the available scenarios')
+        parser.add_argument('--years', type=int, default=3, help='Years of generated daily data')
+        parser.add_argument('--attendants', type=int, default=60)
+        parser.add_argument('--repeat', type=int, default=20, help='Timed runs per query')
+        parser.add_argument('--seed', type=int, default=1)
+
+    def handle(self, *args, **options):
+        if options['list']:
+            for name, func in SCENARIOS.items():
+                self.stdout.write(f'{name:<20} {func.help}')
+            return
+
+        names = options['scenarios'] or list(SCENARIOS)
+        unknown = [name for name in names if name not in SCENARIOS]
+        if unknown:
+            raise CommandError(f'Unknown scenario(s): {", ".join(unknown)}. Use --list to see them.')
+
+        for name in names:
+            self.stdout.write(self.style.MIGRATE_HEADING(f'== {name} =='))
+            started = time.perf_counter()
+            SCENARIOS[name](options, self.stdout.write)
+            self.stdout.write(self.style.SUCCESS(f'✅ {name} finished in {time.perf_counter() - started:.1f}s'))
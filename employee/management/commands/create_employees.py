@@ -1,63 +1,137 @@
 # your_app/management/commands/create_employees.py
 
 import json
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from itertools import islice
+
 from django.core.management.base import BaseCommand
 from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import make_password
 from django.db import transaction
 from employee.models import Employee
+from employee.caching import bump_models
+from employee.functions import iter_json_records
+from employee.importers import initial_password
+from employee.rollups import record_bulk_created
+
+
+def _setup_worker():
+    # spawned workers (macOS/Windows) start without Django configured; forked ones already have it
+    import django
+    django.setup()
+
 
 class Command(BaseCommand):
     help = 'Bulk create users and employees from JSON file'
 
+    def add_arguments(self, parser):
+        parser.add_argument('--file', default='data_json/employees_data.json', help='JSON list of employees')
+        parser.add_argument('--chunk-size', type=int, default=500, help='Employees hashed and written per transaction')
+        parser.add_argument('--workers', type=int, default=os.cpu_count() or 1,
+                            help='Processes hashing passwords (default: one per CPU; 1 hashes in this process)')
+        parser.add_argument('--initial-password',
+                            help='Password of new users, changed at first login (default: settings.INITIAL_PASSWORD; '
+                                 'unset: unusable until an admin sets one)')
+        parser.add_argument('--shared-hash', action='store_true',
+                            help='Hash the initial password once and give every new user that hash (seconds instead '
+                                 'of minutes; users share one salt until the forced change at first login)')
+
     def handle(self, *args, **kwargs):
         try:
-            with open('data_json/employees_data.json', 'r') as f:
-                employees_list = json.load(f)
-            self.bulk_create_employees(employees_list)
+            with open(kwargs['file'], 'r') as f:
+                self.bulk_create_employees(iter_json_records(f), kwargs['chunk_size'], kwargs['workers'],
+                                           kwargs['shared_hash'], kwargs['initial_password'])
         except FileNotFoundError:
-            self.stdout.write(self.style.ERROR("❌ File not found: data_json/employees_data.json"))
+            self.stdout.write(self.style.ERROR(f"❌ File not found: {kwargs['file']}"))
         except json.JSONDecodeError:
             self.stdout.write(self.style.ERROR("❌ Invalid JSON format."))
 
-    def bulk_create_employees(self, employees_list):
+    def bulk_create_employees(self, employees, chunk_size=500, workers=1, shared_hash=False, password=None):
+        """
+        Create users and employees ``chunk_size`` at a time from an iterable of employee dicts.
+
+        New users get the initial password (see employee.importers.initial_password) and must change it at
+        their first login, which is also what makes a shared hash acceptable.
+        """
+        started = time.perf_counter()
+        self.hashing_seconds = 0.0
+        self.workers = workers
+        self.processed_contacts = set()
+        self.password = initial_password(password)
+        users_created = employees_created = 0
+
+        # worker processes only pay off for per-user hashes (unusable ones cost nothing, a shared one is hashed once)
+        hashing = self.password is not None and not shared_hash
+        pool = ProcessPoolExecutor(workers, initializer=_setup_worker) if hashing and workers > 1 else None
+        # PBKDF2 at Django's iteration count is most of the run; hash once when the salt may be shared
+        self.shared_password = make_password(self.password) if shared_hash else None
+        try:
+            employees = iter(employees)
+            while chunk := list(islice(employees, chunk_size)):
+                users, staff = self.create_chunk(chunk, pool)
+                users_created += users
+                employees_created += staff
+                self.stdout.write(f"… {users_created} users / {employees_created} employees "
+                                  f"({time.perf_counter() - started:.1f}s)")
+        finally:
+            if pool:
+                pool.shutdown()
+
+        seconds = time.perf_counter() - started
+        hashed_by = 'one shared hash' if shared_hash else f'{workers if pool else 1} worker{"s" if pool else ""}'
+        self.stdout.write(self.style.SUCCESS(
+            f"✅ Successfully created {users_created} users and {employees_created} employees in {seconds:.1f}s "
+            f"({employees_created / seconds if seconds else 0:.0f} employees/s; "
+            f"password hashing {self.hashing_seconds:.1f}s with {hashed_by})."))
+
+    def hash_passwords(self, count, pool):
+        """``count`` hashes of the initial password, each with its own salt unless --shared-hash"""
+        started = time.perf_counter()
+        if self.shared_password:
+            hashes = [self.shared_password] * count
+        elif pool:
+            per_task = max(1, count // (self.workers * 4))
+            hashes = list(pool.map(make_password, [self.password] * count, chunksize=per_task))
+        else:
+            hashes = [make_password(self.password) for _ in range(count)]
+        self.hashing_seconds += time.perf_counter() - started
+        return hashes
+
+    def create_chunk(self, employees_list, pool):
         User = get_user_model()
-        new_users = []
-        new_employees = []
+        contacts = [e['contact'] for e in employees_list]
 
         # Fetch existing usernames from the database
-        existing_usernames = set(User.objects.filter(
-            username__in=[e['contact'] for e in employees_list]
-        ).values_list('username', flat=True))
+        existing_usernames = set(User.objects.filter(username__in=contacts).values_list('username', flat=True))
 
         # Fetch usernames of users who already have employees
         existing_employee_usernames = set(Employee.objects.filter(
-            user__username__in=[e['contact'] for e in employees_list]
+            user__username__in=contacts
         ).values_list('user__username', flat=True))
 
-        processed_contacts = set(existing_usernames)
+        new_contacts = []
+        for contact in contacts:
+            if contact in existing_usernames or contact in self.processed_contacts:
+                self.stdout.write(self.style.WARNING(
+                    f"⚠️ User {contact} already exists or is duplicated. Skipping user creation."))
+                continue
+            new_contacts.append(contact)
+            self.processed_contacts.add(contact)
 
-        with transaction.atomic():
-            # Create new users
-            for data in employees_list:
-                contact = data['contact']
-                if contact in processed_contacts:
-                    self.stdout.write(self.style.WARNING(
-                        f"⚠️ User {contact} already exists or is duplicated. Skipping user creation."))
-                    continue
-
-                user = User(username=contact)
-                user.set_password('ofankor@25')
-                new_users.append(user)
-                processed_contacts.add(contact)
+        # hashed before the transaction opens, so it stays short
+        new_users = [User(username=contact, password=password, must_change_password=True)
+                     for contact, password in zip(new_contacts, self.hash_passwords(len(new_contacts), pool))]
 
-            created_users = User.objects.bulk_create(new_users)
+        with transaction.atomic():
+            User.objects.bulk_create(new_users)
 
             # Build user mapping
-            user_map = {u.username: u for u in User.objects.filter(
-                username__in=[e['contact'] for e in employees_list]
-            )}
+            user_map = {u.username: u for u in User.objects.filter(username__in=contacts)}
 
             # Create employees
+            new_employees = []
             for data in employees_list:
                 contact = data['contact']
 
@@ -68,6 +142,7 @@ class Command(BaseCommand):
                     self.stdout.write(self.style.WARNING(
                         f"⚠️ Employee for user {contact} already exists. Skipping employee creation."))
                     continue
+                existing_employee_usernames.add(contact)  # duplicated rows in the file
 
                 employee = Employee(
                     user=user_map[contact],
@@ -91,6 +166,7 @@ class Command(BaseCommand):
 
             if new_employees:
                 Employee.objects.bulk_create(new_employees)
+                record_bulk_created(Employee, new_employees)
+            transaction.on_commit(lambda: bump_models(User))
 
-            self.stdout.write(self.style.SUCCESS(
-                f"✅ Successfully created {len(new_users)} users and {len(new_employees)} employees."))
+        return len(new_users), len(new_employees)
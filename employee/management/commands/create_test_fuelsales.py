@@ -5,6 +5,9 @@ from django.core.management.base import BaseCommand
 from django.contrib.auth import get_user_model
 from django.db import transaction
 from employee.models import FuelSales, Captain, PumpTarget
+from employee.rollups import record_fuel_sales
+from employee.recompute import recompute_imported
+from employee.targets import stamp_sites
 from decimal import Decimal, ROUND_HALF_UP
 from django.db.models import Sum
 from collections import defaultdict
@@ -119,9 +122,14 @@ class Command(BaseCommand):
             
             # Bulk create in batches
             batch_size = 1000
+            stamp_sites(unique_records)
             for i in range(0, len(unique_records), batch_size):
                 FuelSales.objects.bulk_create(unique_records[i:i + batch_size])
 
+            # bulk_create skips save(), so feed the daily rollups and fill in performance directly
+            record_fuel_sales(unique_records)
+            recompute_imported(FuelSales, unique_records)
+
         # ===== 4. Output Results =====
         self.stdout.write(self.style.SUCCESS(
             f'Created {len(unique_records)} records\n'
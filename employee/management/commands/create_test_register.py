@@ -4,6 +4,8 @@ from django.core.management.base import BaseCommand
 from django.utils import timezone
 from django.db import transaction
 from employee.models import AttendanceDate, AttendanceRegister, Employee
+from employee.caching import bump_models, bump_scopes
+from employee.rollups import record_bulk_created
 
 class Command(BaseCommand):
     help = 'Generate bulk attendance/punctuality data for employees'
@@ -20,6 +22,7 @@ class Command(BaseCommand):
 
         records_created = 0
         current_date = start_date
+        created = []
 
         with transaction.atomic():
             while current_date <= end_date:
@@ -42,16 +45,25 @@ class Command(BaseCommand):
                         AttendanceRegister(
                             attendance_date=attendance_date,
                             attendant=employee,
-                            raw_score=raw_score
+                            raw_score=raw_score,
+                            percentage_mark=round((raw_score / 2) * 100, 2),  # bulk_create skips save()
                         )
                     )
 
                 # Bulk insert for this day
                 AttendanceRegister.objects.bulk_create(attendance_records, batch_size=1000)
+                created.extend(attendance_records)
 
                 records_created += len(attendance_records)
                 current_date += timedelta(days=1)
 
+            # quarterly scorecards, in one pass over the whole batch
+            record_bulk_created(AttendanceRegister, created)
+
+        # bulk_create skips the signals that invalidate cached summaries and list ETags
+        bump_models(AttendanceDate)
+        bump_scopes('attendance')
+
         self.stdout.write(self.style.SUCCESS(
             f'Successfully created {records_created} attendance records\n'
             f'Covering {employees.count()} employees from '
@@ -5,6 +5,9 @@ from django.core.management.base import BaseCommand
 from django.contrib.auth import get_user_model
 from django.db import transaction
 from employee.models import ShopSales, Captain, ShopTarget
+from employee.rollups import record_shop_sales
+from employee.recompute import recompute_imported
+from employee.targets import stamp_sites
 from django.db.models import Q
 from decimal import Decimal, ROUND_HALF_UP
 from collections import defaultdict
@@ -126,9 +129,14 @@ class Command(BaseCommand):
             
             # Bulk create in batches
             batch_size = 1000
+            stamp_sites(unique_records)
             for i in range(0, len(unique_records), batch_size):
                 ShopSales.objects.bulk_create(unique_records[i:i + batch_size])
 
+            # bulk_create skips save(), so feed the daily rollups and fill in performance directly
+            record_shop_sales(unique_records)
+            recompute_imported(ShopSales, unique_records)
+
         # ===== 4. Output Results =====
         self.stdout.write(self.style.SUCCESS(
             f'Created {len(unique_records)} ShopSales records\n'
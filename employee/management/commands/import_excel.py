@@ -0,0 +1,42 @@
+import os
+import tracemalloc
+
+from django.core.management.base import BaseCommand, CommandError
+from employee.importers import IMPORTERS, import_excel
+
+
+class Command(BaseCommand):
+    help = 'Stream employees or fuel/shop sales from the first sheet of an .xlsx file into the database'
+
+    def add_arguments(self, parser):
+        parser.add_argument('kind', choices=list(IMPORTERS))
+        parser.add_argument('file', help='Path to the .xlsx file')
+        parser.add_argument('--chunk-size', type=int, default=1000, help='Rows written per transaction')
+        parser.add_argument('--initial-password',
+                            help='Password of new employees, changed at first login (default: settings.INITIAL_PASSWORD)')
+        parser.add_argument('--trace-memory', action='store_true', help='Report the peak Python memory of the import')
+
+    def handle(self, *args, **options):
+        if not os.path.exists(options['file']):
+            raise CommandError(f"File not found: {options['file']}")
+
+        def progress(result):
+            self.stdout.write(f'  {result.rows} rows, {result.rows_per_second:.0f} rows/s')
+
+        if options['trace_memory']:
+            tracemalloc.start()
+        result = import_excel(options['file'], options['kind'], options['chunk_size'], progress,
+                              options['initial_password'])
+        peak = tracemalloc.get_traced_memory()[1] / 2 ** 20 if options['trace_memory'] else None
+        tracemalloc.stop()
+
+        for error in result.errors:
+            self.stdout.write(self.style.WARNING(f"⚠️ Row {error['row']}: {error['errors']}"))
+        if result.failed > len(result.errors):
+            self.stdout.write(self.style.WARNING(f'⚠️ ... {result.failed - len(result.errors)} more failed rows'))
+
+        self.stdout.write(self.style.SUCCESS(
+            f'✅ {result.rows} rows in {result.seconds:.1f}s ({result.rows_per_second:.0f} rows/s): '
+            f'{result.created} created, {result.updated} updated, {result.skipped} skipped, {result.failed} failed'
+            + (f', peak memory {peak:.1f} MB' if peak is not None else '')
+        ))
@@ -0,0 +1,34 @@
+from datetime import datetime
+from django.core.management.base import BaseCommand, CommandError
+from employee.rollups import refresh_fuel_rollups, refresh_shop_rollups
+
+
+class Command(BaseCommand):
+    help = 'Rebuild the FuelSalesDaily/ShopSalesDaily rollups from the raw sales tables'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--model', choices=['fuel', 'shop', 'all'], default='all')
+        parser.add_argument('--date-from', help='First day to rebuild (YYYY-MM-DD)')
+        parser.add_argument('--date-to', help='Last day to rebuild (YYYY-MM-DD)')
+        parser.add_argument('--batch-size', type=int, default=1000)
+
+    def handle(self, *args, **options):
+        try:
+            date_from = self.parse_date(options['date_from'])
+            date_to = self.parse_date(options['date_to'])
+        except ValueError as e:
+            raise CommandError(f'Invalid date: {e}')
+
+        scope = {'date_from': date_from, 'date_to': date_to, 'batch_size': options['batch_size']}
+
+        if options['model'] in ('fuel', 'all'):
+            created = refresh_fuel_rollups(**scope)
+            self.stdout.write(self.style.SUCCESS(f'✅ Rebuilt {created} FuelSalesDaily rows'))
+
+        if options['model'] in ('shop', 'all'):
+            created = refresh_shop_rollups(**scope)
+            self.stdout.write(self.style.SUCCESS(f'✅ Rebuilt {created} ShopSalesDaily rows'))
+
+    @staticmethod
+    def parse_date(value):
+        return datetime.strptime(value, '%Y-%m-%d').date() if value else None
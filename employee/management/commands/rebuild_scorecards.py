@@ -0,0 +1,25 @@
+from django.core.management.base import BaseCommand, CommandError
+from employee.scorecards import KINDS, refresh_scorecards
+
+
+class Command(BaseCommand):
+    help = 'Rebuild the QuarterlyScorecard rows from the raw evaluation and attendance tables'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--kind', choices=[*KINDS, 'all'], default='all')
+        parser.add_argument('--year', type=int, help='Only rebuild this year (with --quarter, a single quarter)')
+        parser.add_argument('--quarter', type=int, choices=[1, 2, 3, 4])
+        parser.add_argument('--batch-size', type=int, default=1000)
+
+    def handle(self, *args, **options):
+        year, quarter = options['year'], options['quarter']
+        if quarter and not year:
+            raise CommandError('--quarter needs --year')
+
+        quarters = None
+        if year:
+            quarters = [(year, quarter)] if quarter else [(year, q) for q in range(1, 5)]
+
+        for kind in (KINDS if options['kind'] == 'all' else [options['kind']]):
+            created = refresh_scorecards([kind], quarters=quarters, batch_size=options['batch_size'])
+            self.stdout.write(self.style.SUCCESS(f'✅ Rebuilt {created} {kind} scorecards'))
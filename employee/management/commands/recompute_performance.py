@@ -0,0 +1,59 @@
+from datetime import datetime
+from django.core.management.base import BaseCommand, CommandError
+from employee.models import PUMP_CHOICES, SITE_CHOICES
+from employee.recompute import recompute_fuel_performance, recompute_shop_performance
+
+
+class Command(BaseCommand):
+    help = 'Recompute FuelSales/ShopSales performance in chunks for a site, pump and/or date range'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--model', choices=['fuel', 'shop', 'all'], default='all')
+        parser.add_argument('--site', choices=[s for s, _ in SITE_CHOICES])
+        parser.add_argument('--pump', choices=[p for p, _ in PUMP_CHOICES], help='Fuel sales only')
+        parser.add_argument('--date-from', help='YYYY-MM-DD')
+        parser.add_argument('--date-to', help='YYYY-MM-DD')
+        parser.add_argument('--only-missing', action='store_true', help='Only rows with no performance yet')
+        parser.add_argument('--chunk-size', type=int, default=2000)
+        parser.add_argument('--start-after', type=int, default=0, help='Resume after this id (single model runs)')
+
+    def handle(self, *args, **options):
+        try:
+            date_from = self.parse_date(options['date_from'])
+            date_to = self.parse_date(options['date_to'])
+        except ValueError as e:
+            raise CommandError(f'Invalid date: {e}')
+
+        if options['model'] == 'all' and options['start_after']:
+            raise CommandError('--start-after needs --model fuel or --model shop')
+
+        scope = {
+            'site': options['site'],
+            'date_from': date_from,
+            'date_to': date_to,
+            'only_missing': options['only_missing'],
+            'chunk_size': options['chunk_size'],
+            'start_after': options['start_after'],
+        }
+
+        if options['model'] in ('fuel', 'all'):
+            result = recompute_fuel_performance(pump=options['pump'], progress=self.progress('FuelSales'), **scope)
+            self.report('FuelSales', result)
+
+        if options['model'] in ('shop', 'all'):
+            result = recompute_shop_performance(progress=self.progress('ShopSales'), **scope)
+            self.report('ShopSales', result)
+
+    def progress(self, label):
+        def report(processed, updated, last_id):
+            self.stdout.write(f'{label}: {processed} checked, {updated} updated (last id {last_id})')
+        return report
+
+    def report(self, label, result):
+        self.stdout.write(self.style.SUCCESS(
+            f"✅ {label}: {result['processed']} rows checked, {result['updated']} updated"
+        ))
+
+    @staticmethod
+    def parse_date(value):
+        return datetime.strptime(value, '%Y-%m-%d').date() if value else None
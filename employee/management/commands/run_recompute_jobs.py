@@ -0,0 +1,19 @@
+from django.core.management.base import BaseCommand
+from employee.jobs import run_pending_jobs
+from employee.models import RecomputeJob
+
+
+class Command(BaseCommand):
+    help = 'Run queued performance recompute jobs, including running ones abandoned by a crash or restart'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--retry-failed', action='store_true',
+                            help='Requeue failed jobs and every running one, lease or not; they resume from their last id')
+
+    def handle(self, *args, **options):
+        if options['retry_failed']:
+            requeued = RecomputeJob.objects.filter(status__in=['failed', 'running']).update(status='queued')
+            self.stdout.write(f'Requeued {requeued} jobs')
+
+        count = run_pending_jobs()
+        self.stdout.write(self.style.SUCCESS(f'✅ Ran {count} recompute jobs'))
@@ -0,0 +1,94 @@
+# Generated by Django 5.2.1 on 2026-10-18 13:42
+
+import django.db.models.deletion
+from django.conf import settings
+from decimal import Decimal
+from django.db import migrations, models
+from django.db.models import Count, Sum, Value
+from django.db.models.functions import Coalesce
+
+
+def backfill_rollups(apps, schema_editor):
+    """Seed the daily rollups from the existing sales rows"""
+    for source_name, rollup_name, group_by, sums in (
+        ('FuelSales', 'FuelSalesDaily', ('captain', 'user', 'pump', 'date'), ('pms_sales', 'dx_sales', 'vp_sales')),
+        ('ShopSales', 'ShopSalesDaily', ('captain', 'user', 'date'), ('sales',)),
+    ):
+        source = apps.get_model('employee', source_name)
+        rollup = apps.get_model('employee', rollup_name)
+        rows = (
+            source.objects.annotate(rollup_site=Coalesce('user__employee_profile__site', Value('')))
+            .values('rollup_site', *group_by)
+            .annotate(
+                **{f'sum_{field}': Sum(field) for field in sums},
+                performance_sum=Coalesce(Sum('performance'), Decimal('0.00')),
+                performance_count=Count('performance'),
+                entries=Count('id'),
+            )
+            .order_by()
+        )
+        batch = []
+        for row in rows.iterator(chunk_size=1000):
+            batch.append(rollup(
+                site=row['rollup_site'], day=row['date'],
+                captain_id=row['captain'], user_id=row['user'],
+                performance_sum=row['performance_sum'],
+                performance_count=row['performance_count'],
+                entries=row['entries'],
+                **({'pump': row['pump']} if 'pump' in row else {}),
+                **{field: row[f'sum_{field}'] for field in sums},
+            ))
+            if len(batch) >= 1000:
+                rollup.objects.bulk_create(batch)
+                batch = []
+        rollup.objects.bulk_create(batch)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('employee', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='FuelSalesDaily',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('site', models.CharField(blank=True, choices=[('ofankor', 'Ofankor'), ('palmwine', 'Palmwine'), ('eastlegon', 'East Legon'), ('achimota_ksi', 'Achimota KSI'), ('achimota_abofu', 'Achimota Abofu'), ('bohye', 'Bohye'), ('airport', 'Airport')], default='', max_length=15)),
+                ('pump', models.CharField(choices=[('pump1', 'Pump 1'), ('pump2', 'Pump 2'), ('pump3', 'Pump 3'), ('pump4', 'Pump 4'), ('pump5', 'Pump 5')], max_length=10)),
+                ('day', models.DateField()),
+                ('pms_sales', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('dx_sales', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('vp_sales', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('performance_sum', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('performance_count', models.PositiveIntegerField(default=0)),
+                ('entries', models.PositiveIntegerField(default=0)),
+                ('captain', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='fuel_sales_daily', to='employee.captain')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='fuel_sales_daily', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['site', 'day'], name='employee_fu_site_da691a_idx'), models.Index(fields=['user', 'day'], name='employee_fu_user_id_20092b_idx')],
+                'unique_together': {('site', 'captain', 'user', 'pump', 'day')},
+            },
+        ),
+        migrations.CreateModel(
+            name='ShopSalesDaily',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('site', models.CharField(blank=True, choices=[('ofankor', 'Ofankor'), ('palmwine', 'Palmwine'), ('eastlegon', 'East Legon'), ('achimota_ksi', 'Achimota KSI'), ('achimota_abofu', 'Achimota Abofu'), ('bohye', 'Bohye'), ('airport', 'Airport')], default='', max_length=15)),
+                ('day', models.DateField()),
+                ('sales', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('performance_sum', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('performance_count', models.PositiveIntegerField(default=0)),
+                ('entries', models.PositiveIntegerField(default=0)),
+                ('captain', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='shop_sales_daily', to='employee.captain')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='shop_sales_daily', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['site', 'day'], name='employee_sh_site_54e4e7_idx'), models.Index(fields=['user', 'day'], name='employee_sh_user_id_593c40_idx')],
+                'unique_together': {('site', 'captain', 'user', 'day')},
+            },
+        ),
+        migrations.RunPython(backfill_rollups, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,34 @@
+# Generated by Django 5.2.1 on 2026-10-18 13:47
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('employee', '0002_sales_daily_rollups'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RecomputeJob',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('kind', models.CharField(choices=[('fuel', 'Fuel Sales'), ('shop', 'Shop Sales')], max_length=10)),
+                ('site', models.CharField(choices=[('ofankor', 'Ofankor'), ('palmwine', 'Palmwine'), ('eastlegon', 'East Legon'), ('achimota_ksi', 'Achimota KSI'), ('achimota_abofu', 'Achimota Abofu'), ('bohye', 'Bohye'), ('airport', 'Airport')], max_length=15)),
+                ('pump', models.CharField(blank=True, choices=[('pump1', 'Pump 1'), ('pump2', 'Pump 2'), ('pump3', 'Pump 3'), ('pump4', 'Pump 4'), ('pump5', 'Pump 5')], default='', max_length=10)),
+                ('status', models.CharField(choices=[('queued', 'Queued'), ('running', 'Running'), ('done', 'Done'), ('failed', 'Failed')], default='queued', max_length=10)),
+                ('requests', models.PositiveIntegerField(default=1)),
+                ('processed', models.PositiveIntegerField(default=0)),
+                ('updated', models.PositiveIntegerField(default=0)),
+                ('last_id', models.BigIntegerField(default=0)),
+                ('error', models.TextField(blank=True, default='')),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('started_at', models.DateTimeField(blank=True, null=True)),
+                ('finished_at', models.DateTimeField(blank=True, null=True)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['status', 'kind', 'site', 'pump'], name='employee_re_status_e239a1_idx')],
+            },
+        ),
+    ]
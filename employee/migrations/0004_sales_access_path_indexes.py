@@ -0,0 +1,65 @@
+# Generated by Django 5.2.1 on 2026-10-18 13:58
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('employee', '0003_recompute_job'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='attendance',
+            index=models.Index(fields=['date'], name='attendance_date_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='attendanceregister',
+            index=models.Index(fields=['attendant', 'attendance_date'], include=('percentage_mark',), name='register_attendant_date_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='attendantevaluation',
+            index=models.Index(fields=['attendant', 'weekly_evaluation'], include=('percentage_score',), name='evaluation_attendant_week_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='captain',
+            index=models.Index(fields=['site'], name='captain_site_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='creditcollection',
+            index=models.Index(fields=['-date', '-id'], name='creditcollection_date_id_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='creditsales',
+            index=models.Index(fields=['-date', '-id'], name='creditsales_date_id_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='employee',
+            index=models.Index(fields=['site', 'status', 'job_description'], name='employee_site_status_job_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='fuelsales',
+            index=models.Index(fields=['user', 'date'], include=('pms_sales', 'dx_sales', 'vp_sales', 'performance'), name='fuelsales_user_date_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='fuelsales',
+            index=models.Index(fields=['captain', 'date'], include=('pms_sales', 'dx_sales', 'vp_sales'), name='fuelsales_captain_date_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='fuelsales',
+            index=models.Index(fields=['-date', '-id'], name='fuelsales_date_id_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='shopsales',
+            index=models.Index(fields=['captain', 'date'], include=('sales',), name='shopsales_captain_date_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='shopsales',
+            index=models.Index(fields=['-date', '-id'], name='shopsales_date_id_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='weeklyevaluation',
+            index=models.Index(fields=['date'], name='weeklyevaluation_date_idx'),
+        ),
+    ]
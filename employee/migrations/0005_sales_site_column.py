@@ -0,0 +1,42 @@
+# Generated by Django 5.2.1 on 2026-10-18 14:01
+
+from django.db import migrations, models
+
+
+def backfill_sales_sites(apps, schema_editor):
+    """Attribute existing sales to their user's current site (one UPDATE per site and table)"""
+    Employee = apps.get_model('employee', 'Employee')
+    sites = Employee.objects.exclude(user=None).values_list('site', flat=True).distinct()
+    for model_name in ('FuelSales', 'ShopSales'):
+        model = apps.get_model('employee', model_name)
+        for site in sites:
+            model.objects.filter(user__employee_profile__site=site).update(site=site)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('employee', '0004_sales_access_path_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='fuelsales',
+            name='site',
+            field=models.CharField(blank=True, choices=[('ofankor', 'Ofankor'), ('palmwine', 'Palmwine'), ('eastlegon', 'East Legon'), ('achimota_ksi', 'Achimota KSI'), ('achimota_abofu', 'Achimota Abofu'), ('bohye', 'Bohye'), ('airport', 'Airport')], default='', editable=False, max_length=15),
+        ),
+        migrations.AddField(
+            model_name='shopsales',
+            name='site',
+            field=models.CharField(blank=True, choices=[('ofankor', 'Ofankor'), ('palmwine', 'Palmwine'), ('eastlegon', 'East Legon'), ('achimota_ksi', 'Achimota KSI'), ('achimota_abofu', 'Achimota Abofu'), ('bohye', 'Bohye'), ('airport', 'Airport')], default='', editable=False, max_length=15),
+        ),
+        migrations.RunPython(backfill_sales_sites, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='fuelsales',
+            index=models.Index(fields=['site', 'date'], include=('pms_sales', 'dx_sales', 'vp_sales', 'performance'), name='fuelsales_site_date_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='shopsales',
+            index=models.Index(fields=['site', 'date'], include=('sales', 'performance'), name='shopsales_site_date_idx'),
+        ),
+    ]
@@ -0,0 +1,59 @@
+# Generated by Django 5.2.1 on 2026-10-18 14:17
+
+import django.db.models.deletion
+from decimal import Decimal
+from django.db import migrations, models
+
+
+def backfill_scorecards(apps, schema_editor):
+    """Seed the quarterly scorecards from the existing evaluations and attendance marks"""
+    scorecard = apps.get_model('employee', 'QuarterlyScorecard')
+    for kind, model_name, date_field, score_field in (
+        ('evaluation', 'AttendantEvaluation', 'weekly_evaluation__date', 'percentage_score'),
+        ('attendance', 'AttendanceRegister', 'attendance_date__date', 'percentage_mark'),
+    ):
+        rows = (
+            apps.get_model('employee', model_name).objects
+            .order_by('attendant_id', f'-{date_field}', '-id')
+            .values_list('attendant_id', date_field, score_field)
+        )
+        cards = {}
+        for employee_id, day, score in rows.iterator(chunk_size=1000):
+            key = (employee_id, day.year, (day.month - 1) // 3 + 1)
+            card = cards.get(key)
+            if card is None:
+                card = cards[key] = scorecard(employee_id=employee_id, kind=kind, year=key[1], quarter=key[2],
+                                              score_sum=Decimal('0.00'), score_count=0, history=[])
+            if score is not None:
+                card.score_sum += Decimal(str(score))
+                card.score_count += 1
+            if len(card.history) < 10:
+                card.history.append({'date': day.isoformat(), 'score': score})
+        scorecard.objects.bulk_create(cards.values(), batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('employee', '0005_sales_site_column'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='QuarterlyScorecard',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('kind', models.CharField(choices=[('evaluation', 'Evaluation'), ('attendance', 'Attendance')], max_length=10)),
+                ('year', models.PositiveSmallIntegerField()),
+                ('quarter', models.PositiveSmallIntegerField()),
+                ('score_sum', models.DecimalField(decimal_places=2, default=0, max_digits=12)),
+                ('score_count', models.PositiveIntegerField(default=0)),
+                ('history', models.JSONField(blank=True, default=list)),
+                ('employee', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='scorecards', to='employee.employee')),
+            ],
+            options={
+                'unique_together': {('employee', 'kind', 'year', 'quarter')},
+            },
+        ),
+        migrations.RunPython(backfill_scorecards, migrations.RunPython.noop),
+    ]
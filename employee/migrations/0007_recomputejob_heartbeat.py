@@ -0,0 +1,26 @@
+# Generated by Django 5.2.1 on 2026-10-18 15:48
+
+from django.db import migrations, models
+from django.db.models import F
+
+
+def seed_heartbeats(apps, schema_editor):
+    """Jobs already running lease from their start, so ones abandoned before this migration are reclaimed too"""
+    RecomputeJob = apps.get_model('employee', 'RecomputeJob')
+    RecomputeJob.objects.filter(status='running').update(heartbeat_at=F('started_at'))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('employee', '0006_quarterly_scorecards'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='recomputejob',
+            name='heartbeat_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.RunPython(seed_heartbeats, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,43 @@
+# Generated by Django 5.2.1 on 2026-10-18 16:00
+
+from collections import defaultdict
+
+from django.db import migrations, models
+
+
+def resum_scorecards(apps, schema_editor):
+    """Recompute the stored sums unrounded (the Decimal sums added up scores rounded to a cent)"""
+    scorecard = apps.get_model('employee', 'QuarterlyScorecard')
+    for kind, model_name, date_field, score_field in (
+        ('evaluation', 'AttendantEvaluation', 'weekly_evaluation__date', 'percentage_score'),
+        ('attendance', 'AttendanceRegister', 'attendance_date__date', 'percentage_mark'),
+    ):
+        rows = (
+            apps.get_model('employee', model_name).objects
+            .exclude(**{score_field: None})
+            .order_by('attendant_id', f'-{date_field}', '-id')
+            .values_list('attendant_id', date_field, score_field)
+        )
+        sums = defaultdict(float)
+        for employee_id, day, score in rows.iterator(chunk_size=1000):
+            sums[(employee_id, day.year, (day.month - 1) // 3 + 1)] += score
+        cards = list(scorecard.objects.filter(kind=kind))
+        for card in cards:
+            card.score_sum = sums.get((card.employee_id, card.year, card.quarter), 0.0)
+        scorecard.objects.bulk_update(cards, ['score_sum'], batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('employee', '0008_scope_versions'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='quarterlyscorecard',
+            name='score_sum',
+            field=models.FloatField(default=0),
+        ),
+        migrations.RunPython(resum_scorecards, migrations.RunPython.noop),
+    ]
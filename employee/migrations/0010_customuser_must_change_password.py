@@ -0,0 +1,18 @@
+# Generated by Django 5.2.1 on 2026-10-18 16:05
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('employee', '0009_scorecard_float_sum'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='customuser',
+            name='must_change_password',
+            field=models.BooleanField(default=False),
+        ),
+    ]
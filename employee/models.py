@@ -15,6 +15,7 @@ class CustomUser(AbstractUser):
     is_manager = models.BooleanField(default=False)
     is_supervisor = models.BooleanField(default=False)
     is_noRole = models.BooleanField(default=True)
+    must_change_password = models.BooleanField(default=False)  # set on imported accounts, cleared at first login
 
     def __str__(self):
         return self.username
@@ -95,6 +96,13 @@ class Employee(models.Model):
     account = models.CharField(max_length=20, default="", null=True, blank=True)
     status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='active')
     site = models.CharField(max_length=15, choices=SITE_CHOICES)
+
+    class Meta:
+        indexes = [
+            # active attendants / captains per site
+            models.Index(fields=['site', 'status', 'job_description'], name='employee_site_status_job_idx'),
+        ]
+
     def __str__(self):
         return self.name
     
@@ -116,6 +124,9 @@ class Captain(models.Model):
     user = models.OneToOneField(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, default="", null=True, blank=True)
     site = models.CharField(max_length=15, choices=SITE_CHOICES)
 
+    class Meta:
+        indexes = [models.Index(fields=['site'], name='captain_site_idx')]
+
     def __str__(self):
         return self.user.username  # or self.user.get_full_name() if you have full name
 
@@ -124,6 +135,8 @@ class Captain(models.Model):
 class FuelSales(models.Model):
     user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE)
     date = models.DateField()
+    # site the sale was entered at, stamped from the user's profile on insert (kept if they transfer)
+    site = models.CharField(max_length=15, choices=SITE_CHOICES, blank=True, default='', editable=False)
     pump = models.CharField(max_length=10, choices=PUMP_CHOICES)
     captain = models.ForeignKey(Captain, on_delete=models.CASCADE, related_name='fuel_sales')
     pms_sales = models.DecimalField(max_digits=12, decimal_places=2, default=0.00)
@@ -136,7 +149,20 @@ class FuelSales(models.Model):
         blank=True,
         editable=False
     )
-    
+
+    class Meta:
+        indexes = [
+            # per-user and per-captain date ranges; INCLUDE makes them covering on PostgreSQL
+            models.Index(fields=['user', 'date'], include=['pms_sales', 'dx_sales', 'vp_sales', 'performance'],
+                         name='fuelsales_user_date_idx'),
+            models.Index(fields=['captain', 'date'], include=['pms_sales', 'dx_sales', 'vp_sales'],
+                         name='fuelsales_captain_date_idx'),
+            # list endpoint keyset ordering
+            models.Index(fields=['-date', '-id'], name='fuelsales_date_id_idx'),
+            # site dashboards
+            models.Index(fields=['site', 'date'], include=['pms_sales', 'dx_sales', 'vp_sales', 'performance'],
+                         name='fuelsales_site_date_idx'),
+        ]
 
     @property
     def total_sales(self):
@@ -148,28 +174,29 @@ class FuelSales(models.Model):
 
     def calculate_performance(self):
         """Calculate and return the performance percentage with proper rounding"""
-        try:
-            site = self.user.employee_profile.site
-            pump_target = PumpTarget.objects.get(site=site, pump=self.pump)
-            if pump_target.target > 0:
-                performance = (Decimal(self.total_sales) / Decimal(pump_target.target)) * 100
-                return performance.quantize(Decimal('.01'), rounding=ROUND_HALF_UP)
-            return Decimal('0.00')
-        except (PumpTarget.DoesNotExist, AttributeError):
-            return None
+        from .targets import get_user_site, get_pump_target, performance_for
+
+        site = self.site or get_user_site(self.user_id)
+        return performance_for(self.total_sales, get_pump_target(site, self.pump))
 
 
     def save(self, *args, **kwargs):
         """Override save to calculate performance before saving"""
+        from .rollups import record_fuel_sales
+        from .targets import stamp_sites
+
+        stamp_sites([self])
         self.performance = self.calculate_performance()
-        super().save(*args, **kwargs)
+        with transaction.atomic():
+            previous = FuelSales.objects.filter(pk=self.pk).first() if self.pk else None
+            super().save(*args, **kwargs)
+            record_fuel_sales([self], removed=[previous] if previous else ())
         
         
-    #for batch updating
-    @transaction.atomic
+    #for batch updating (chunked, see employee/recompute.py)
     def update_existing_performances():
-        for fuel_sale in FuelSales.objects.all():
-            fuel_sale.save()  # This will trigger the performance calculation
+        from .recompute import recompute_fuel_performance
+        return recompute_fuel_performance()
 
     def __str__(self):
         return f'{self.date} - {self.pump}'
@@ -179,6 +206,8 @@ class FuelSales(models.Model):
 class ShopSales(models.Model):
     user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE)
     date = models.DateField()
+    # site the sale was entered at, stamped from the user's profile on insert (kept if they transfer)
+    site = models.CharField(max_length=15, choices=SITE_CHOICES, blank=True, default='', editable=False)
     captain = models.ForeignKey('Captain', on_delete=models.CASCADE, related_name='shop_sales')
     sales = models.DecimalField(max_digits=12, decimal_places=2, default=0.00)
     performance = models.DecimalField(
@@ -191,6 +220,11 @@ class ShopSales(models.Model):
     
     class Meta:
         unique_together = ('user', 'date')
+        indexes = [
+            models.Index(fields=['captain', 'date'], include=['sales'], name='shopsales_captain_date_idx'),
+            models.Index(fields=['-date', '-id'], name='shopsales_date_id_idx'),
+            models.Index(fields=['site', 'date'], include=['sales', 'performance'], name='shopsales_site_date_idx'),
+        ]
 
     @property
     def total_sales(self):
@@ -199,28 +233,31 @@ class ShopSales(models.Model):
     
     def calculate_performance(self):
         """Calculate and return the performance percentage with proper rounding"""
-        try:
-            site = self.user.employee_profile.site
-            shop_target = ShopTarget.objects.get(site=site)
-            if shop_target.target > 0:
-                performance = (Decimal(self.total_sales) / Decimal(shop_target.target)) * 100
-                return performance.quantize(Decimal('.01'), rounding=ROUND_HALF_UP)
-            return Decimal('0.00')
-        except (ShopTarget.DoesNotExist, AttributeError):
-            return None
+        from .targets import get_user_site, get_shop_target, performance_for
+
+        site = self.site or get_user_site(self.user_id)
+        return performance_for(self.total_sales, get_shop_target(site))
     
     
     def save(self, *args, **kwargs):
         """Override save to calculate performance before saving"""
+        from .rollups import lock_sales_users, record_shop_sales
+        from .targets import stamp_sites
+
+        stamp_sites([self])
         self.performance = self.calculate_performance()
-        super().save(*args, **kwargs)
+        with transaction.atomic():
+            if not self.pk:
+                lock_sales_users([self.user_id])  # a bulk upsert may be inserting the same (user, date)
+            previous = ShopSales.objects.filter(pk=self.pk).first() if self.pk else None
+            super().save(*args, **kwargs)
+            record_shop_sales([self], removed=[previous] if previous else ())
         
         
-     #for batch updating
-    @transaction.atomic
+     #for batch updating (chunked, see employee/recompute.py)
     def update_existing_performances():
-        for shop_sale in ShopSales.objects.all():
-            shop_sale.save()  # This will trigger the performance calculation
+        from .recompute import recompute_shop_performance
+        return recompute_shop_performance()
 
     def __str__(self):
         return f'{self.date} - {self.pump}'
@@ -251,6 +288,58 @@ class PumpTarget(models.Model):
 
 
 
+#daily fuel sales rollup (maintained by employee.rollups)
+class FuelSalesDaily(models.Model):
+    site = models.CharField(max_length=15, choices=SITE_CHOICES, blank=True, default='')
+    captain = models.ForeignKey(Captain, on_delete=models.CASCADE, related_name='fuel_sales_daily')
+    user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name='fuel_sales_daily')
+    pump = models.CharField(max_length=10, choices=PUMP_CHOICES)
+    day = models.DateField()
+    pms_sales = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    dx_sales = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    vp_sales = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    performance_sum = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    performance_count = models.PositiveIntegerField(default=0)  # rows with a non-null performance
+    entries = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        unique_together = ('site', 'captain', 'user', 'pump', 'day')
+        indexes = [
+            models.Index(fields=['site', 'day']),
+            models.Index(fields=['user', 'day']),
+        ]
+
+    @property
+    def total_sales(self):
+        return self.pms_sales + self.dx_sales + self.vp_sales
+
+    def __str__(self):
+        return f'{self.day} - {self.site} - {self.pump}'
+
+
+#daily shop sales rollup (maintained by employee.rollups)
+class ShopSalesDaily(models.Model):
+    site = models.CharField(max_length=15, choices=SITE_CHOICES, blank=True, default='')
+    captain = models.ForeignKey(Captain, on_delete=models.CASCADE, related_name='shop_sales_daily')
+    user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name='shop_sales_daily')
+    day = models.DateField()
+    sales = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    performance_sum = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    performance_count = models.PositiveIntegerField(default=0)
+    entries = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        unique_together = ('site', 'captain', 'user', 'day')
+        indexes = [
+            models.Index(fields=['site', 'day']),
+            models.Index(fields=['user', 'day']),
+        ]
+
+    def __str__(self):
+        return f'{self.day} - {self.site} - Sales: {self.sales}'
+
+
+
 #AttendanceRegister
 class Attendance(models.Model):
     ATTENDANCE_STATUS = [
@@ -266,6 +355,7 @@ class Attendance(models.Model):
 
     class Meta:
         unique_together = ('employee', 'date')  # No duplicate markings
+        indexes = [models.Index(fields=['date'], name='attendance_date_idx')]
 
     def __str__(self):
         return f'{self.employee.name} - {self.date} - {self.status}'
@@ -276,6 +366,9 @@ class Attendance(models.Model):
 class WeeklyEvaluation(models.Model):
     date = models.DateField(default=now)
 
+    class Meta:
+        indexes = [models.Index(fields=['date'], name='weeklyevaluation_date_idx')]
+
     @property
     def week_number(self):
         return self.date.isocalendar()[1]  # ISO week number
@@ -291,6 +384,12 @@ class AttendantEvaluation(models.Model):
     raw_score = models.FloatField()
     percentage_score = models.FloatField(blank=True, null=True)
 
+    class Meta:
+        indexes = [
+            models.Index(fields=['attendant', 'weekly_evaluation'], include=['percentage_score'],
+                         name='evaluation_attendant_week_idx'),
+        ]
+
     def clean(self):
         if self.raw_score > 7.0:
             raise ValidationError('Score cannot exceed 7.0.')
@@ -298,8 +397,11 @@ class AttendantEvaluation(models.Model):
         if self.attendant.job_description.lower() not in ['customer_champion', 'service_champion']:
             raise ValidationError('Only Customer Champion or Service Champion can be evaluated.')
 
+    def calculate_percentage(self):
+        return round((self.raw_score / 7) * 100, 2)
+
     def save(self, *args, **kwargs):
-        self.percentage_score = round((self.raw_score / 7) * 100, 2)
+        self.percentage_score = self.calculate_percentage()
         super().save(*args, **kwargs)
 
     def __str__(self):
@@ -325,6 +427,9 @@ class CreditSales(models.Model):
     litres = models.FloatField(null=True, blank=True)
     amount = models.FloatField()
 
+    class Meta:
+        indexes = [models.Index(fields=['-date', '-id'], name='creditsales_date_id_idx')]
+
     def __str__(self):
         return f'{self.customer.name} - {self.amount}'
     
@@ -334,6 +439,9 @@ class CreditCollection(models.Model):
     date = models.DateField(auto_now_add=True)
     amount = models.FloatField()
 
+    class Meta:
+        indexes = [models.Index(fields=['-date', '-id'], name='creditcollection_date_id_idx')]
+
     def __str__(self):
         return f'{self.customer.name} - {self.amount} on {self.date}'
 
@@ -354,13 +462,95 @@ class AttendanceRegister(models.Model):
     raw_score = models.FloatField()
     percentage_mark = models.FloatField(blank=True, null=True)
 
+    class Meta:
+        indexes = [
+            models.Index(fields=['attendant', 'attendance_date'], include=['percentage_mark'],
+                         name='register_attendant_date_idx'),
+        ]
+
     def clean(self):
         if self.raw_score > 2.0:
             raise ValidationError('Score cannot exceed 2.0.')
 
+    def calculate_percentage(self):
+        return round((self.raw_score / 2) * 100, 2)
+
     def save(self, *args, **kwargs):
-        self.percentage_mark = round((self.raw_score / 2) * 100, 2)
+        self.percentage_mark = self.calculate_percentage()
         super().save(*args, **kwargs)
 
     def __str__(self):
-        return f'{self.attendant.name} - {self.percentage_mark}% on {self.attendance_date.date}'
\ No newline at end of file
+        return f'{self.attendant.name} - {self.percentage_mark}% on {self.attendance_date.date}'
+
+
+#per-employee quarterly evaluation/attendance scorecard (maintained by employee.scorecards)
+class QuarterlyScorecard(models.Model):
+    KIND_CHOICES = [
+        ('evaluation', 'Evaluation'),
+        ('attendance', 'Attendance'),
+    ]
+
+    employee = models.ForeignKey('Employee', on_delete=models.CASCADE, related_name='scorecards')
+    kind = models.CharField(max_length=10, choices=KIND_CHOICES)
+    year = models.PositiveSmallIntegerField()
+    quarter = models.PositiveSmallIntegerField()
+    score_sum = models.FloatField(default=0)  # unrounded, so average matches the mean of the raw scores
+    score_count = models.PositiveIntegerField(default=0)  # rows with a non-null score
+    history = models.JSONField(default=list, blank=True)  # latest scores, newest first: [{'date', 'score'}]
+
+    class Meta:
+        unique_together = ('employee', 'kind', 'year', 'quarter')
+
+    @property
+    def average(self):
+        return round(self.score_sum / self.score_count, 2) if self.score_count else 0.0
+
+    def __str__(self):
+        return f'{self.employee.name} - {self.kind} {self.year} Q{self.quarter}: {self.average}%'
+
+
+
+#background performance recompute after a target change (see employee/jobs.py)
+class RecomputeJob(models.Model):
+    KIND_CHOICES = [
+        ('fuel', 'Fuel Sales'),
+        ('shop', 'Shop Sales'),
+    ]
+    STATUS_CHOICES = [
+        ('queued', 'Queued'),
+        ('running', 'Running'),
+        ('done', 'Done'),
+        ('failed', 'Failed'),
+    ]
+
+    kind = models.CharField(max_length=10, choices=KIND_CHOICES)
+    site = models.CharField(max_length=15, choices=SITE_CHOICES)
+    pump = models.CharField(max_length=10, choices=PUMP_CHOICES, blank=True, default='')
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default='queued')
+    requests = models.PositiveIntegerField(default=1)  # target edits folded into this job
+    processed = models.PositiveIntegerField(default=0)
+    updated = models.PositiveIntegerField(default=0)
+    last_id = models.BigIntegerField(default=0)
+    error = models.TextField(blank=True, default='')
+    created_at = models.DateTimeField(auto_now_add=True)
+    started_at = models.DateTimeField(null=True, blank=True)
+    # renewed by the running worker after every chunk; a stale one means the worker died (see jobs.py)
+    heartbeat_at = models.DateTimeField(null=True, blank=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        indexes = [models.Index(fields=['status', 'kind', 'site', 'pump'])]
+
+    def __str__(self):
+        scope = f'{self.site}/{self.pump}' if self.pump else self.site
+        return f'{self.kind} recompute for {scope} - {self.status}'
+
+
+
+#write version of a cached data scope, shared by every process (see employee/caching.py)
+class ScopeVersion(models.Model):
+    scope = models.CharField(max_length=100, primary_key=True)
+    version = models.BigIntegerField()  # time.time_ns() of the last write
+
+    def __str__(self):
+        return f'{self.scope}: {self.version}'
@@ -0,0 +1,113 @@
+"""
+Keyset (seek) pagination for the list endpoints.
+
+Pages are cut with a WHERE on the last row's ordering values, e.g.
+``date < d OR (date = d AND id < i)``, instead of OFFSET, and no COUNT(*)
+is issued. Page N costs the same as page 1 however large the table gets.
+The ``next`` link carries an opaque cursor.
+"""
+import base64
+import json
+
+from django.core.exceptions import ValidationError
+from django.db.models import Q
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import replace_query_param
+
+
+class KeysetPagination(BasePagination):
+    ordering = ('-date', '-id')  # must end with a unique field
+    page_size = 100
+    max_page_size = 1000
+    page_size_query_param = 'page_size'
+    cursor_query_param = 'cursor'
+
+    def get_page_size(self, request):
+        try:
+            size = int(request.query_params.get(self.page_size_query_param, self.page_size))
+        except ValueError:
+            return self.page_size
+        return max(1, min(size, self.max_page_size))
+
+    def encode_cursor(self, row):
+        values = []
+        for field in self.ordering:
+            value = getattr(row, field.lstrip('-'))
+            values.append(value.isoformat() if hasattr(value, 'isoformat') else value)
+        return base64.urlsafe_b64encode(json.dumps(values).encode()).decode()
+
+    def decode_cursor(self, cursor, model):
+        """The cursor's ordering values, each converted by its model field; NotFound for anything else"""
+        try:
+            values = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+        except (ValueError, TypeError):
+            raise NotFound('Invalid cursor.')
+        if not isinstance(values, list) or len(values) != len(self.ordering):
+            raise NotFound('Invalid cursor.')
+
+        decoded = []
+        for field, value in zip(self.ordering, values):
+            model_field = model._meta.get_field(field.lstrip('-'))
+            try:
+                value = model_field.to_python(value)
+                model_field.run_validators(value)  # e.g. ids beyond the column's integer range
+            except (ValidationError, ValueError, TypeError):
+                raise NotFound('Invalid cursor.')
+            if value is None:
+                raise NotFound('Invalid cursor.')
+            decoded.append(value)
+        return decoded
+
+    def seek(self, values):
+        """Rows strictly after ``values`` in ``ordering``"""
+        condition = Q()
+        equal = {}
+        for field, value in zip(self.ordering, values):
+            name = field.lstrip('-')
+            lookup = 'lt' if field.startswith('-') else 'gt'
+            condition |= Q(**equal, **{f'{name}__{lookup}': value})
+            equal[name] = value
+        return condition
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        page_size = self.get_page_size(request)
+
+        queryset = queryset.order_by(*self.ordering)
+        cursor = request.query_params.get(self.cursor_query_param)
+        if cursor:
+            queryset = queryset.filter(self.seek(self.decode_cursor(cursor, queryset.model)))
+
+        rows = list(queryset[:page_size + 1])
+        self.next_cursor = self.encode_cursor(rows[page_size - 1]) if len(rows) > page_size else None
+        return rows[:page_size]
+
+    def get_next_link(self):
+        if self.next_cursor is None:
+            return None
+        return replace_query_param(self.request.build_absolute_uri(), self.cursor_query_param, self.next_cursor)
+
+    def get_paginated_response(self, data):
+        return Response({'next': self.get_next_link(), 'results': data})
+
+    def get_paginated_response_schema(self, schema):
+        return {
+            'type': 'object',
+            'required': ['results'],
+            'properties': {
+                'next': {'type': 'string', 'nullable': True, 'format': 'uri'},
+                'results': schema,
+            },
+        }
+
+
+class DateKeysetPagination(KeysetPagination):
+    """Newest first by (date, id)"""
+    ordering = ('-date', '-id')
+
+
+class IdKeysetPagination(KeysetPagination):
+    """Newest first by id, for tables without a date"""
+    ordering = ('-id',)
@@ -0,0 +1,157 @@
+"""
+Reporting periods as half-open date ranges.
+
+Every Period is ``[start, end)``, so filtering is always ``field >= start AND
+field < end`` on the bare column, which the (..., date) indexes can serve.
+date__year / date__month lookups wrap the column in EXTRACT() instead.
+Sub-periods (the months of a year, the quarters, the days of a window) are
+precomputed with buckets() for labels and Python-side bucketing. Grouping
+the rows a range selected by month or quarter is cheapest with
+ExtractMonth/ExtractQuarter: the function then only runs on rows the index
+already found, while a CASE over the bucket boundaries costs more than it
+saves.
+
+    year = Period.year(2025)
+    FuelSales.objects.filter(year.q('date'))
+    qs.filter(year.q('day')).values(month=ExtractMonth('day')).annotate(...)
+"""
+from bisect import bisect_right
+from calendar import month_abbr
+from collections import namedtuple
+from datetime import date, timedelta
+
+from django.db.models import Q
+from django.utils.timezone import localdate
+
+
+ONE_DAY = timedelta(days=1)
+UNITS = ('day', 'week', 'month', 'quarter', 'year')
+
+
+def _add_months(day, months):
+    """First day of the month ``months`` after ``day``'s month"""
+    index = day.year * 12 + day.month - 1 + months
+    return date(index // 12, index % 12 + 1, 1)
+
+
+def _unit_start(day, unit):
+    """Start of the ``unit`` containing ``day`` (ISO weeks start on Monday)"""
+    if unit == 'day':
+        return day
+    if unit == 'week':
+        return day - timedelta(days=day.weekday())
+    if unit == 'month':
+        return day.replace(day=1)
+    if unit == 'quarter':
+        return date(day.year, 3 * ((day.month - 1) // 3) + 1, 1)
+    if unit == 'year':
+        return date(day.year, 1, 1)
+    raise ValueError(f'Unknown period unit: {unit!r}')
+
+
+def _unit_end(start, unit):
+    if unit == 'day':
+        return start + ONE_DAY
+    if unit == 'week':
+        return start + timedelta(days=7)
+    return _add_months(start, {'month': 1, 'quarter': 3, 'year': 12}[unit])
+
+
+def _label(start, unit):
+    if unit == 'day':
+        return start.isoformat()
+    if unit == 'week':
+        year, week, _ = start.isocalendar()
+        return f'{year}-W{week:02d}'
+    if unit == 'month':
+        return month_abbr[start.month]
+    if unit == 'quarter':
+        return f'Q{(start.month - 1) // 3 + 1}'
+    return str(start.year)
+
+
+class Period(namedtuple('Period', 'start end label')):
+    """A half-open ``[start, end)`` date range"""
+    __slots__ = ()
+
+    # ----- constructors -----
+
+    @classmethod
+    def of(cls, unit, day=None):
+        """The day / ISO week / month / quarter / year containing ``day`` (default today)"""
+        start = _unit_start(day or localdate(), unit)
+        return cls(start, _unit_end(start, unit), _label(start, unit))
+
+    @classmethod
+    def day(cls, day):
+        return cls.of('day', day)
+
+    @classmethod
+    def iso_week(cls, year, week):
+        return cls.of('week', date.fromisocalendar(year, week, 1))
+
+    @classmethod
+    def month(cls, year, month):
+        return cls.of('month', date(year, month, 1))
+
+    @classmethod
+    def quarter(cls, year, quarter):
+        return cls.of('quarter', date(year, 3 * quarter - 2, 1))
+
+    @classmethod
+    def year(cls, year):
+        return cls.of('year', date(year, 1, 1))
+
+    @classmethod
+    def rolling_days(cls, days, until=None):
+        """From ``days`` days before ``until`` (default today) up to and including ``until``"""
+        until = until or localdate()
+        return cls(until - timedelta(days=days), until + ONE_DAY, f'last {days} days')
+
+    @classmethod
+    def custom(cls, first, last):
+        """``first`` to ``last``, both inclusive"""
+        if last < first:
+            raise ValueError('Period end is before its start')
+        return cls(first, last + ONE_DAY, f'{first.isoformat()}..{last.isoformat()}')
+
+    # ----- predicates -----
+
+    def q(self, field='date'):
+        """``field >= start AND field < end``"""
+        return Q(**{f'{field}__gte': self.start, f'{field}__lt': self.end})
+
+    def __contains__(self, day):
+        return self.start <= day < self.end
+
+    @property
+    def last_day(self):
+        return self.end - ONE_DAY
+
+    @property
+    def days(self):
+        return (self.end - self.start).days
+
+    def intersect(self, other):
+        """Overlap of two periods (an empty period when they do not overlap)"""
+        start, end = max(self.start, other.start), min(self.end, other.end)
+        return Period(start, max(start, end), self.label)
+
+    # ----- sub-periods -----
+
+    def buckets(self, unit):
+        """Consecutive ``unit`` periods covering this one, clipped to it"""
+        buckets = []
+        start = self.start
+        while start < self.end:
+            end = min(_unit_end(_unit_start(start, unit), unit), self.end)
+            buckets.append(Period(start, end, _label(_unit_start(start, unit), unit)))
+            start = end
+        return buckets
+
+
+def bucket_index(buckets, day):
+    """Index of the bucket containing ``day`` (None outside them); buckets must be contiguous"""
+    if not buckets or not (buckets[0].start <= day < buckets[-1].end):
+        return None
+    return bisect_right([bucket.start for bucket in buckets], day) - 1
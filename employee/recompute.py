@@ -0,0 +1,117 @@
+"""
+Set-based recomputation of FuelSales/ShopSales.performance.
+
+Rows are read in primary-key order, ``chunk_size`` at a time, with each
+row's sales total and its site target (a correlated subquery on
+PumpTarget/ShopTarget) in the same SELECT. Only rows whose performance
+actually changes are written, with one bulk_update per chunk, and the
+daily rollups get the matching performance deltas. Memory stays bounded by
+the chunk size. A run can be resumed from the last id it reported.
+"""
+from django.db import transaction
+from django.db.models import DecimalField, ExpressionWrapper, F, OuterRef, Subquery
+
+from .models import FuelSales, ShopSales, PumpTarget, ShopTarget
+from .rollups import record_fuel_performance_changes, record_shop_performance_changes
+from .targets import performance_for
+
+
+def _scope(site=None, pump=None, date_from=None, date_to=None, id_range=None, only_missing=False):
+    filters = {}
+    if site:
+        filters['site'] = site
+    if pump:
+        filters['pump'] = pump
+    if date_from:
+        filters['date__gte'] = date_from
+    if date_to:
+        filters['date__lte'] = date_to
+    if id_range:
+        filters['id__gte'], filters['id__lte'] = id_range
+    if only_missing:
+        filters['performance__isnull'] = True
+    return filters
+
+
+def _recompute(model, total, target, key_fields, record_changes, filters, chunk_size, start_after, progress):
+    rows = model.objects.filter(**filters).annotate(
+        row_total=ExpressionWrapper(total, output_field=DecimalField(max_digits=14, decimal_places=2)),
+        row_target=target,
+    ).order_by('id')
+
+    last_id = start_after or 0
+    processed = updated = 0
+
+    while True:
+        chunk = list(
+            rows.filter(id__gt=last_id)
+            .values_list('id', 'performance', 'row_total', 'row_target', 'site', *key_fields)[:chunk_size]
+        )
+        if not chunk:
+            break
+
+        changed, changes = [], []
+        for pk, old, row_total, row_target, *key in chunk:
+            new = performance_for(row_total, row_target)
+            if new != old:
+                changed.append(model(id=pk, performance=new))
+                changes.append((tuple(key), old, new))
+
+        with transaction.atomic():
+            model.objects.bulk_update(changed, ['performance'], batch_size=500)
+            record_changes(changes)
+
+        processed += len(chunk)
+        updated += len(changed)
+        last_id = chunk[-1][0]
+        if progress:
+            progress(processed, updated, last_id)
+
+    return {'processed': processed, 'updated': updated, 'last_id': last_id}
+
+
+def recompute_fuel_performance(site=None, pump=None, date_from=None, date_to=None, id_range=None,
+                               only_missing=False, chunk_size=2000, start_after=0, progress=None):
+    """
+    Recompute FuelSales.performance for the filtered slice.
+
+    Args:
+        site, pump, date_from, date_to, id_range: optional filters (all rows when omitted)
+        only_missing: only rows whose performance is NULL (e.g. after bulk_create)
+        chunk_size: rows read and written per batch
+        start_after: resume after this FuelSales id
+        progress: optional callable(processed, updated, last_id) called after each chunk
+
+    Returns:
+        dict: processed, updated and last_id
+    """
+    target = Subquery(
+        PumpTarget.objects.filter(site=OuterRef('site'), pump=OuterRef('pump')).order_by('id').values('target')[:1]
+    )
+    return _recompute(
+        FuelSales, F('pms_sales') + F('dx_sales') + F('vp_sales'), target,
+        ('captain_id', 'user_id', 'pump', 'date'), record_fuel_performance_changes,
+        _scope(site, pump, date_from, date_to, id_range, only_missing), chunk_size, start_after, progress,
+    )
+
+
+def recompute_shop_performance(site=None, date_from=None, date_to=None, id_range=None,
+                               only_missing=False, chunk_size=2000, start_after=0, progress=None):
+    """Recompute ShopSales.performance for the filtered slice (see recompute_fuel_performance)"""
+    target = Subquery(
+        ShopTarget.objects.filter(site=OuterRef('site')).order_by('id').values('target')[:1]
+    )
+    return _recompute(
+        ShopSales, F('sales'), target,
+        ('captain_id', 'user_id', 'date'), record_shop_performance_changes,
+        _scope(site, None, date_from, date_to, id_range, only_missing), chunk_size, start_after, progress,
+    )
+
+
+def recompute_imported(model, instances):
+    """Fill in performance for rows written with bulk_create (which skips save())"""
+    recompute = {FuelSales: recompute_fuel_performance, ShopSales: recompute_shop_performance}.get(model)
+    ids = [instance.pk for instance in instances if instance.pk is not None]
+    if recompute is None or not ids:
+        return None
+    return recompute(id_range=(min(ids), max(ids)), only_missing=True)
@@ -0,0 +1,249 @@
+"""
+Daily rollups for FuelSales and ShopSales.
+
+Each FuelSalesDaily/ShopSalesDaily row holds the summed sales and row counts for
+one (site, captain, user, pump, day) key, so dashboards read one row per day
+instead of every sale ever entered.
+
+- record_fuel_sales / record_shop_sales add (and subtract) a batch of sales using
+  F() increments; used by save(), the delete signals and bulk imports.
+- refresh_fuel_rollups / refresh_shop_rollups rebuild a slice from the raw table.
+- lock_sales_users serialises writers that read a sale's previous version
+  before they overwrite it.
+
+Every write that reaches the rollups also invalidates the cached summaries of
+the users and sites it touched (see employee/caching.py).
+"""
+from collections import defaultdict
+from decimal import Decimal
+from itertools import chain
+
+from django.db import IntegrityError, transaction
+from django.db.models import Count, F, Sum
+from django.db.models.functions import Coalesce
+
+from .authentication import token_identities
+from .caching import ALL_SCOPES, bump_models_on_commit, bump_scopes_on_commit
+from .models import Captain, Employee, FuelSales, ShopSales, FuelSalesDaily, ShopSalesDaily
+from .scorecards import KIND_OF_MODEL, record_scores, replace_scores
+from .targets import get_user_site, user_sites
+
+
+# above this many distinct keys a bulk batch is cheaper to rebuild than to increment
+BULK_REFRESH_THRESHOLD = 500
+
+FUEL_KEY = ('site', 'captain_id', 'user_id', 'pump', 'day')
+SHOP_KEY = ('site', 'captain_id', 'user_id', 'day')
+
+
+def sale_site(sale):
+    """Site the sale was entered at (falls back to the user's current site for unstamped rows)"""
+    return sale.site or get_user_site(sale.user_id) or ''
+
+
+def lock_sales_users(user_ids):
+    """
+    Lock the users' Employee rows until the transaction ends.
+
+    A writer that reads a shop sale's previous version and then inserts or
+    overwrites it takes this first. Otherwise two writers can both find no
+    row, and the one that loses the insert race counts a new row again.
+    """
+    list(Employee.objects.select_for_update().filter(user_id__in=user_ids).order_by('pk').values_list('pk', flat=True))
+
+
+def _invalidate(model, users=None, sites=()):
+    """Bump the summary cache scopes of the given users/sites once the write commits"""
+    kind, source = ('fuel', FuelSales) if model is FuelSalesDaily else ('shop', ShopSales)
+    if users is None:
+        scopes = [ALL_SCOPES]
+    else:
+        sites = set(sites) | {get_user_site(user_id) or '' for user_id in users}
+        scopes = [f'{kind}:user:{user_id}' for user_id in users] + [f'{kind}:site:{site}' for site in sites]
+
+    bump_scopes_on_commit(*scopes)
+    bump_models_on_commit(source)  # bulk writes skip the model signals
+
+
+def _bump(model, key, values):
+    """Add ``values`` to the rollup row for ``key``, creating the row if needed."""
+    increments = {field: F(field) + value for field, value in values.items()}
+    with transaction.atomic():
+        if model.objects.filter(**key).update(**increments):
+            if values['entries'] < 0:
+                model.objects.filter(**key, entries__lte=0).delete()
+            return
+
+        if values['entries'] <= 0:
+            return  # nothing to remove from (row already gone, e.g. cascade delete)
+
+        try:
+            with transaction.atomic():
+                model.objects.create(**key, **values)
+        except IntegrityError:
+            # another writer created the row first
+            model.objects.filter(**key).update(**increments)
+
+
+def _record(model, key_fields, rows, refresh):
+    """Group (key, values) pairs in memory and apply one increment per key"""
+    grouped = defaultdict(lambda: defaultdict(int))
+    for key, values in rows:
+        bucket = grouped[key]
+        for field, value in values.items():
+            bucket[field] += value
+
+    if not grouped:
+        return
+
+    keys = [dict(zip(key_fields, key)) for key in grouped]
+    if len(grouped) > BULK_REFRESH_THRESHOLD:
+        days = [key['day'] for key in keys]
+        refresh(users={key['user_id'] for key in keys}, date_from=min(days), date_to=max(days))
+        return
+
+    for key, values in zip(keys, grouped.values()):
+        _bump(model, key, values)
+    _invalidate(model, {key['user_id'] for key in keys}, {key['site'] for key in keys})
+
+
+def _dec(value):
+    return value if isinstance(value, Decimal) else Decimal(str(value))
+
+
+def _fuel_row(sale, sign):
+    performance = sale.performance
+    key = (sale_site(sale), sale.captain_id, sale.user_id, sale.pump, sale.date)
+    return key, {
+        'pms_sales': sign * _dec(sale.pms_sales),
+        'dx_sales': sign * _dec(sale.dx_sales),
+        'vp_sales': sign * _dec(sale.vp_sales),
+        'performance_sum': sign * _dec(performance or 0),
+        'performance_count': sign * (performance is not None),
+        'entries': sign,
+    }
+
+
+def _shop_row(sale, sign):
+    performance = sale.performance
+    key = (sale_site(sale), sale.captain_id, sale.user_id, sale.date)
+    return key, {
+        'sales': sign * _dec(sale.sales),
+        'performance_sum': sign * _dec(performance or 0),
+        'performance_count': sign * (performance is not None),
+        'entries': sign,
+    }
+
+
+def record_fuel_sales(sales=(), removed=()):
+    """Add ``sales`` to and subtract ``removed`` from the daily fuel rollup"""
+    rows = chain((_fuel_row(sale, 1) for sale in sales), (_fuel_row(sale, -1) for sale in removed))
+    _record(FuelSalesDaily, FUEL_KEY, rows, refresh_fuel_rollups)
+
+
+def record_shop_sales(sales=(), removed=()):
+    """Add ``sales`` to and subtract ``removed`` from the daily shop rollup"""
+    rows = chain((_shop_row(sale, 1) for sale in sales), (_shop_row(sale, -1) for sale in removed))
+    _record(ShopSalesDaily, SHOP_KEY, rows, refresh_shop_rollups)
+
+
+def _performance_rows(changes):
+    for key, old, new in changes:
+        yield key, {
+            'performance_sum': _dec(new or 0) - _dec(old or 0),
+            'performance_count': (new is not None) - (old is not None),
+            'entries': 0,
+        }
+
+
+def record_fuel_performance_changes(changes):
+    """Apply (key, old, new) performance changes from bulk recomputes to the fuel rollup"""
+    _record(FuelSalesDaily, FUEL_KEY, _performance_rows(changes), refresh_fuel_rollups)
+
+
+def record_shop_performance_changes(changes):
+    """Apply (key, old, new) performance changes from bulk recomputes to the shop rollup"""
+    _record(ShopSalesDaily, SHOP_KEY, _performance_rows(changes), refresh_shop_rollups)
+
+
+def record_bulk_created(model, instances, replaced=()):
+    """
+    Rollup, scorecard and cache hook for rows written with bulk_create (which skips save() and signals).
+
+    ``replaced`` are the previous versions of rows the batch overwrote (bulk_create(update_conflicts=True)).
+    """
+    bump_models_on_commit(model)
+    if model is FuelSales:
+        record_fuel_sales(instances, removed=replaced)
+    elif model is ShopSales:
+        record_shop_sales(instances, removed=replaced)
+    elif model in KIND_OF_MODEL:
+        replaced_ids = {row.pk for row in replaced}
+        record_scores(model, [instance for instance in instances if instance.pk not in replaced_ids])
+        if replaced:
+            replace_scores(model, replaced, [instance for instance in instances if instance.pk in replaced_ids])
+    elif model in (Employee, Captain):
+        # site lookups, cached token identities and the captain lists of the site summaries
+        sites = {row.site for row in chain(instances, replaced)}
+        user_sites.invalidate()
+        token_identities.invalidate()
+        bump_scopes_on_commit(*(f'{kind}:site:{site}' for site in sites for kind in ('fuel', 'shop')))
+
+
+def _scope(users=None, date_from=None, date_to=None, date_field='date'):
+    scope = {}
+    if users is not None:
+        scope['user_id__in'] = list(users)
+    if date_from is not None:
+        scope[f'{date_field}__gte'] = date_from
+    if date_to is not None:
+        scope[f'{date_field}__lte'] = date_to
+    return scope
+
+
+def _refresh(model, source, group_by, sums, users, date_from, date_to, batch_size):
+    """Replace the rollup rows in scope with a fresh GROUP BY over the raw table"""
+    rows = (
+        source.objects.filter(**_scope(users, date_from, date_to))
+        .values('site', *group_by)
+        .annotate(
+            **{f'sum_{field}': Sum(field) for field in sums},
+            performance_sum=Coalesce(Sum('performance'), Decimal('0.00')),
+            performance_count=Count('performance'),
+            entries=Count('id'),
+        )
+        .order_by()
+    )
+
+    created = 0
+    with transaction.atomic():
+        model.objects.filter(**_scope(users, date_from, date_to, date_field='day')).delete()
+        batch = []
+        for row in rows.iterator(chunk_size=batch_size):
+            row['day'] = row.pop('date')
+            row['captain_id'] = row.pop('captain')
+            row['user_id'] = row.pop('user')
+            for field in sums:
+                row[field] = row.pop(f'sum_{field}')
+            batch.append(model(**row))
+            if len(batch) >= batch_size:
+                model.objects.bulk_create(batch)
+                created += len(batch)
+                batch = []
+        if batch:
+            model.objects.bulk_create(batch)
+            created += len(batch)
+        _invalidate(model, users)
+    return created
+
+
+def refresh_fuel_rollups(users=None, date_from=None, date_to=None, batch_size=1000):
+    """Rebuild FuelSalesDaily for the given users/date range (everything when unscoped)"""
+    return _refresh(FuelSalesDaily, FuelSales, ('captain', 'user', 'pump', 'date'),
+                    ('pms_sales', 'dx_sales', 'vp_sales'), users, date_from, date_to, batch_size)
+
+
+def refresh_shop_rollups(users=None, date_from=None, date_to=None, batch_size=1000):
+    """Rebuild ShopSalesDaily for the given users/date range (everything when unscoped)"""
+    return _refresh(ShopSalesDaily, ShopSales, ('captain', 'user', 'date'),
+                    ('sales',), users, date_from, date_to, batch_size)
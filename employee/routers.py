@@ -0,0 +1,153 @@
+"""
+Read-replica routing.
+
+When a ``replica`` database is configured (DATABASE_REPLICA_URL, or
+DATABASE_REPLICA_PATH for a second SQLite file, see backend/settings.py),
+reads made while serving a GET/HEAD/OPTIONS request go to the replica:
+the summaries, leaderboard and list endpoints. Everything else stays on
+``default``: writes, unsafe requests, management commands, signals and
+background jobs.
+
+A request is pinned to the primary for the rest of its life once it writes.
+The user is pinned for REPLICA_LAG_TOLERANCE seconds afterwards, so they
+read their own writes while the replica catches up, whichever token or
+session they come back with: ReplicaPinningMiddleware remembers the user's
+pk in Django's cache, and the router checks it as soon as authentication has
+identified the user. That cache must be shared between workers, so with a
+replica configured the middleware refuses to start on a per-process one
+(set CACHE_BACKEND=file).
+Reads made before that (the token lookup itself) go to the primary, see
+employee/authentication.py. Browsers also get a cookie, which pins them
+before they have logged in.
+
+Cached summaries and list ETags built from a data scope written within the
+same window are computed on the primary too (see caching.scope_versions), so
+a lagging replica cannot end up cached under the new version.
+"""
+import time
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.core.cache import DEFAULT_CACHE_ALIAS, cache
+from django.core.exceptions import ImproperlyConfigured
+from django.db import DEFAULT_DB_ALIAS
+from django.utils.functional import SimpleLazyObject, empty
+
+
+REPLICA = 'replica'
+PIN_COOKIE = 'pin_primary'
+SAFE_METHODS = ('GET', 'HEAD', 'OPTIONS')
+
+# cache backends each worker process keeps to itself: a pin set on one worker would not be seen by the others
+PROCESS_LOCAL_CACHES = (
+    'django.core.cache.backends.locmem.LocMemCache',
+    'django.core.cache.backends.dummy.DummyCache',
+)
+
+
+def _pin_key(user_pk):
+    return f'replica:pinned:user:{user_pk}'
+
+
+def _user_pk(request):
+    """pk of the user the request was authenticated as so far (None before authentication, never triggers it)"""
+    user = request.__dict__.get('user')  # set by AuthenticationMiddleware (lazily) and by DRF once it authenticates
+    if isinstance(user, SimpleLazyObject):
+        user = None if user._wrapped is empty else user._wrapped
+    return user.pk if user is not None and user.is_authenticated else None
+
+
+class _RequestState:
+    def __init__(self, request, read_only):
+        self.request = request
+        self.read_only = read_only
+        self.pinned = read_only and PIN_COOKIE in request.COOKIES
+        self.wrote = False
+        self.checked_user = None
+
+    def reads_replica(self):
+        """Whether reads may go to the replica, checking the user's pin once they are known"""
+        if not self.read_only or self.pinned:
+            return False
+        user_pk = _user_pk(self.request)
+        if user_pk is not None and user_pk != self.checked_user:
+            self.checked_user = user_pk
+            self.pinned = cache.get(_pin_key(user_pk)) is not None
+        return not self.pinned
+
+
+# the request being served on this thread / task (None outside requests)
+_request = ContextVar('replica_routing_request', default=None)
+
+
+def replica_enabled():
+    return REPLICA in settings.DATABASES
+
+
+def lag_tolerance():
+    """Seconds a write may take to reach the replica"""
+    return getattr(settings, 'REPLICA_LAG_TOLERANCE', 5)
+
+
+def pin_primary():
+    """Send the rest of the current request's reads to the primary"""
+    state = _request.get()
+    if state is not None:
+        state.pinned = True
+
+
+def pin_if_recent(written_ns):
+    """Pin the current request when a write at ``written_ns`` (time.time_ns()) may not have reached the replica yet"""
+    state = _request.get()
+    if state is not None and not state.pinned and time.time_ns() - written_ns < lag_tolerance() * 1e9:
+        state.pinned = True
+
+
+class ReplicaRouter:
+    def db_for_read(self, model, **hints):
+        instance = hints.get('instance')
+        if instance is not None and instance._state.db:
+            # related lookups follow the row they start from
+            return instance._state.db
+        state = _request.get()
+        if state is not None and state.reads_replica():
+            return REPLICA
+        return DEFAULT_DB_ALIAS
+
+    def db_for_write(self, model, **hints):
+        state = _request.get()
+        if state is not None:
+            state.pinned = state.wrote = True
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # both aliases hold the same data
+        return True
+
+
+class ReplicaPinningMiddleware:
+    """Track each request for ReplicaRouter and pin users that wrote to the primary for a while"""
+
+    def __init__(self, get_response):
+        if replica_enabled() and settings.CACHES[DEFAULT_CACHE_ALIAS]['BACKEND'] in PROCESS_LOCAL_CACHES:
+            raise ImproperlyConfigured(
+                'A read replica is configured but the default cache is per-process, so users pinned to the '
+                'primary on one worker would read the replica on the others. Use a shared cache (CACHE_BACKEND=file).'
+            )
+        self.get_response = get_response
+
+    def __call__(self, request):
+        state = _RequestState(request, read_only=request.method in SAFE_METHODS and replica_enabled())
+        token = _request.set(state)
+        try:
+            response = self.get_response(request)
+        finally:
+            _request.reset(token)
+
+        tolerance = lag_tolerance()
+        if state.wrote and replica_enabled() and tolerance > 0:
+            user_pk = _user_pk(request)
+            if user_pk is not None:
+                cache.set(_pin_key(user_pk), 1, tolerance)
+            response.set_cookie(PIN_COOKIE, '1', max_age=tolerance, httponly=True, samesite='Lax')
+        return response
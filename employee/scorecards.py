@@ -0,0 +1,200 @@
+"""
+Quarterly evaluation and attendance scorecards.
+
+Each QuarterlyScorecard row holds the summed scores, the score count and the
+latest HISTORY_LENGTH scores of one (employee, kind, year, quarter), so the
+evaluation/attendance summaries read one row instead of every
+AttendantEvaluation/AttendanceRegister row of the quarter.
+
+- record_scores adds newly created rows to their cards; used by the
+  post_save signal and record_bulk_created (bulk imports).
+- refresh_scorecards rebuilds cards from the raw tables. Edits and deletes
+  rebuild just the cards they touch; ``manage.py rebuild_scorecards`` rebuilds
+  everything.
+
+Like the sales rollups, every write that reaches a card invalidates the cached
+summaries of the employees it touched (see employee/caching.py).
+"""
+import operator
+from collections import defaultdict, namedtuple
+from functools import reduce
+
+from django.db import IntegrityError, transaction
+from django.db.models import Q
+
+from .caching import bump_scopes_on_commit
+from .models import AttendanceDate, AttendanceRegister, AttendantEvaluation, QuarterlyScorecard, WeeklyEvaluation
+from .periods import Period
+
+
+HISTORY_LENGTH = 10
+
+# score rows hang off a dated parent (the week / the register day)
+Kind = namedtuple('Kind', 'name model parent parent_field score_field')
+KINDS = {
+    'evaluation': Kind('evaluation', AttendantEvaluation, WeeklyEvaluation, 'weekly_evaluation', 'percentage_score'),
+    'attendance': Kind('attendance', AttendanceRegister, AttendanceDate, 'attendance_date', 'percentage_mark'),
+}
+KIND_OF_MODEL = {kind.model: kind for kind in KINDS.values()}
+KIND_OF_PARENT = {kind.parent: kind for kind in KINDS.values()}
+
+
+def quarter_of(day):
+    """(year, quarter) of ``day``"""
+    return day.year, (day.month - 1) // 3 + 1
+
+
+def _any(conditions):
+    return reduce(operator.or_, conditions)
+
+
+def _invalidate(kind, employees=None):
+    """Bump the summary cache scopes of the given employees (all of them when None) once the write commits"""
+    scopes = [kind.name] if employees is None else [f'{kind.name}:employee:{pk}' for pk in employees]
+    bump_scopes_on_commit(*scopes)
+
+
+def stored_key(model, pk):
+    """(employee_id, year, quarter) of the card a saved row currently counts towards (None if it is gone)"""
+    kind = KIND_OF_MODEL[model]
+    row = model.objects.filter(pk=pk).values_list('attendant_id', f'{kind.parent_field}__date').first()
+    return (row[0], *quarter_of(row[1])) if row else None
+
+
+def _scored_days(kind, instances):
+    """Date of each instance's parent, reading the parents that are not already loaded in one query"""
+    field = kind.model._meta.get_field(kind.parent_field)
+    missing = {getattr(instance, field.attname) for instance in instances if not field.is_cached(instance)}
+    dates = dict(kind.parent.objects.filter(pk__in=missing).values_list('pk', 'date')) if missing else {}
+    return [
+        getattr(instance, kind.parent_field).date if field.is_cached(instance) else dates[getattr(instance, field.attname)]
+        for instance in instances
+    ]
+
+
+def _add(card, scores):
+    """Add (date, id, score) rows to ``card`` in memory"""
+    for _, _, score in scores:
+        if score is not None:
+            card.score_sum += score
+            card.score_count += 1
+
+    # new rows go before existing ones of the same date, as in the (-date, -id) order refresh uses
+    latest = sorted(scores, key=lambda row: (row[0], row[1] or 0), reverse=True)
+    merged = [{'date': day.isoformat(), 'score': score} for day, _, score in latest] + card.history
+    card.history = sorted(merged, key=lambda entry: entry['date'], reverse=True)[:HISTORY_LENGTH]
+
+
+def record_scores(model, instances):
+    """Add newly created AttendantEvaluation/AttendanceRegister rows to their quarterly scorecards"""
+    kind = KIND_OF_MODEL[model]
+    instances = list(instances)
+    if not instances:
+        return
+
+    grouped = defaultdict(list)
+    for instance, day in zip(instances, _scored_days(kind, instances)):
+        grouped[(instance.attendant_id, *quarter_of(day))].append((day, instance.pk, getattr(instance, kind.score_field)))
+
+    employees = {key[0] for key in grouped}
+    with transaction.atomic():
+        existing = {
+            (card.employee_id, card.year, card.quarter): card
+            for card in QuarterlyScorecard.objects.select_for_update().filter(
+                kind=kind.name, employee_id__in=employees,
+                year__in={key[1] for key in grouped}, quarter__in={key[2] for key in grouped},
+            )
+        }
+        changed, created = [], []
+        for key, scores in grouped.items():
+            card = existing.get(key)
+            if card is None:
+                card = QuarterlyScorecard(employee_id=key[0], kind=kind.name, year=key[1], quarter=key[2])
+                created.append(card)
+            else:
+                changed.append(card)
+            _add(card, scores)
+
+        QuarterlyScorecard.objects.bulk_update(changed, ['score_sum', 'score_count', 'history'])
+        try:
+            with transaction.atomic():
+                QuarterlyScorecard.objects.bulk_create(created)
+        except IntegrityError:
+            # another writer created some of these cards first; rebuild them from the raw rows
+            refresh_cards(kind.name, [(card.employee_id, card.year, card.quarter) for card in created])
+        _invalidate(kind, employees)
+
+
+def replace_scores(model, previous, instances):
+    """Rebuild the cards of rows overwritten with bulk_create(update_conflicts=True), before and after the write"""
+    kind = KIND_OF_MODEL[model]
+    rows = list(previous) + list(instances)
+    refresh_cards(kind.name, [(row.attendant_id, *quarter_of(day)) for row, day in zip(rows, _scored_days(kind, rows))])
+
+
+def _refresh(kind, employees, quarters, batch_size):
+    date_field = f'{kind.parent_field}__date'
+    rows = kind.model.objects.all()
+    cards = QuarterlyScorecard.objects.filter(kind=kind.name)
+    if employees is not None:
+        rows = rows.filter(attendant_id__in=employees)
+        cards = cards.filter(employee_id__in=employees)
+    if quarters is not None:
+        rows = rows.filter(_any(Period.quarter(year, quarter).q(date_field) for year, quarter in quarters))
+        cards = cards.filter(_any(Q(year=year, quarter=quarter) for year, quarter in quarters))
+
+    # one ordered pass: each (employee, quarter) is a contiguous run of rows, newest first
+    rows = rows.order_by('attendant_id', f'-{date_field}', '-id').values_list('attendant_id', date_field, kind.score_field)
+
+    created = 0
+    with transaction.atomic():
+        cards.delete()
+        batch, card = [], None
+        for employee_id, day, score in rows.iterator(chunk_size=batch_size):
+            key = (employee_id, *quarter_of(day))
+            if card is None or key != (card.employee_id, card.year, card.quarter):
+                card = QuarterlyScorecard(employee_id=employee_id, kind=kind.name, year=key[1], quarter=key[2],
+                                          score_sum=0.0, history=[])
+                batch.append(card)
+            if score is not None:
+                card.score_sum += score
+                card.score_count += 1
+            if len(card.history) < HISTORY_LENGTH:
+                card.history.append({'date': day.isoformat(), 'score': score})
+            if len(batch) > batch_size:
+                # the last card may still be filling up
+                QuarterlyScorecard.objects.bulk_create(batch[:-1])
+                created += len(batch) - 1
+                batch = batch[-1:]
+        QuarterlyScorecard.objects.bulk_create(batch)
+        created += len(batch)
+        _invalidate(kind, employees)
+    return created
+
+
+def refresh_scorecards(kinds=None, employees=None, quarters=None, batch_size=1000):
+    """
+    Rebuild the scorecards of the given kinds / employees / (year, quarter) pairs
+    from the raw tables (everything when unscoped); returns the number of cards written.
+    """
+    employees = None if employees is None else list(employees)
+    quarters = None if quarters is None else set(quarters)
+    if employees == [] or quarters == set():
+        return 0
+    return sum(_refresh(KINDS[name], employees, quarters, batch_size) for name in (kinds or KINDS))
+
+
+def refresh_cards(kind, keys):
+    """Rebuild the cards for (employee_id, year, quarter) keys (None keys are ignored)"""
+    keys = {key for key in keys if key}
+    if keys:
+        refresh_scorecards([kind], {key[0] for key in keys}, {key[1:] for key in keys})
+
+
+def scorecard_summary(kind, employee_id, day):
+    """Quarter average and latest scores of one employee for the quarter containing ``day``"""
+    year, quarter = quarter_of(day)
+    card = QuarterlyScorecard.objects.filter(employee_id=employee_id, kind=kind, year=year, quarter=quarter).first()
+    if card is None:
+        return {'qtr_score': 0.0, 'score_history': []}
+    return {'qtr_score': card.average, 'score_history': card.history}
@@ -3,7 +3,8 @@ from rest_framework import serializers
 from django.utils import timezone
 from datetime import timedelta, date
 from .models import (Employee, FuelSales, CreditSales, CreditCollection, AttendanceDate, AttendanceRegister,
-                     ShopSales, Attendance, Captain, AttendantEvaluation, WeeklyEvaluation)
+                     ShopSales, Attendance, Captain, AttendantEvaluation, WeeklyEvaluation, RecomputeJob,
+                     PUMP_CHOICES)
 
 
 
@@ -33,6 +34,25 @@ class FuelSalesSerializer(serializers.ModelSerializer):
         return obj.captain.user.employee_profile.name # 👈 This will return the captain's name
 
 
+class FuelSalesBulkItemSerializer(serializers.Serializer):
+    """One entry of a bulk fuel-sales submission (foreign keys are resolved per batch)"""
+    user = serializers.IntegerField(required=False)
+    captain = serializers.IntegerField()
+    date = serializers.DateField()
+    pump = serializers.ChoiceField(choices=PUMP_CHOICES)
+    pms_sales = serializers.DecimalField(max_digits=12, decimal_places=2, default=0)
+    dx_sales = serializers.DecimalField(max_digits=12, decimal_places=2, default=0)
+    vp_sales = serializers.DecimalField(max_digits=12, decimal_places=2, default=0)
+
+
+class ShopSalesBulkItemSerializer(serializers.Serializer):
+    """One row of a bulk shop-sales upsert, keyed on (user, date)"""
+    user = serializers.IntegerField(required=False)
+    captain = serializers.IntegerField()
+    date = serializers.DateField()
+    sales = serializers.DecimalField(max_digits=12, decimal_places=2)
+
+
 class ShopSalesSerializer(serializers.ModelSerializer):
     employee_name = serializers.CharField(source='user.employee_profile.name', read_only=True)
     captain_name = serializers.SerializerMethodField()  # 👈 Add this line
@@ -47,6 +67,13 @@ class ShopSalesSerializer(serializers.ModelSerializer):
 
 
 
+class RecomputeJobSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = RecomputeJob
+        fields = '__all__'
+
+
+
 class AttendanceSerializer(serializers.ModelSerializer):
     class Meta:
         model = Attendance
@@ -0,0 +1,155 @@
+from django.contrib.auth import get_user_model
+from django.db.models.signals import post_delete, post_save, pre_delete, pre_save
+from django.dispatch import receiver
+from rest_framework.authtoken.models import Token
+
+from .models import (Employee, Captain, FuelSales, ShopSales, PumpTarget, ShopTarget,
+                     WeeklyEvaluation, AttendantEvaluation, AttendanceDate, AttendanceRegister)
+from .authentication import token_identities
+from .caching import bump_models_on_commit, bump_scopes_on_commit, watched_models
+from .jobs import enqueue_recompute
+from .rollups import record_fuel_sales, record_shop_sales
+from .scorecards import (KIND_OF_MODEL, KIND_OF_PARENT, quarter_of, record_scores, refresh_cards, refresh_scorecards,
+                         stored_key)
+from .targets import pump_targets, shop_targets, user_sites
+
+
+#keep the daily rollups in step with deletes (save() handles inserts and updates)
+@receiver(post_delete, sender=FuelSales)
+def remove_fuel_sale_from_rollup(sender, instance, **kwargs):
+    record_fuel_sales(removed=[instance])
+
+
+@receiver(post_delete, sender=ShopSales)
+def remove_shop_sale_from_rollup(sender, instance, **kwargs):
+    record_shop_sales(removed=[instance])
+
+
+#target/site caches used by calculate_performance
+@receiver([post_save, post_delete], sender=PumpTarget)
+def invalidate_pump_targets(sender, **kwargs):
+    pump_targets.invalidate()
+
+
+@receiver([post_save, post_delete], sender=ShopTarget)
+def invalidate_shop_targets(sender, **kwargs):
+    shop_targets.invalidate()
+
+
+@receiver([post_save, post_delete], sender=Employee)
+def invalidate_user_sites(sender, **kwargs):
+    user_sites.invalidate()
+
+
+#token identities cached by CachedTokenAuthentication (revoked tokens, role and profile changes)
+@receiver(post_delete, sender=Token)
+def forget_token(sender, instance, **kwargs):
+    token_identities.invalidate(instance.key)
+
+
+@receiver([post_save, post_delete], sender=get_user_model())
+@receiver([post_save, post_delete], sender=Employee)
+def invalidate_token_identities(sender, **kwargs):
+    token_identities.invalidate()
+
+
+#recompute the stored performance of the sales a target change affects
+@receiver(pre_save, sender=PumpTarget)
+@receiver(pre_save, sender=ShopTarget)
+def remember_target_scope(sender, instance, **kwargs):
+    fields = ('site', 'pump') if sender is PumpTarget else ('site',)
+    instance._previous_scope = sender.objects.filter(pk=instance.pk).values(*fields).first() if instance.pk else None
+
+
+@receiver([post_save, post_delete], sender=PumpTarget)
+def recompute_pump_target_sales(sender, instance, **kwargs):
+    previous = getattr(instance, '_previous_scope', None)
+    enqueue_recompute('fuel', instance.site, instance.pump)
+    if previous and (previous['site'], previous['pump']) != (instance.site, instance.pump):
+        enqueue_recompute('fuel', previous['site'], previous['pump'])
+
+
+@receiver([post_save, post_delete], sender=ShopTarget)
+def recompute_shop_target_sales(sender, instance, **kwargs):
+    previous = getattr(instance, '_previous_scope', None)
+    enqueue_recompute('shop', instance.site)
+    if previous and previous['site'] != instance.site:
+        enqueue_recompute('shop', previous['site'])
+
+
+#write counters behind the list ETags, for the models they read (bulk writes bump them explicitly)
+@receiver([post_save, post_delete])
+def bump_model_version(sender, **kwargs):
+    if sender in watched_models:
+        bump_models_on_commit(sender)
+
+
+#quarterly scorecards: inserts are added to their card, edits and deletes rebuild the cards they touch
+@receiver(pre_save, sender=AttendantEvaluation)
+@receiver(pre_save, sender=AttendanceRegister)
+@receiver(pre_delete, sender=AttendantEvaluation)
+@receiver(pre_delete, sender=AttendanceRegister)
+def remember_scorecard(sender, instance, **kwargs):
+    instance._previous_scorecard = stored_key(sender, instance.pk) if instance.pk else None
+
+
+@receiver(post_save, sender=AttendantEvaluation)
+@receiver(post_save, sender=AttendanceRegister)
+def update_scorecard(sender, instance, created, **kwargs):
+    if created:
+        record_scores(sender, [instance])
+    else:
+        refresh_cards(KIND_OF_MODEL[sender].name, [instance._previous_scorecard, stored_key(sender, instance.pk)])
+
+
+@receiver(post_delete, sender=AttendantEvaluation)
+@receiver(post_delete, sender=AttendanceRegister)
+def remove_from_scorecard(sender, instance, **kwargs):
+    refresh_cards(KIND_OF_MODEL[sender].name, [getattr(instance, '_previous_scorecard', None)])
+
+
+@receiver(pre_save, sender=WeeklyEvaluation)
+@receiver(pre_save, sender=AttendanceDate)
+def remember_scored_date(sender, instance, **kwargs):
+    instance._previous_date = sender.objects.filter(pk=instance.pk).values_list('date', flat=True).first() if instance.pk else None
+
+
+@receiver(post_save, sender=WeeklyEvaluation)
+@receiver(post_save, sender=AttendanceDate)
+def move_scorecard_rows(sender, instance, created, **kwargs):
+    previous = getattr(instance, '_previous_date', None)
+    if created or previous is None or previous == instance.date:
+        return
+    kind = KIND_OF_PARENT[sender]
+    employees = kind.model.objects.filter(**{kind.parent_field: instance}).values_list('attendant_id', flat=True)
+    refresh_scorecards([kind.name], set(employees), {quarter_of(previous), quarter_of(instance.date)})
+
+
+#summary response cache (sales rollups and scorecards invalidate their own writes)
+@receiver([post_save, post_delete], sender=WeeklyEvaluation)
+def invalidate_all_evaluation_summaries(sender, **kwargs):
+    bump_scopes_on_commit('evaluation')
+
+
+@receiver([post_save, post_delete], sender=AttendanceDate)
+def invalidate_all_attendance_summaries(sender, **kwargs):
+    bump_scopes_on_commit('attendance')
+
+
+@receiver([post_save, post_delete], sender=PumpTarget)
+def invalidate_fuel_site_summaries(sender, instance, **kwargs):
+    previous = getattr(instance, '_previous_scope', None) or {}
+    bump_scopes_on_commit(*{f'fuel:site:{site}' for site in (instance.site, previous.get('site', instance.site))})
+
+
+@receiver([post_save, post_delete], sender=ShopTarget)
+def invalidate_shop_site_summaries(sender, instance, **kwargs):
+    previous = getattr(instance, '_previous_scope', None) or {}
+    bump_scopes_on_commit(*{f'shop:site:{site}' for site in (instance.site, previous.get('site', instance.site))})
+
+
+#captain lists and names in the site summaries
+@receiver([post_save, post_delete], sender=Employee)
+@receiver([post_save, post_delete], sender=Captain)
+def invalidate_site_summaries(sender, instance, **kwargs):
+    bump_scopes_on_commit(f'fuel:site:{instance.site}', f'shop:site:{instance.site}')
@@ -0,0 +1,105 @@
+"""
+Cached target and site lookups used by the sales performance calculation.
+
+Saving a FuelSales/ShopSales row needs the entering user's site and the
+site's target. Both are served from process-wide caches, so a sales insert
+does not pay for the profile and target round trips. PumpTarget/ShopTarget
+and Employee signals invalidate the caches (see employee.signals).
+"""
+from decimal import Decimal, ROUND_HALF_UP
+
+from django.conf import settings
+
+from .caching import LocalTTLCache
+from .models import Employee, FuelSales, PumpTarget, ShopTarget
+
+
+TARGET_CACHE_TTL = getattr(settings, 'TARGET_CACHE_TTL', 300)
+
+pump_targets = LocalTTLCache('pump_targets', ttl=TARGET_CACHE_TTL)    # site -> {pump: target}
+shop_targets = LocalTTLCache('shop_targets', ttl=TARGET_CACHE_TTL)    # site -> target
+user_sites = LocalTTLCache('user_sites', ttl=TARGET_CACHE_TTL)        # user_id -> site
+
+
+def get_user_site(user_id):
+    """Site of the user's employee profile (None when there is no profile)"""
+    if user_id is None:
+        return None
+    return user_sites.get_or_load(
+        user_id,
+        lambda: Employee.objects.filter(user_id=user_id).values_list('site', flat=True).first(),
+    )
+
+
+def stamp_sites(sales):
+    """Set ``site`` on sales rows that have none from their user's profile (bulk paths skip save())"""
+    for sale in sales:
+        if not sale.site:
+            sale.site = get_user_site(sale.user_id) or ''
+    return sales
+
+
+def get_site_pump_targets(site):
+    """{pump: target} for a site, loaded in one query on a miss"""
+    if not site:
+        return {}
+
+    def load():
+        targets = {}
+        for pump, target in PumpTarget.objects.filter(site=site).order_by('-id').values_list('pump', 'target'):
+            targets[pump] = target  # oldest row wins if a pump was entered twice
+        return targets
+
+    return pump_targets.get_or_load(site, load)
+
+
+def get_pump_target(site, pump):
+    return get_site_pump_targets(site).get(pump)
+
+
+def get_shop_target(site):
+    if not site:
+        return None
+    return shop_targets.get_or_load(
+        site,
+        lambda: ShopTarget.objects.filter(site=site).order_by('id').values_list('target', flat=True).first(),
+    )
+
+
+def performance_for(total_sales, target):
+    """Performance percentage for a sales total against a daily target (None without a target)"""
+    if target is None:
+        return None
+    if target > 0:
+        performance = (Decimal(total_sales) / Decimal(target)) * 100
+        return performance.quantize(Decimal('.01'), rounding=ROUND_HALF_UP)
+    return Decimal('0.00')
+
+
+def performance_array(totals, targets):
+    """
+    performance_for over a batch.
+
+    Rows go through the same Decimal arithmetic as save(), so a bulk write
+    stores exactly what saving each row would. A float pass was faster, but
+    it could round a different way near half a cent.
+
+    Args:
+        totals: sales totals (Decimal/float), one per row
+        targets: daily targets, one per row (None when the site/pump has no target)
+
+    Returns:
+        list: Decimal performance (2 dp, half-up) or None per row
+    """
+    return [performance_for(total, target) for total, target in zip(totals, targets)]
+
+
+def stamp_performance(sales):
+    """Set ``performance`` on FuelSales/ShopSales rows from the cached targets, as save() does (bulk paths skip it)"""
+    targets = [
+        get_pump_target(sale.site, sale.pump) if isinstance(sale, FuelSales) else get_shop_target(sale.site)
+        for sale in sales
+    ]
+    for sale, performance in zip(sales, performance_array([sale.total_sales for sale in sales], targets)):
+        sale.performance = performance
+    return sales
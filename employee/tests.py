@@ -1,3 +1,1105 @@
-from django.test import TestCase
+from datetime import date, datetime, timedelta
+from decimal import Decimal
+import base64
+import csv
+from io import BytesIO, StringIO
+import json
+from importlib import import_module
+from tempfile import NamedTemporaryFile, TemporaryDirectory
+from unittest import mock, skipUnless
 
-# Create your tests here.
+from django.apps import apps
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.exceptions import ImproperlyConfigured
+from django.core.management import call_command
+from django.db import DEFAULT_DB_ALIAS, connection, transaction
+from django.db.models import F
+from django.test import TestCase, override_settings
+from django.utils import timezone
+from django.test.utils import CaptureQueriesContext
+from openpyxl import Workbook
+from rest_framework.authtoken.models import Token
+from rest_framework.exceptions import AuthenticationFailed
+from rest_framework.test import APIRequestFactory, APITestCase
+
+from .authentication import CachedTokenAuthentication, token_identities
+from .functions import load_json_to_model
+from .importers import import_excel
+from .jobs import run_pending_jobs
+from .leaderboard import site_leaderboard
+from .models import (Employee, Captain, FuelSales, ShopSales, Customer, CreditSales, CreditCollection,
+                     WeeklyEvaluation, AttendantEvaluation, FuelSalesDaily, ShopSalesDaily, PumpTarget, ShopTarget,
+                     RecomputeJob, ScopeVersion, QuarterlyScorecard)
+from .periods import Period, bucket_index
+from .recompute import recompute_fuel_performance, recompute_imported
+from .routers import REPLICA, ReplicaPinningMiddleware, ReplicaRouter
+from .rollups import lock_sales_users, record_bulk_created, refresh_fuel_rollups, refresh_shop_rollups
+from .scorecards import HISTORY_LENGTH, refresh_scorecards, scorecard_summary
+from .targets import performance_array, performance_for
+from .viewsummary import fuel_sales_summary, shop_sales_summary
+
+
+User = get_user_model()
+
+
+def make_employee(contact, job_description='customer_champion', site='ofankor'):
+    user = User.objects.create_user(username=contact, password='test-pass')
+    Employee.objects.create(
+        user=user, name=f'Employee {contact}', gender='M', contact=contact, dob='1990-01-01',
+        location='Accra', guarantor_name='Guarantor', guarantor_contact='0540000001',
+        job_description=job_description, date_employed='2024-01-01', training_start='2024-01-01',
+        training_end='2024-01-10', site=site,
+    )
+    return user
+
+
+@override_settings(PASSWORD_HASHERS=['django.contrib.auth.hashers.MD5PasswordHasher'])
+class ListQueryBudgetTests(APITestCase):
+    """List endpoints must cost a fixed number of queries, whatever the page size"""
+
+    ROWS = 30
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = make_employee('0200000000')
+        captains = [Captain.objects.create(user=make_employee(f'02100000{i:02d}'), site='ofankor') for i in range(3)]
+        shop_captain = Captain.objects.create(user=make_employee('0220000000', 'service_champion'), site='ofankor')
+        attendants = [make_employee(f'02300000{i:02d}') for i in range(cls.ROWS)]
+        customer = Customer.objects.create(name='Customer', contact='0240000000')
+        weeks = [WeeklyEvaluation.objects.create(date=date(2025, 1, 6) + timedelta(weeks=i)) for i in range(3)]
+
+        for i, attendant in enumerate(attendants):
+            day = date(2025, 1, 1) + timedelta(days=i)
+            FuelSales.objects.create(user=attendant, date=day, pump='pump1', captain=captains[i % 3], pms_sales=100)
+            ShopSales.objects.create(user=attendant, date=day, captain=shop_captain, sales=100)
+            CreditSales.objects.create(user=attendant, customer=customer, car_number='GR-1', amount=10)
+            CreditCollection.objects.create(customer=customer, amount=10)
+            AttendantEvaluation.objects.create(
+                weekly_evaluation=weeks[i % 3], attendant=attendant.employee_profile, raw_score=5
+            )
+
+    def setUp(self):
+        self.client.force_authenticate(self.user)
+
+    def assert_query_budget(self, url, budget):
+        """``budget`` counts the list itself plus the one read of the shared ETag versions"""
+        self.client.get(url)  # seeds the data versions of a first-seen scope
+        counts = []
+        for page_size in (5, self.ROWS):
+            with CaptureQueriesContext(connection) as queries:
+                response = self.client.get(url, {'page_size': page_size})
+            self.assertEqual(response.status_code, 200)
+            self.assertLessEqual(len(queries), budget, f'{url} used {len(queries)} queries')
+            counts.append(len(queries))
+        self.assertEqual(counts[0], counts[1], f'{url} query count depends on page size: {counts}')
+
+    def test_fuel_sales_list(self):
+        self.assert_query_budget('/api/fuel-sales/', 2)
+
+    def test_shop_sales_list(self):
+        self.assert_query_budget('/api/shop-sales/', 2)
+
+    def test_credit_sales_list(self):
+        self.assert_query_budget('/api/credit-sales/', 2)
+
+    def test_credit_collections_list(self):
+        self.assert_query_budget('/api/credit-collections/', 2)
+
+    def test_employees_list(self):
+        self.assert_query_budget('/api/employees/', 2)
+
+    def test_captain_lists(self):
+        self.assert_query_budget('/api/captains-pump/', 2)
+        self.assert_query_budget('/api/captains-shop/', 2)
+
+    def test_active_attendants_list(self):
+        self.assert_query_budget('/api/active-attendants/', 2)
+
+    def test_weekly_evaluations_list(self):
+        self.assert_query_budget('/api/weekly-evaluations/', 4)
+
+
+@override_settings(PASSWORD_HASHERS=['django.contrib.auth.hashers.MD5PasswordHasher'])
+class CachedTokenAuthenticationTests(APITestCase):
+    """Known tokens authenticate without queries; revocations and profile changes apply at once"""
+
+    def setUp(self):
+        token_identities.invalidate()
+        self.user = make_employee('0250000000')
+        self.token = Token.objects.create(user=self.user)
+
+    def authenticate(self):
+        request = APIRequestFactory().get('/', HTTP_AUTHORIZATION=f'Token {self.token.key}')
+        return CachedTokenAuthentication().authenticate(request)
+
+    def test_cached_identity_costs_no_queries(self):
+        self.authenticate()
+        with self.assertNumQueries(0):
+            user, token = self.authenticate()
+            self.assertEqual(user.employee_profile.site, 'ofankor')
+            self.assertEqual(user.employee_profile.user, user)
+            self.assertFalse(user.is_captain)
+            self.assertEqual(token.user, user)
+
+    def test_revoked_token_is_rejected(self):
+        self.authenticate()
+        self.token.delete()
+        with self.assertRaises(AuthenticationFailed):
+            self.authenticate()
+
+    def test_profile_and_user_changes_apply(self):
+        self.authenticate()
+        profile = Employee.objects.get(user=self.user)
+        profile.site = 'palmwine'
+        profile.save()
+        user, _ = self.authenticate()
+        self.assertEqual(user.employee_profile.site, 'palmwine')
+
+        self.user.refresh_from_db()
+        self.user.is_active = False
+        self.user.save()
+        with self.assertRaises(AuthenticationFailed):
+            self.authenticate()
+
+
+@override_settings(PASSWORD_HASHERS=['django.contrib.auth.hashers.MD5PasswordHasher'])
+class BootstrapTests(APITestCase):
+    """The login bootstrap costs a fixed number of queries, and only the data version read once cached"""
+
+    def setUp(self):
+        cache.clear()
+        token_identities.invalidate()
+        with self.captureOnCommitCallbacks(execute=True):  # data versions are bumped when writes commit
+            self.user = make_employee('0260000000')
+        self.client.credentials(HTTP_AUTHORIZATION=f'Token {Token.objects.create(user=self.user).key}')
+
+    def add_staff(self, count):
+        with self.captureOnCommitCallbacks(execute=True):
+            for i in range(count):
+                contact = f'0261{Captain.objects.count():03d}{i:03d}'
+                Captain.objects.create(user=make_employee(contact, 'customer_champion'), site='ofankor')
+
+    def test_fixed_cost_and_cached(self):
+        self.client.get('/api/bootstrap/')  # seeds the data versions of first-seen scopes
+        counts = []
+        for staff in (1, 5):
+            self.add_staff(staff)
+            with CaptureQueriesContext(connection) as queries:
+                response = self.client.get('/api/bootstrap/')
+            self.assertEqual(response['X-Cache'], 'MISS')
+            counts.append(len(queries))
+        self.assertEqual(counts[0], counts[1], f'bootstrap query count depends on the number of staff: {counts}')
+        self.assertEqual(len(response.json()['captains_pump']), 6)
+
+        with self.assertNumQueries(1):
+            response = self.client.get('/api/bootstrap/')
+        self.assertEqual(response['X-Cache'], 'HIT')
+        self.assertEqual(response.json()['profile']['contact'], '0260000000')
+
+    def test_fields_match_the_separate_endpoints(self):
+        self.add_staff(2)
+        with self.captureOnCommitCallbacks(execute=True):
+            Captain.objects.create(user=make_employee('0262000000', 'service_champion'), site='ofankor')
+        payload = self.client.get('/api/bootstrap/').json()
+
+        self.assertEqual(payload['user'], {'usid': self.user.id, 'username': '0260000000', 'isCaptain': False,
+                                           'isManager': False, 'isSupervisor': False, 'isnoRole': True})
+        self.assertEqual(payload['site'], 'ofankor')
+        self.assertEqual((len(payload['captains_pump']), len(payload['captains_shop'])), (2, 1))
+        for field, url in [('profile', '/api/employees/me/'), ('captains_pump', '/api/captains-pump/'),
+                           ('captains_shop', '/api/captains-shop/'), ('active_attendants', '/api/active-attendants/'),
+                           ('fuel_sales_summary', '/api/fuel-sales-summary/'),
+                           ('shop_sales_summary', '/api/shop-sales-summary/')]:
+            separate = self.client.get(url).json()
+            self.assertEqual(payload[field], separate, field)
+
+
+def fuel_rollup_rows():
+    return sorted(FuelSalesDaily.objects.values_list(
+        'site', 'captain_id', 'user_id', 'pump', 'day', 'pms_sales', 'dx_sales', 'vp_sales',
+        'performance_sum', 'performance_count', 'entries'))
+
+
+def shop_rollup_rows():
+    return sorted(ShopSalesDaily.objects.values_list(
+        'site', 'captain_id', 'user_id', 'day', 'sales', 'performance_sum', 'performance_count', 'entries'))
+
+
+@override_settings(PASSWORD_HASHERS=['django.contrib.auth.hashers.MD5PasswordHasher'])
+class SalesRollupTests(TestCase):
+    """The daily rollups track every write and the site dashboards read only them"""
+
+    def setUp(self):
+        self.user = make_employee('0270000000')
+        self.captain = Captain.objects.create(user=make_employee('0270000001'), site='ofankor')
+        PumpTarget.objects.create(site='ofankor', pump='pump1', target=1000)
+        PumpTarget.objects.create(site='ofankor', pump='pump2', target=500)
+
+    def sell(self, day, pump='pump1', pms=100):
+        return FuelSales.objects.create(user=self.user, captain=self.captain, date=day, pump=pump, pms_sales=pms)
+
+    def test_incremental_rollup_matches_rebuild_and_backfill(self):
+        self.sell(date(2025, 1, 1))
+        edited = self.sell(date(2025, 1, 1), 'pump2', 50)
+        removed = self.sell(date(2025, 1, 2))
+        self.sell(date(2025, 2, 1), pms=300)
+        edited.pump, edited.pms_sales = 'pump1', 400
+        edited.save()
+        removed.delete()
+        incremental = fuel_rollup_rows()
+        self.assertEqual(len(incremental), 2)
+
+        refresh_fuel_rollups()
+        self.assertEqual(fuel_rollup_rows(), incremental)
+
+        FuelSalesDaily.objects.all().delete()
+        import_module('employee.migrations.0002_sales_daily_rollups').backfill_rollups(apps, None)
+        self.assertEqual(fuel_rollup_rows(), incremental)
+
+    @skipUnless(connection.vendor == 'sqlite', 'query plan text is SQLite specific')
+    def test_site_summary_reads_rollups_through_index(self):
+        self.sell(date(2025, 1, 1))
+        with CaptureQueriesContext(connection) as queries:
+            summary = fuel_sales_summary('ofankor', 2025, 1)
+        self.assertEqual(summary['current_performance']['raw_score'], 100)
+        self.assertFalse([q['sql'] for q in queries if '"employee_fuelsales"' in q['sql']])
+
+        plan = FuelSalesDaily.objects.filter(Period.year(2025).q('day'), site='ofankor').values('day').explain()
+        self.assertRegex(plan, r'SEARCH employee_fuelsalesdaily USING (COVERING )?INDEX')
+        self.assertNotIn('SCAN employee_fuelsalesdaily', plan)
+
+
+@override_settings(PASSWORD_HASHERS=['django.contrib.auth.hashers.MD5PasswordHasher'])
+class SiteSalesSummaryTests(TestCase):
+    """The site dashboards come from a fixed number of grouped queries, whatever the data"""
+
+    def setUp(self):
+        self.user = make_employee('0270000100')
+        self.first = Captain.objects.create(user=make_employee('0270000101'), site='ofankor')
+        self.second = Captain.objects.create(user=make_employee('0270000102'), site='ofankor')
+        self.shop = Captain.objects.create(user=make_employee('0270000103', 'service_champion'), site='ofankor')
+        PumpTarget.objects.create(site='ofankor', pump='pump1', target=1000)
+        PumpTarget.objects.create(site='ofankor', pump='pump2', target=500)
+        ShopTarget.objects.create(site='ofankor', target=1000)
+
+        for captain, day, pump, pms, dx in [
+            (self.first, date(2025, 1, 1), 'pump1', 100, 50),
+            (self.second, date(2025, 1, 15), 'pump2', 300, 0),
+            (self.first, date(2025, 2, 3), 'pump1', 600, 0),
+            (self.first, date(2024, 12, 31), 'pump1', 900, 0),
+        ]:
+            FuelSales.objects.create(user=self.user, captain=captain, date=day, pump=pump, pms_sales=pms, dx_sales=dx)
+        ShopSales.objects.create(user=self.user, captain=self.shop, date=date(2025, 1, 2), sales=200)
+
+    def test_fuel_summary(self):
+        with self.assertNumQueries(4):
+            summary = fuel_sales_summary('ofankor', 2025, 1)
+
+        self.assertEqual(summary['current_performance'],
+                         {'raw_score': 450, 'target': 1500 * 31, 'performance': Decimal('0.97')})
+        self.assertEqual({row['captain']: row['raw_score'] for row in summary['captain_performance']},
+                         {'Employee 0270000101': 150, 'Employee 0270000102': 300})
+        months = summary['monthly_summary']
+        self.assertEqual([month['sales'] for month in months], [450, 600] + [0] * 10)
+        self.assertEqual([month['target'] for month in months[:2]], [1500 * 31, 1500 * 28])
+        self.assertEqual((months[0]['growth'], months[1]['growth']), (0, Decimal('0.33')))
+
+    def test_shop_summary(self):
+        with self.assertNumQueries(4):
+            summary = shop_sales_summary('ofankor', 2025, 1)
+
+        self.assertEqual(summary['current_performance']['raw_score'], 200)
+        self.assertEqual(summary['captain_performance'], [{
+            'captain': 'Employee 0270000103', 'raw_score': 200, 'target': 15000.0, 'performance': Decimal('1.33'),
+        }])
+        self.assertEqual([month['sales'] for month in summary['monthly_summary']], [200] + [0] * 11)
+
+
+@override_settings(PASSWORD_HASHERS=['django.contrib.auth.hashers.MD5PasswordHasher'])
+class PerformanceRecomputeTests(TestCase):
+    """Set-based recomputes store what save() would and keep the rollups in step"""
+
+    def setUp(self):
+        self.user = make_employee('0270000200')
+        self.captain = Captain.objects.create(user=make_employee('0270000201'), site='ofankor')
+        PumpTarget.objects.create(site='ofankor', pump='pump1', target=1000)
+        PumpTarget.objects.create(site='ofankor', pump='pump2', target=500)
+
+    def bulk_sales(self, *pms):
+        sales = FuelSales.objects.bulk_create([
+            FuelSales(user=self.user, captain=self.captain, site='ofankor', date=date(2025, 1, day + 1),
+                      pump=f'pump{day % 2 + 1}', pms_sales=amount)
+            for day, amount in enumerate(pms)
+        ])
+        record_bulk_created(FuelSales, sales)
+        return sales
+
+    def assert_stored_as_save_would(self):
+        for sale in FuelSales.objects.all():
+            self.assertEqual(sale.performance, sale.calculate_performance())
+        rollup = fuel_rollup_rows()
+        refresh_fuel_rollups()
+        self.assertEqual(fuel_rollup_rows(), rollup)
+
+    def test_import_hook_fills_only_the_imported_rows(self):
+        earlier = self.bulk_sales(100)
+        imported = self.bulk_sales(100, 200, 300)
+
+        self.assertEqual(recompute_imported(FuelSales, imported)['updated'], 3)
+        self.assertIsNone(FuelSales.objects.get(pk=earlier[0].pk).performance)
+        self.assertIsNone(recompute_imported(Employee, [self.user.employee_profile]))
+
+        recompute_fuel_performance(only_missing=True)
+        self.assert_stored_as_save_would()
+
+    def test_target_change_rewrites_changed_rows_in_resumable_chunks(self):
+        self.bulk_sales(100, 200, 300, 400, 500)
+        recompute_fuel_performance()
+        PumpTarget.objects.filter(pump='pump2').update(target=250)  # no signals, as in a raw data fix
+
+        chunks = []
+        first = recompute_fuel_performance(chunk_size=2, progress=lambda *chunk: chunks.append(chunk))
+        self.assertEqual((first['processed'], first['updated']), (5, 2))  # the pump2 rows only
+        self.assertEqual([processed for processed, _, _ in chunks], [2, 4, 5])
+        self.assert_stored_as_save_would()
+
+        resumed = recompute_fuel_performance(start_after=chunks[0][2])
+        self.assertEqual((resumed['processed'], resumed['updated']), (3, 0))
+
+
+@override_settings(PASSWORD_HASHERS=['django.contrib.auth.hashers.MD5PasswordHasher'])
+class PeriodTests(TestCase):
+    """Reporting periods are half-open ranges the date indexes can serve"""
+
+    def test_units_and_labels(self):
+        self.assertEqual(Period.of('week', date(2025, 1, 1)), (date(2024, 12, 30), date(2025, 1, 6), '2025-W01'))
+        self.assertEqual(Period.iso_week(2025, 1), Period.of('week', date(2024, 12, 30)))
+        self.assertEqual(Period.quarter(2025, 4), (date(2025, 10, 1), date(2026, 1, 1), 'Q4'))
+        self.assertEqual(Period.month(2024, 2).days, 29)
+        self.assertEqual(Period.year(2025).last_day, date(2025, 12, 31))
+        self.assertEqual(Period.rolling_days(30, until=date(2025, 3, 31)).start, date(2025, 3, 1))
+        self.assertIn(date(2025, 3, 31), Period.rolling_days(30, until=date(2025, 3, 31)))
+        with self.assertRaises(ValueError):
+            Period.custom(date(2025, 2, 1), date(2025, 1, 31))
+
+    def test_buckets_are_clipped_and_contiguous(self):
+        buckets = Period.custom(date(2025, 1, 15), date(2025, 3, 10)).buckets('month')
+        self.assertEqual(buckets, [
+            (date(2025, 1, 15), date(2025, 2, 1), 'Jan'),
+            (date(2025, 2, 1), date(2025, 3, 1), 'Feb'),
+            (date(2025, 3, 1), date(2025, 3, 11), 'Mar'),
+        ])
+        self.assertEqual([bucket_index(buckets, day) for day in (date(2025, 1, 14), date(2025, 2, 28),
+                                                                 date(2025, 3, 10), date(2025, 3, 11))],
+                         [None, 1, 2, None])
+
+    def test_filters_compare_the_bare_column(self):
+        user = make_employee('0270000300')
+        captain = Captain.objects.create(user=make_employee('0270000301'), site='ofankor')
+        for day in (date(2024, 12, 31), date(2025, 1, 1), date(2025, 12, 31), date(2026, 1, 1)):
+            FuelSales.objects.create(user=user, captain=captain, date=day, pump='pump1', pms_sales=100)
+        self.assertEqual(sorted(FuelSales.objects.filter(Period.year(2025).q()).values_list('date', flat=True)),
+                         [date(2025, 1, 1), date(2025, 12, 31)])
+
+        with CaptureQueriesContext(connection) as queries:
+            fuel_sales_summary('ofankor', 2025, 12)
+        for query in queries:
+            where = query['sql'].partition(' WHERE ')[2].partition(' GROUP BY ')[0]
+            self.assertNotRegex(where, r'(?i)extract|strftime', query['sql'])
+
+
+@override_settings(PASSWORD_HASHERS=['django.contrib.auth.hashers.MD5PasswordHasher'])
+class LeaderboardTests(APITestCase):
+    """Attendants are ranked per metric in one query, ties share a rank and missing data ranks last"""
+
+    def setUp(self):
+        cache.clear()
+        captain = Captain.objects.create(user=make_employee('0270000400', 'supervisor'), site='ofankor')
+        PumpTarget.objects.create(site='ofankor', pump='pump1', target=100)
+        PumpTarget.objects.create(site='palmwine', pump='pump1', target=100)
+        self.users = {}
+        for name, contact, site, pms in [('Ama', '0270000401', 'ofankor', 100), ('Kofi', '0270000402', 'ofankor', 50),
+                                         ('Efua', '0270000403', 'ofankor', 100), ('Yaw', '0270000404', 'ofankor', None),
+                                         ('Esi', '0270000405', 'palmwine', 200), ('Kwame', '0270000406', 'ofankor', 300)]:
+            user = self.users[name] = make_employee(contact, site=site)
+            Employee.objects.filter(user=user).update(name=name)
+            if pms is not None:
+                FuelSales.objects.create(user=user, captain=captain, date=date(2025, 1, 10), pump='pump1', pms_sales=pms)
+        Employee.objects.filter(user=self.users['Kwame']).update(status='inactive')
+        self.client.force_authenticate(self.users['Ama'])
+
+    def test_ties_share_a_rank_and_unranked_come_last(self):
+        with self.assertNumQueries(1):
+            board = site_leaderboard('ofankor', Period.month(2025, 1))
+
+        self.assertEqual([(row['name'], row['fuel']['score'], row['fuel']['rank'], row['fuel']['percent_rank'])
+                          for row in board['results']],
+                         [('Ama', 100.0, 1, 0.0), ('Efua', 100.0, 1, 0.0), ('Kofi', 50.0, 3, 1.0), ('Yaw', None, None, None)])
+        self.assertEqual({row['evaluation']['rank'] for row in board['results']}, {None})
+
+        top = site_leaderboard('ofankor', Period.month(2025, 1), limit=2)
+        self.assertEqual([row['name'] for row in top['results']], ['Ama', 'Efua'])
+        self.assertEqual(site_leaderboard('ofankor', Period.month(2025, 2))['results'][0]['fuel']['rank'], None)
+
+    def test_endpoint(self):
+        response = self.client.get('/api/leaderboard/', {'period': 'month', 'date': '2025-01-20', 'limit': 3})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['period']['start'], date(2025, 1, 1))
+        self.assertEqual([row['name'] for row in response.data['results']], ['Ama', 'Efua', 'Kofi'])
+
+        response = self.client.get('/api/leaderboard/', {'site': 'palmwine', 'start': '2025-01-01', 'end': '2025-01-31'})
+        self.assertEqual([row['name'] for row in response.data['results']], ['Esi'])
+
+        for params in ({'order_by': 'speed'}, {'period': 'decade'}, {'site': 'nowhere'}, {'start': '2025-01-01'}):
+            self.assertEqual(self.client.get('/api/leaderboard/', params).status_code, 400, params)
+
+
+@override_settings(PASSWORD_HASHERS=['django.contrib.auth.hashers.MD5PasswordHasher'], EXPORT_CHUNK_SIZE=2)
+class ExportTests(APITestCase):
+    """Exports stream the filtered rows a chunk at a time, reading them only as the body is consumed"""
+
+    def setUp(self):
+        self.user = make_employee('0270000500')
+        self.other = make_employee('0270000501', site='palmwine')
+        captain = Captain.objects.create(user=make_employee('0270000502'), site='ofankor')
+        PumpTarget.objects.create(site='ofankor', pump='pump1', target=1000)
+        for user, day, pms in [(self.user, date(2025, 1, 3), 100), (self.user, date(2025, 1, 1), 200),
+                               (self.other, date(2025, 1, 2), 300), (self.user, date(2025, 1, 2), 400),
+                               (self.user, date(2025, 2, 1), 500), (self.user, date(2025, 1, 5), 600)]:
+            FuelSales.objects.create(user=user, captain=captain, date=day, pump='pump1', pms_sales=pms)
+        User.objects.filter(pk=self.user.pk).update(is_staff=True)
+        self.client.force_authenticate(User.objects.get(pk=self.user.pk))
+
+    def test_csv_streams_filtered_rows_in_chunks(self):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get('/api/export/fuel-sales.csv',
+                                       {'site': 'ofankor', 'date_from': '2025-01-01', 'date_to': '2025-01-31'})
+        self.assertFalse([q['sql'] for q in queries if '"employee_fuelsales"' in q['sql']])  # nothing read yet
+
+        self.assertTrue(response.streaming)
+        self.assertEqual(response['Content-Type'], 'text/csv')
+        self.assertRegex(response['Content-Disposition'], r'attachment; filename="fuel-sales-[\d-]+\.csv"')
+        chunks = [chunk.decode() for chunk in response.streaming_content]
+        self.assertEqual(len(chunks), 1 + 2)  # the header, then 4 rows 2 at a time
+
+        rows = list(csv.DictReader(StringIO(''.join(chunks))))
+        self.assertEqual([(row['date'], row['pms_sales']) for row in rows],
+                         [('2025-01-01', '200.00'), ('2025-01-02', '400.00'), ('2025-01-03', '100.00'),
+                          ('2025-01-05', '600.00')])
+        self.assertEqual(rows[0]['employee_name'], 'Employee 0270000500')
+        self.assertEqual(rows[0]['performance'], '20.00')
+
+    def test_ndjson_lines(self):
+        response = self.client.get('/api/export/fuel-sales.ndjson', {'user': self.other.id})
+        self.assertEqual(response['Content-Type'], 'application/x-ndjson')
+        lines = b''.join(response.streaming_content).decode().splitlines()
+        self.assertEqual([json.loads(line)['pms_sales'] for line in lines], ['300.00'])
+        self.assertEqual(json.loads(lines[0])['site'], 'palmwine')
+
+    def test_rejects(self):
+        self.assertEqual(self.client.get('/api/export/fuel-sales.xml').status_code, 404)
+        self.assertEqual(self.client.get('/api/export/payroll.csv').status_code, 404)
+        self.assertEqual(self.client.get('/api/export/fuel-sales.csv', {'date_from': 'soon'}).status_code, 400)
+        self.client.force_authenticate(self.other)
+        self.assertEqual(self.client.get('/api/export/fuel-sales.csv').status_code, 403)
+
+
+@skipUnless(connection.vendor == 'sqlite', 'query plan text is SQLite specific')
+class QueryPlanTests(TestCase):
+    """The summary and list query shapes are served by their composite indexes"""
+
+    def assert_uses(self, queryset, index):
+        plan = queryset.explain()
+        self.assertRegex(plan, rf'USING (COVERING )?INDEX {index}\b', plan)
+
+    def test_sales_query_shapes(self):
+        january = Period.month(2025, 1)
+        self.assert_uses(FuelSales.objects.filter(january.q(), user_id=1).values('pms_sales', 'performance'),
+                         'fuelsales_user_date_idx')
+        self.assert_uses(FuelSales.objects.filter(january.q(), captain_id=1).values('pms_sales'),
+                         'fuelsales_captain_date_idx')
+        self.assert_uses(FuelSales.objects.filter(january.q(), site='ofankor').values('pms_sales', 'performance'),
+                         'fuelsales_site_date_idx')
+        self.assert_uses(FuelSales.objects.order_by('-date', '-id')[:20], 'fuelsales_date_id_idx')
+        self.assert_uses(ShopSales.objects.filter(january.q(), site='ofankor').values('sales'), 'shopsales_site_date_idx')
+        self.assert_uses(ShopSales.objects.order_by('-date', '-id')[:20], 'shopsales_date_id_idx')
+
+    def test_reference_query_shapes(self):
+        self.assert_uses(Employee.objects.filter(site='ofankor', status='active', job_description='customer_champion'),
+                         'employee_site_status_job_idx')
+        self.assert_uses(AttendantEvaluation.objects.filter(attendant_id=1).values('percentage_score'),
+                         'evaluation_attendant_week_idx')
+
+
+@override_settings(RECOMPUTE_JOB_LEASE=60)
+class RecomputeJobLeaseTests(TestCase):
+    """Running jobs whose worker stopped renewing the lease are picked up again"""
+
+    def test_abandoned_running_job_is_reclaimed(self):
+        started = timezone.now() - timedelta(minutes=5)
+        abandoned = RecomputeJob.objects.create(kind='fuel', site='ofankor', status='running',
+                                                started_at=started, heartbeat_at=started)
+        alive = RecomputeJob.objects.create(kind='shop', site='ofankor', status='running',
+                                            started_at=started, heartbeat_at=timezone.now())
+
+        self.assertEqual(run_pending_jobs(), 1)
+        abandoned.refresh_from_db()
+        alive.refresh_from_db()
+        self.assertEqual(abandoned.status, 'done')
+        self.assertGreater(abandoned.heartbeat_at, started)
+        self.assertEqual(alive.status, 'running')
+
+
+class ScorecardTests(TestCase):
+    """A quarterly scorecard gives the same average as the raw rows of the quarter"""
+
+    def live_summary(self, employee):
+        rows = AttendantEvaluation.objects.filter(
+            Period.of('quarter', date(2025, 2, 1)).q('weekly_evaluation__date'), attendant=employee,
+        ).order_by('-weekly_evaluation__date')
+        scores = [row.percentage_score for row in rows]
+        return {
+            'qtr_score': round(sum(scores) / len(scores), 2),
+            'score_history': [{'date': row.weekly_evaluation.date.isoformat(), 'score': row.percentage_score}
+                              for row in rows[:HISTORY_LENGTH]],
+        }
+
+    def test_scorecard_matches_live_summary(self):
+        employee = make_employee('0275000000').employee_profile
+        # imported scores are not rounded to a cent; each row reaches the card in its own write
+        for week, raw_score in enumerate([4.5, 3, 4.5, 4.5, 4, 7, 1, 3.5, 6, 5.5, 4.5, 4]):
+            evaluation = AttendantEvaluation(
+                weekly_evaluation=WeeklyEvaluation.objects.create(date=date(2025, 1, 6) + timedelta(weeks=week)),
+                attendant=employee, raw_score=raw_score, percentage_score=raw_score / 7 * 100,
+            )
+            AttendantEvaluation.objects.bulk_create([evaluation])
+            record_bulk_created(AttendantEvaluation, [evaluation])
+
+        expected = self.live_summary(employee)
+        self.assertEqual(scorecard_summary('evaluation', employee.pk, date(2025, 2, 1)), expected)
+        refresh_scorecards()
+        self.assertEqual(scorecard_summary('evaluation', employee.pk, date(2025, 2, 1)), expected)
+
+
+class PerformanceRoundingTests(TestCase):
+    """Bulk writes store the performance save() would, to the cent"""
+
+    def test_batch_matches_row_by_row(self):
+        totals = [Decimal('22.79'), Decimal('106.96'), Decimal('12.345'), Decimal('0.01'), Decimal('500'),
+                  Decimal('0'), Decimal('1234.5'), 99.995, Decimal('250')]
+        targets = [16.96, 24.615384615384617, 100.0, 3.0, 0.0, 800.0, 333.3, 100.0, None]
+        grid = [Decimal(cents) / 100 for cents in range(0, 200001, 7)]
+        totals += grid
+        targets += [(16.96, 333.3, 7.0, 630.8571428571429)[index % 4] for index in range(len(grid))]
+
+        self.assertEqual(performance_array(totals, targets),
+                         [performance_for(total, target) for total, target in zip(totals, targets)])
+        # just under half a cent: a float pass rounded these up
+        self.assertEqual(performance_array([Decimal('22.79')], [16.96]), [Decimal('134.37')])
+
+
+@override_settings(PASSWORD_HASHERS=['django.contrib.auth.hashers.MD5PasswordHasher'])
+class BulkFuelSalesTests(APITestCase):
+    """Bulk fuel submissions save valid entries like save() would and report the rest per index"""
+
+    def setUp(self):
+        self.user = make_employee('0280000000')
+        self.other = make_employee('0280000001', site='palmwine')
+        self.captain = Captain.objects.create(user=make_employee('0280000002'), site='ofankor')
+        PumpTarget.objects.create(site='ofankor', pump='pump1', target=800)
+        PumpTarget.objects.create(site='palmwine', pump='pump1', target=300)
+        self.client.force_authenticate(self.user)
+
+    def test_valid_entries_saved_and_invalid_reported(self):
+        self.user.is_staff = True  # staff may enter sales for users at any site
+        self.user.save()
+        entry = {'captain': self.captain.id, 'date': '2025-03-01', 'pump': 'pump1', 'pms_sales': '123.45'}
+        response = self.client.post('/api/fuel-sales/bulk/', {'entries': [
+            entry,
+            {**entry, 'user': self.other.id, 'dx_sales': '10'},
+            {**entry, 'pump': 'pump9'},
+            {**entry, 'captain': 0},
+        ]}, format='json')
+
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual([row['index'] for row in response.data['created']], [0, 1])
+        self.assertEqual([error['index'] for error in response.data['errors']], [2, 3])
+        self.assertIn('pump', response.data['errors'][0]['errors'])
+        self.assertIn('captain', response.data['errors'][1]['errors'])
+
+        for sale in FuelSales.objects.all():
+            expected_site = 'ofankor' if sale.user_id == self.user.id else 'palmwine'
+            self.assertEqual(sale.site, expected_site)
+            self.assertIsNotNone(sale.performance)
+            self.assertEqual(sale.performance, sale.calculate_performance())
+
+        rollup = fuel_rollup_rows()
+        refresh_fuel_rollups()
+        self.assertEqual(fuel_rollup_rows(), rollup)
+
+    def test_entries_for_others_need_staff_or_their_sites_captain(self):
+        colleague = make_employee('0280000003')
+        entry = {'captain': self.captain.id, 'date': '2025-03-01', 'pump': 'pump1', 'pms_sales': '10'}
+        entries = [entry, {**entry, 'user': colleague.id}, {**entry, 'user': self.other.id}]
+
+        response = self.client.post('/api/fuel-sales/bulk/', entries, format='json')
+        self.assertEqual([row['index'] for row in response.data['created']], [0])
+        self.assertEqual([(error['index'], list(error['errors'])) for error in response.data['errors']],
+                         [(1, ['user']), (2, ['user'])])
+
+        # the ofankor captain may enter for ofankor users, not palmwine ones
+        self.client.force_authenticate(self.captain.user)
+        response = self.client.post('/api/fuel-sales/bulk/', entries[1:], format='json')
+        self.assertEqual([row['index'] for row in response.data['created']], [0])
+        self.assertEqual([error['index'] for error in response.data['errors']], [1])
+
+        self.assertEqual(sorted(FuelSales.objects.values_list('user_id', flat=True)),
+                         sorted([self.user.id, colleague.id]))
+
+
+@override_settings(PASSWORD_HASHERS=['django.contrib.auth.hashers.MD5PasswordHasher'])
+class BulkShopSalesTests(APITestCase):
+    """Bulk shop submissions upsert on (user, date) and keep the rollup in step"""
+
+    def setUp(self):
+        self.user = make_employee('0290000000', 'service_champion')
+        self.captain = Captain.objects.create(user=make_employee('0290000001', 'service_champion'), site='ofankor')
+        ShopTarget.objects.create(site='ofankor', target=1000)
+        self.client.force_authenticate(self.user)
+
+    def upsert(self, *entries):
+        return self.client.post('/api/shop-sales/bulk/', [
+            {'captain': self.captain.id, 'date': day, 'sales': sales} for day, sales in entries
+        ], format='json')
+
+    def test_insert_then_update(self):
+        response = self.upsert(('2025-01-01', '100'), ('2025-01-02', '200'))
+        self.assertEqual((response.data['inserted'], response.data['updated']), (2, 0))
+
+        response = self.upsert(('2025-01-02', '250'), ('2025-01-03', '300'), ('2025-01-02', '500'))
+        self.assertEqual((response.data['inserted'], response.data['updated']), (1, 1))
+        self.assertEqual([error['index'] for error in response.data['errors']], [0])
+
+        corrected = ShopSales.objects.get(user=self.user, date=date(2025, 1, 2))
+        self.assertEqual(corrected.sales, 500)
+        self.assertEqual(corrected.performance, corrected.calculate_performance())
+        self.assertEqual(ShopSales.objects.count(), 3)
+
+        rollup = shop_rollup_rows()
+        self.assertEqual([row[4] for row in rollup], [100, 500, 300])
+        refresh_shop_rollups()
+        self.assertEqual(shop_rollup_rows(), rollup)
+
+    def test_correction_after_transfer_keeps_entering_site(self):
+        ShopTarget.objects.create(site='palmwine', target=200)
+        self.upsert(('2025-01-01', '100'))
+        profile = self.user.employee_profile
+        profile.site = 'palmwine'
+        profile.save()
+
+        response = self.upsert(('2025-01-01', '300'), ('2025-01-05', '300'))
+        self.assertEqual((response.data['inserted'], response.data['updated']), (1, 1))
+
+        corrected = ShopSales.objects.get(user=self.user, date=date(2025, 1, 1))
+        self.assertEqual((corrected.site, corrected.sales, corrected.performance), ('ofankor', 300, Decimal('30.00')))
+        added = ShopSales.objects.get(user=self.user, date=date(2025, 1, 5))
+        self.assertEqual((added.site, added.performance), ('palmwine', Decimal('150.00')))
+
+        rollup = shop_rollup_rows()
+        self.assertEqual([(row[0], row[4]) for row in rollup], [('ofankor', 300), ('palmwine', 300)])
+        refresh_shop_rollups()
+        self.assertEqual(shop_rollup_rows(), rollup)
+
+    def test_insert_racing_the_upsert_is_counted_once(self):
+        def insert_while_waiting(user_ids):
+            # another writer inserts the same (user, date) and commits while the upsert waits for the lock
+            ShopSales.objects.create(user=self.user, captain=self.captain, date=date(2025, 1, 1), sales=100)
+            lock_sales_users(user_ids)
+
+        with mock.patch('employee.bulk.lock_sales_users', side_effect=insert_while_waiting):
+            response = self.upsert(('2025-01-01', '300'))
+
+        self.assertEqual((response.data['inserted'], response.data['updated']), (0, 1))
+        rollup = shop_rollup_rows()
+        self.assertEqual([row[4] for row in rollup], [300])
+        refresh_shop_rollups()
+        self.assertEqual(shop_rollup_rows(), rollup)
+
+    def test_entries_for_others_need_staff_or_their_sites_captain(self):
+        colleague = make_employee('0290000002', 'service_champion')
+        entries = [{'captain': self.captain.id, 'date': '2025-01-01', 'sales': '100', 'user': colleague.id}]
+
+        response = self.client.post('/api/shop-sales/bulk/', entries, format='json')
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(list(response.data['errors'][0]['errors']), ['user'])
+
+        self.client.force_authenticate(self.captain.user)
+        response = self.client.post('/api/shop-sales/bulk/', entries, format='json')
+        self.assertEqual(response.data['inserted'], 1)
+        self.assertEqual(ShopSales.objects.get().user, colleague)
+
+
+def cursor(*values):
+    return base64.urlsafe_b64encode(json.dumps(values).encode()).decode()
+
+
+def load_row_by_row(records, model):
+    """
+    Per-record reference for load_json_to_model: full_clean() and save() each record on its own.
+
+    The loader before batching cleaned each record the same way but wrote them all with one bulk_create at the
+    end, so a duplicate within the file aborted the whole load. Saving as it goes gives the per-record answer
+    the chunked loader is meant to reproduce, including for those duplicates.
+    """
+    fields = {field.name for field in model._meta.get_fields()} | {field.attname for field in model._meta.concrete_fields}
+    success_count, errors = 0, []
+    for record in records:
+        try:
+            with transaction.atomic():
+                data = {key: value for key, value in record.items() if key in fields}
+                if isinstance(data.get('date'), str):
+                    try:
+                        data['date'] = datetime.strptime(data['date'], '%Y-%m-%d').date()
+                    except ValueError:
+                        data['date'] = datetime.strptime(data['date'][:10], '%Y-%m-%d').date()
+                instance = model(**data)
+                instance.full_clean()
+                instance.save()
+            success_count += 1
+        except Exception as e:
+            errors.append({'record': record, 'error': str(e)})
+    return success_count, len(errors), errors
+
+
+@override_settings(PASSWORD_HASHERS=['django.contrib.auth.hashers.MD5PasswordHasher'])
+class JsonLoaderTests(TestCase):
+    """The chunked loader reports and writes what per-record cleaning and saving would, and derives what save() does"""
+
+    def setUp(self):
+        self.user = make_employee('0295000000', 'service_champion')
+        self.other = make_employee('0295000001', 'service_champion', site='palmwine')
+        self.captain = Captain.objects.create(user=make_employee('0295000002', 'service_champion'), site='ofankor')
+        ShopTarget.objects.create(site='ofankor', target=1000)
+        ShopTarget.objects.create(site='palmwine', target=400)
+        ShopSales.objects.create(user=self.user, captain=self.captain, date=date(2025, 1, 1), sales=50)
+
+    def load(self, loader):
+        """(result, shop sales written) of ``loader``, rolled back afterwards"""
+        with transaction.atomic():
+            result = loader()
+            rows = list(ShopSales.objects.order_by('user_id', 'date').values_list(
+                'user_id', 'date', 'sales', 'performance', 'site'))
+            transaction.set_rollback(True)
+        return result, rows
+
+    def test_batched_load_matches_row_by_row(self):
+        sale = {'user_id': self.user.id, 'captain_id': self.captain.id, 'sales': '120.50'}
+        records = [
+            {**sale, 'date': '2025-01-02'},
+            {**sale, 'date': '2025-01-01'},                     # clashes with a stored row
+            {**sale, 'user_id': self.other.id, 'date': '2025-01-02T08:00:00'},
+            {**sale, 'date': '2025-01-02', 'sales': '90'},      # clashes with the first record
+            {**sale, 'user_id': 999999, 'date': '2025-01-03'},  # unknown user
+            {**sale, 'date': 'not a date'},
+            {**sale, 'date': '2025-01-03', 'sales': '-'},
+            {**sale, 'user_id': self.other.id, 'date': '2025-01-03'},
+        ]
+        expected = self.load(lambda: load_row_by_row(records, ShopSales))
+        self.assertEqual(expected[0][:2], (3, 5))
+        for chunk_size in (2, 3, len(records)):
+            with self.subTest(chunk_size=chunk_size):
+                self.assertEqual(self.load(lambda: load_json_to_model(records, ShopSales, chunk_size=chunk_size)),
+                                 expected)
+
+    def test_update_derives_what_save_does(self):
+        week = WeeklyEvaluation.objects.create(date=date(2025, 2, 3))
+        evaluation = AttendantEvaluation.objects.create(weekly_evaluation=week, attendant=self.user.employee_profile,
+                                                        raw_score=7)
+        sale = FuelSales.objects.create(user=self.user, captain=self.captain, date=date(2025, 2, 3), pump='pump1',
+                                        pms_sales=100)
+        PumpTarget.objects.create(site='ofankor', pump='pump1', target=400)
+
+        self.assertEqual(load_json_to_model([{'id': evaluation.id, 'raw_score': 3.5}], AttendantEvaluation,
+                                            update_existing=True)[:2], (1, 0))
+        self.assertEqual(load_json_to_model([{'id': sale.id, 'pms_sales': 300}], FuelSales,
+                                            update_existing=True)[:2], (1, 0))
+
+        evaluation.refresh_from_db()
+        self.assertEqual(evaluation.percentage_score, 50.0)
+        card = QuarterlyScorecard.objects.get(employee=self.user.employee_profile, kind='evaluation')
+        self.assertEqual((card.score_sum, card.score_count), (50.0, 1))
+        sale.refresh_from_db()
+        self.assertEqual(sale.performance, sale.calculate_performance())
+        rollup = fuel_rollup_rows()
+        refresh_fuel_rollups()
+        self.assertEqual(fuel_rollup_rows(), rollup)
+
+
+@override_settings(PASSWORD_HASHERS=['django.contrib.auth.hashers.MD5PasswordHasher'])
+class KeysetPaginationTests(APITestCase):
+    """Keyset pages cover every row exactly once, honour the filters and reject bad cursors"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = make_employee('0300000000')
+        other = make_employee('0300000001', site='palmwine')
+        captain = Captain.objects.create(user=make_employee('0300000002'), site='ofankor')
+        for i in range(8):
+            # pairs of rows share a date, so pages must break ties on id
+            FuelSales.objects.create(user=cls.user if i % 4 else other, captain=captain, pump=f'pump{i % 2 + 1}',
+                                     date=date(2025, 1, 1) + timedelta(days=i // 2), pms_sales=10)
+
+    def setUp(self):
+        self.client.force_authenticate(self.user)
+
+    def walk(self, params):
+        ids, url, pages = [], '/api/fuel-sales/', 0
+        while url:
+            response = self.client.get(url, params if not pages else None)
+            self.assertEqual(response.status_code, 200)
+            ids += [row['id'] for row in response.data['results']]
+            url, pages = response.data['next'], pages + 1
+        return ids, pages
+
+    def test_pages_cover_every_row_once(self):
+        ids, pages = self.walk({'page_size': 3})
+        expected = list(FuelSales.objects.order_by('-date', '-id').values_list('id', flat=True))
+        self.assertEqual(ids, expected)
+        self.assertEqual(pages, 3)
+
+        ids, pages = self.walk({'page_size': 4})  # last page exactly full: no empty extra page
+        self.assertEqual(ids, expected)
+        self.assertEqual(pages, 2)
+
+    def test_filters(self):
+        ids, _ = self.walk({'page_size': 2, 'date_from': '2025-01-02', 'date_to': '2025-01-03', 'pump': 'pump1'})
+        expected = FuelSales.objects.filter(date__range=(date(2025, 1, 2), date(2025, 1, 3)), pump='pump1')
+        self.assertEqual(ids, list(expected.order_by('-date', '-id').values_list('id', flat=True)))
+
+        ids, _ = self.walk({'site': 'palmwine'})
+        self.assertEqual(len(ids), 2)
+
+    def test_bad_cursors_are_not_found(self):
+        for bad in ('not-base64!', cursor('2025-01-01'), cursor('abc', 1), cursor('2025-01-01', 'x'),
+                    cursor(None, 1), cursor('2025-01-01', 10 ** 30), cursor({'date': 1}, 1)):
+            response = self.client.get('/api/fuel-sales/', {'cursor': bad})
+            self.assertEqual(response.status_code, 404, bad)
+            self.assertEqual(response.data['detail'], 'Invalid cursor.')
+
+
+def bump_in_another_process(scope):
+    """What another worker's (or a management command's) write leaves behind: only the shared version row"""
+    ScopeVersion.objects.filter(scope=scope).update(version=F('version') + 1)
+
+
+@override_settings(PASSWORD_HASHERS=['django.contrib.auth.hashers.MD5PasswordHasher'], RECOMPUTE_JOBS_ASYNC=False)
+class SummaryCacheTests(APITestCase):
+    """Cached summaries are recomputed after any write to their data, wherever it came from"""
+
+    def setUp(self):
+        with self.captureOnCommitCallbacks(execute=True):  # data versions are bumped when writes commit
+            self.user = make_employee('0310000000')
+            self.captain = Captain.objects.create(user=make_employee('0310000001'), site='ofankor')
+            PumpTarget.objects.create(site='ofankor', pump='pump1', target=1000)
+        self.client.force_authenticate(self.user)
+
+    def summary(self):
+        response = self.client.get('/api/fuel-sales-summary/')
+        self.assertEqual(response.status_code, 200)
+        return response
+
+    def sell(self, pms):
+        with self.captureOnCommitCallbacks(execute=True):
+            FuelSales.objects.create(user=self.user, captain=self.captain, date=timezone.localdate(),
+                                     pump='pump1', pms_sales=pms)
+
+    def test_sale_outside_request_invalidates(self):
+        self.sell(100)
+        self.assertEqual(self.summary()['X-Cache'], 'MISS')
+        self.assertEqual(self.summary()['X-Cache'], 'HIT')
+
+        self.sell(50)
+        response = self.summary()
+        self.assertEqual(response['X-Cache'], 'MISS')
+        self.assertEqual(response.data['current_performance']['raw_score'], 150)
+
+    def test_write_bumps_once_when_it_commits(self):
+        with CaptureQueriesContext(connection) as queries, self.captureOnCommitCallbacks() as callbacks:
+            FuelSales.objects.create(user=self.user, captain=self.captain, date=timezone.localdate(),
+                                     pump='pump1', pms_sales=100)
+        self.assertFalse([q['sql'] for q in queries if 'employee_scopeversion' in q['sql']])
+
+        with CaptureQueriesContext(connection) as queries:
+            for callback in callbacks:
+                callback()
+        self.assertEqual(len([q for q in queries if q['sql'].startswith('UPDATE "employee_scopeversion"')]), 1)
+        scopes = set(ScopeVersion.objects.values_list('scope', flat=True))
+        self.assertTrue({'model:employee.fuelsales', 'fuel:site:ofankor', f'fuel:user:{self.user.pk}'} <= scopes)
+        self.assertNotIn('model:employee.fuelsalesdaily', scopes)
+
+    def test_write_from_another_process_invalidates(self):
+        self.summary()
+        self.assertEqual(self.summary()['X-Cache'], 'HIT')
+        bump_in_another_process('fuel:site:ofankor')
+        self.assertEqual(self.summary()['X-Cache'], 'MISS')
+
+
+@override_settings(PASSWORD_HASHERS=['django.contrib.auth.hashers.MD5PasswordHasher'])
+class ConditionalGetTests(APITestCase):
+    """304 only while nothing the response depends on was written, by this process or another"""
+
+    def setUp(self):
+        with self.captureOnCommitCallbacks(execute=True):  # data versions are bumped when writes commit
+            self.user = make_employee('0320000000')
+            self.captain = Captain.objects.create(user=make_employee('0320000001'), site='ofankor')
+        self.client.force_authenticate(self.user)
+
+    def get(self, url, etag=None):
+        return self.client.get(url, HTTP_IF_NONE_MATCH=etag) if etag else self.client.get(url)
+
+    def test_list_etag(self):
+        etag = self.get('/api/fuel-sales/')['ETag']
+        self.assertEqual(self.get('/api/fuel-sales/', etag).status_code, 304)
+
+        bump_in_another_process('model:employee.fuelsales')
+        response = self.get('/api/fuel-sales/', etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], etag)
+
+        etag = response['ETag']
+        with self.captureOnCommitCallbacks(execute=True):
+            FuelSales.objects.create(user=self.user, captain=self.captain, date=date(2025, 1, 1), pump='pump1')
+        response = self.get('/api/fuel-sales/', etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.data['results']), 1)
+
+    def test_summary_etag(self):
+        etag = self.get('/api/fuel-sales-summary/')['ETag']
+        self.assertEqual(self.get('/api/fuel-sales-summary/', etag).status_code, 304)
+
+        bump_in_another_process('fuel:site:ofankor')
+        self.assertEqual(self.get('/api/fuel-sales-summary/', etag).status_code, 200)
+
+
+@override_settings(PASSWORD_HASHERS=['django.contrib.auth.hashers.MD5PasswordHasher'], REPLICA_LAG_TOLERANCE=5)
+class ReplicaPinningTests(APITestCase):
+    """A user who wrote reads from the primary for a while, however they authenticate next"""
+
+    def setUp(self):
+        # pins must be visible to every worker, so the replica needs a shared cache
+        self.enterContext(override_settings(CACHES={'default': {
+            'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+            'LOCATION': self.enterContext(TemporaryDirectory()),
+        }}))
+        self.user = make_employee('0300000000')
+        self.other = make_employee('0300000001')
+        User.objects.filter(pk__in=[self.user.pk, self.other.pk]).update(is_staff=True)
+        self.captain = Captain.objects.create(user=make_employee('0300000002'), site='ofankor')
+        PumpTarget.objects.create(site='ofankor', pump='pump1', target=800)
+
+    def read_aliases(self, user, token=True):
+        """Aliases ReplicaRouter picks for the reads of one GET by ``user`` (all served by the test database)"""
+        self.client.cookies.clear()
+        self.client.logout()
+        self.client.credentials()
+        if token:
+            self.client.credentials(HTTP_AUTHORIZATION=f'Token {Token.objects.get_or_create(user=user)[0].key}')
+        else:
+            self.client.force_login(user)
+
+        aliases, route = [], ReplicaRouter.db_for_read
+
+        def db_for_read(router, model, **hints):
+            aliases.append(route(router, model, **hints))
+            return DEFAULT_DB_ALIAS
+
+        with mock.patch.object(ReplicaRouter, 'db_for_read', db_for_read):
+            self.assertEqual(self.client.get('/api/recompute-jobs/').status_code, 200)
+        return aliases
+
+    @mock.patch('employee.routers.replica_enabled', return_value=True)
+    def test_user_reads_own_writes_from_primary(self, _):
+        self.assertEqual(self.read_aliases(self.user)[-1], REPLICA)
+
+        self.client.credentials(HTTP_AUTHORIZATION=f'Token {Token.objects.get_or_create(user=self.user)[0].key}')
+        response = self.client.post('/api/fuel-sales/bulk/', {'entries': [
+            {'captain': self.captain.id, 'date': '2025-03-01', 'pump': 'pump1', 'pms_sales': '100'},
+        ]}, format='json')
+        self.assertEqual(response.status_code, 201)
+
+        # pinned by user, not by the header or cookie the write came with
+        Token.objects.filter(user=self.user).delete()
+        self.assertNotIn(REPLICA, self.read_aliases(self.user))
+        # a session and its user are read before the user is known; the view's reads are not
+        self.assertEqual(self.read_aliases(self.user, token=False)[-1], DEFAULT_DB_ALIAS)
+        self.assertEqual(self.read_aliases(self.other)[-1], REPLICA)
+
+    @mock.patch('employee.routers.replica_enabled', return_value=True)
+    def test_replica_refuses_a_per_process_cache(self, _):
+        ReplicaPinningMiddleware(lambda request: None)
+        with override_settings(CACHES={'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}}):
+            with self.assertRaises(ImproperlyConfigured):
+                ReplicaPinningMiddleware(lambda request: None)
+
+
+@override_settings(PASSWORD_HASHERS=['django.contrib.auth.hashers.MD5PasswordHasher'], INITIAL_PASSWORD='')
+class InitialPasswordTests(APITestCase):
+    """Imported accounts get a configured or unusable password and must replace it before getting a token"""
+
+    EMPLOYEE = {
+        'name': 'Imported', 'gender': 'F', 'contact': '0310000000', 'dob': date(1990, 1, 1), 'location': 'Accra',
+        'guarantor_name': 'Guarantor', 'guarantor_contact': '0310000001', 'job_description': 'customer_champion',
+        'date_employed': date(2024, 1, 1), 'training_start': date(2024, 1, 1), 'training_end': date(2024, 1, 10),
+        'site': 'ofankor',
+    }
+
+    def import_employee(self, **kwargs):
+        workbook = Workbook()
+        workbook.active.append(list(self.EMPLOYEE))
+        workbook.active.append(list(self.EMPLOYEE.values()))
+        source = BytesIO()
+        workbook.save(source)
+        source.seek(0)
+        self.assertEqual(import_excel(source, 'employees', **kwargs).created, 1)
+        return User.objects.get(username=self.EMPLOYEE['contact'])
+
+    def login(self, **data):
+        return self.client.post('/api/token-auth/', {'username': self.EMPLOYEE['contact'], **data}, format='json')
+
+    def test_import_without_initial_password_is_unusable(self):
+        user = self.import_employee()
+        self.assertTrue(user.must_change_password)
+        self.assertFalse(user.has_usable_password())
+
+    def test_first_login_must_set_a_new_password(self):
+        user = self.import_employee(password='first-Login-42')
+        self.assertTrue(user.must_change_password)
+
+        response = self.login(password='first-Login-42')
+        self.assertEqual(response.status_code, 403)
+        self.assertTrue(response.data['password_change_required'])
+        self.assertFalse(Token.objects.filter(user=user).exists())
+
+        self.assertEqual(self.login(password='first-Login-42', new_password='123').status_code, 400)
+
+        response = self.login(password='first-Login-42', new_password='a-Better-secret-77')
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('token', response.data)
+        user.refresh_from_db()
+        self.assertFalse(user.must_change_password)
+        self.assertEqual(self.login(password='a-Better-secret-77').status_code, 200)
+
+    def test_create_employees_shared_hash_forces_change(self):
+        record = {**self.EMPLOYEE, **{key: value.isoformat() for key, value in self.EMPLOYEE.items()
+                                      if isinstance(value, date)}}
+        with NamedTemporaryFile('w', suffix='.json') as source:
+            json.dump([record, {**record, 'contact': '0310000002'}], source)
+            source.flush()
+            call_command('create_employees', file=source.name, workers=1, shared_hash=True,
+                         initial_password='first-Login-42', stdout=StringIO())
+
+        users = User.objects.filter(username__in=[self.EMPLOYEE['contact'], '0310000002'])
+        self.assertEqual([user.must_change_password for user in users], [True, True])
+        self.assertTrue(all(user.check_password('first-Login-42') for user in users))
+        self.assertEqual(self.login(password='first-Login-42').status_code, 403)
@@ -1,14 +1,18 @@
 from django.urls import path, include
 from rest_framework.routers import DefaultRouter
 from .auth_token import CustomAuthToken
+from .bootstrap import BootstrapView
+from .exports import ExportView
 
 from .viewset import (EmployeeViewSet, FuelSalesViewSet, ShopSalesViewSet, BulkAttendanceViewSet,
                       CreditSalesViewSet, CreditCollectionViewSet, CaptainViewSet, CaptainViewSetShop,
-                      ActiveAttendantViewSet, WeeklyEvaluationViewSet, WeeklyEvaluationViewSetPost)
+                      ActiveAttendantViewSet, WeeklyEvaluationViewSet, WeeklyEvaluationViewSetPost,
+                      RecomputeJobViewSet)
 
 
 from .viewsummary import (UserPerformanceSummaryFuel, EvaluationSummaryView, CombinedPerformanceView,
-                          AttendanceSummaryView, FuelSalesSummaryView, ShopSalesSummaryView)
+                          AttendanceSummaryView, FuelSalesSummaryView, ShopSalesSummaryView,
+                          CacheStatsView, LeaderboardView)
 
 
 router = DefaultRouter()
@@ -23,6 +27,7 @@ router.register(r'captains-pump', CaptainViewSet, basename='pump-captain')
 router.register(r'captains-shop', CaptainViewSetShop, basename='shop-captain')
 router.register(r'active-attendants', ActiveAttendantViewSet, basename='active-attendant')
 router.register(r'daily-attendance-post', BulkAttendanceViewSet, basename='daily-attendance-post')
+router.register(r'recompute-jobs', RecomputeJobViewSet)
 
 
 
@@ -30,6 +35,7 @@ router.register(r'daily-attendance-post', BulkAttendanceViewSet, basename='daily
 urlpatterns = [
     path('api/', include(router.urls)),
     path('api/token-auth/', CustomAuthToken.as_view(), name='api_token_auth'),
+    path('api/bootstrap/', BootstrapView.as_view(), name='bootstrap'),
     path('api/fuel-performance-summary/', UserPerformanceSummaryFuel.as_view(), name='performance-summary'),
     path('api/fuel-performance-summary/<int:user_id>/', UserPerformanceSummaryFuel.as_view(), name='performance-summary-user'),
     path('api/evaluation-summary/', EvaluationSummaryView.as_view(), name='evaluation-summary'),
@@ -38,6 +44,9 @@ urlpatterns = [
     path('api/attendance-summary/<int:user_id>/', AttendanceSummaryView.as_view(), name='attendance-summary-user'),
     path('api/fuel-sales-summary/', FuelSalesSummaryView.as_view(), name='fuel-sales-summary'),
      path('api/shop-sales-summary/', ShopSalesSummaryView.as_view(), name='shop-sales-summary'),
+    path('api/cache-stats/', CacheStatsView.as_view(), name='cache-stats'),
+    path('api/leaderboard/', LeaderboardView.as_view(), name='leaderboard'),
+    path('api/export/<slug:dataset>.<slug:fmt>', ExportView.as_view(), name='export'),
     
     
     
@@ -1,11 +1,12 @@
 # views.py
 from rest_framework.generics import CreateAPIView
-from rest_framework.permissions import IsAuthenticated
-from .models import (Employee, FuelSales, ShopSales, Attendance, Captain, WeeklyEvaluation, CreditSales, CreditCollection)
+from rest_framework.permissions import IsAuthenticated, IsAdminUser
+from .models import (Employee, FuelSales, ShopSales, Attendance, Captain, WeeklyEvaluation, CreditSales, CreditCollection,
+                     RecomputeJob, Customer, AttendanceRegister)
 from .serializers import ( EmployeeSerializer, FuelSalesSerializer,
                           ShopSalesSerializer, AttendanceSerializer, CreditSalesSerializer, CaptainSerializer,
                           CreditCollectionSerializer, AttendantEvaluation, WeeklyEvaluationSerializer, 
-                          AttendanceDate, BulkAttendanceSerializer)
+                          AttendanceDate, BulkAttendanceSerializer, RecomputeJobSerializer)
 from rest_framework.decorators import action
 from rest_framework import viewsets, permissions
 from rest_framework.exceptions import PermissionDenied
@@ -17,6 +18,11 @@ from rest_framework.response import Response
 from rest_framework import status
 from django.db.models import Avg, Q, Sum
 
+from django_filters.rest_framework import DjangoFilterBackend
+from .filters import EmployeeFilter, FuelSalesFilter, ShopSalesFilter, CreditSalesFilter, CreditCollectionFilter
+from .pagination import DateKeysetPagination, IdKeysetPagination
+from .bulk import MAX_BULK_ENTRIES, create_fuel_sales, upsert_shop_sales
+from .caching import ConditionalListMixin
 from . functions import print_model_objects, reset_model_data, convert_to_json, read_file
 
 #reset_model_data(ShopSales)
@@ -31,10 +37,13 @@ from . functions import print_model_objects, reset_model_data, convert_to_json,
 
 
 
-class EmployeeViewSet(viewsets.ModelViewSet):
+class EmployeeViewSet(ConditionalListMixin, viewsets.ModelViewSet):
     queryset = Employee.objects.all()
     serializer_class = EmployeeSerializer
     permission_classes = [IsAuthenticated]  # Basic auth - anyone logged in can access
+    pagination_class = IdKeysetPagination
+    filter_backends = [DjangoFilterBackend]
+    filterset_class = EmployeeFilter
     
     def perform_create(self, serializer):
         """Automatically link user if contact matches username"""
@@ -52,26 +61,70 @@ class EmployeeViewSet(viewsets.ModelViewSet):
         return Response(serializer.data)
     
     
-class FuelSalesViewSet(viewsets.ModelViewSet):
-    queryset = FuelSales.objects.all()
+class FuelSalesViewSet(ConditionalListMixin, viewsets.ModelViewSet):
+    # names for employee_name/captain_name come from the joins, not one query per row
+    queryset = FuelSales.objects.select_related('user__employee_profile', 'captain__user__employee_profile')
+    etag_models = (FuelSales, Employee, Captain)
     serializer_class = FuelSalesSerializer
     permission_classes = [IsAuthenticated]  # Ensure only authenticated users can post
+    pagination_class = DateKeysetPagination
+    filter_backends = [DjangoFilterBackend]
+    filterset_class = FuelSalesFilter
 
     def perform_create(self, serializer):
         serializer.save(user=self.request.user)
+
+    @action(detail=False, methods=['post'], url_path='bulk')
+    def bulk(self, request):
+        """Create a shift's fuel sales in one request; invalid entries are reported, valid ones saved"""
+        entries = request.data.get('entries') if isinstance(request.data, dict) else request.data
+        if not isinstance(entries, list) or not entries:
+            return Response({'detail': 'Provide a non-empty list of entries.'}, status=status.HTTP_400_BAD_REQUEST)
+        if len(entries) > MAX_BULK_ENTRIES:
+            return Response({'detail': f'At most {MAX_BULK_ENTRIES} entries per request.'},
+                            status=status.HTTP_400_BAD_REQUEST)
+
+        created, errors = create_fuel_sales(entries, request.user)
+
+        return Response({
+            'created': [{'index': index, 'id': sale.id, 'performance': sale.performance} for index, sale in created],
+            'errors': errors,
+        }, status=status.HTTP_201_CREATED if created else status.HTTP_400_BAD_REQUEST)
     
 
-class ShopSalesViewSet(viewsets.ModelViewSet):
-    queryset = ShopSales.objects.all()
+class ShopSalesViewSet(ConditionalListMixin, viewsets.ModelViewSet):
+    queryset = ShopSales.objects.select_related('user__employee_profile', 'captain__user__employee_profile')
+    etag_models = (ShopSales, Employee, Captain)
     serializer_class = ShopSalesSerializer
     permission_classes = [IsAuthenticated]  # Ensure only authenticated users can post
+    pagination_class = DateKeysetPagination
+    filter_backends = [DjangoFilterBackend]
+    filterset_class = ShopSalesFilter
 
     def perform_create(self, serializer):
         serializer.save(user=self.request.user) 
+
+    @action(detail=False, methods=['post'], url_path='bulk')
+    def bulk(self, request):
+        """Insert or update many shop sales on (user, date) in one request"""
+        entries = request.data.get('entries') if isinstance(request.data, dict) else request.data
+        if not isinstance(entries, list) or not entries:
+            return Response({'detail': 'Provide a non-empty list of entries.'}, status=status.HTTP_400_BAD_REQUEST)
+        if len(entries) > MAX_BULK_ENTRIES:
+            return Response({'detail': f'At most {MAX_BULK_ENTRIES} entries per request.'},
+                            status=status.HTTP_400_BAD_REQUEST)
+
+        inserted, updated, errors = upsert_shop_sales(entries, request.user)
+
+        return Response({
+            'inserted': inserted,
+            'updated': updated,
+            'errors': errors,
+        }, status=status.HTTP_200_OK if inserted or updated else status.HTTP_400_BAD_REQUEST)
         
 
 
-class AttendanceViewSet(viewsets.ModelViewSet):
+class AttendanceViewSet(ConditionalListMixin, viewsets.ModelViewSet):
     queryset = Attendance.objects.all()
     serializer_class = AttendanceSerializer
     permission_classes = [IsAuthenticated]  # Ensure only authenticated users can post
@@ -96,24 +149,32 @@ class AttendanceViewSet(viewsets.ModelViewSet):
 
 
 
-class CreditSalesViewSet(viewsets.ModelViewSet):
-    queryset = CreditSales.objects.all()
+class CreditSalesViewSet(ConditionalListMixin, viewsets.ModelViewSet):
+    queryset = CreditSales.objects.select_related('customer')
+    etag_models = (CreditSales, Customer)
     serializer_class = CreditSalesSerializer
     permission_classes = [IsAuthenticated]  # Ensure only authenticated users can post
+    pagination_class = DateKeysetPagination
+    filter_backends = [DjangoFilterBackend]
+    filterset_class = CreditSalesFilter
 
     def perform_create(self, serializer):
         serializer.save(user=self.request.user)
 
     def get_queryset(self):
         # Optional: limit to current user’s sales only
-        return CreditSales.objects.all()
+        return CreditSales.objects.select_related('customer')
     
    
     
-class CreditCollectionViewSet(viewsets.ModelViewSet):
-    queryset = CreditCollection.objects.all()
+class CreditCollectionViewSet(ConditionalListMixin, viewsets.ModelViewSet):
+    queryset = CreditCollection.objects.select_related('customer')
+    etag_models = (CreditCollection, Customer)
     serializer_class = CreditCollectionSerializer
     permission_classes = [IsAuthenticated]  # Ensure only authenticated users can post
+    pagination_class = DateKeysetPagination
+    filter_backends = [DjangoFilterBackend]
+    filterset_class = CreditCollectionFilter
 
     def perform_create(self, serializer):
         # Get logged-in user's employee profile
@@ -129,34 +190,37 @@ class CreditCollectionViewSet(viewsets.ModelViewSet):
         serializer.save()
 
     def get_queryset(self):
-        return CreditCollection.objects.all()
+        return CreditCollection.objects.select_related('customer')
 
 
-class ActiveAttendantViewSet(viewsets.ReadOnlyModelViewSet):
+class ActiveAttendantViewSet(ConditionalListMixin, viewsets.ReadOnlyModelViewSet):
     queryset = Employee.objects.filter(status='active', job_description__in=['customer_champion', 'service_champion'])
     serializer_class = EmployeeSerializer
 
 
 
-class CaptainViewSet(viewsets.ReadOnlyModelViewSet):  # ReadOnly since we’re only listing
+class CaptainViewSet(ConditionalListMixin, viewsets.ReadOnlyModelViewSet):  # ReadOnly since we’re only listing
     queryset = Captain.objects.filter(
         Q(user__employee_profile__status='active') & 
         Q(user__employee_profile__job_description__in=['customer_champion'])
-    )
+    ).select_related('user__employee_profile')
+    etag_models = (Captain, Employee)
     serializer_class = CaptainSerializer
 
 
 
-class CaptainViewSetShop(viewsets.ReadOnlyModelViewSet):  # ReadOnly since we’re only listing
+class CaptainViewSetShop(ConditionalListMixin, viewsets.ReadOnlyModelViewSet):  # ReadOnly since we’re only listing
     queryset = Captain.objects.filter(
         Q(user__employee_profile__status='active') & 
         Q(user__employee_profile__job_description__in=['service_champion'])
-    )
+    ).select_related('user__employee_profile')
+    etag_models = (Captain, Employee)
     serializer_class = CaptainSerializer
 
     
-class WeeklyEvaluationViewSet(viewsets.ModelViewSet):
-    queryset = WeeklyEvaluation.objects.all()
+class WeeklyEvaluationViewSet(ConditionalListMixin, viewsets.ModelViewSet):
+    queryset = WeeklyEvaluation.objects.prefetch_related('attendant_scores__attendant')
+    etag_models = (WeeklyEvaluation, AttendantEvaluation, Employee)
     serializer_class = WeeklyEvaluationSerializer
 
 
@@ -224,8 +288,9 @@ class WeeklyEvaluationViewSetPost(viewsets.ViewSet):
 
 
 
-class BulkAttendanceViewSet(viewsets.ModelViewSet):
+class BulkAttendanceViewSet(ConditionalListMixin, viewsets.ModelViewSet):
     queryset = AttendanceDate.objects.all().order_by('-date')
+    etag_models = (AttendanceDate, AttendanceRegister, Employee)
     serializer_class = BulkAttendanceSerializer
     permission_classes = [IsAuthenticated]
 
@@ -233,4 +298,12 @@ class BulkAttendanceViewSet(viewsets.ModelViewSet):
         serializer = self.get_serializer(data=request.data)
         serializer.is_valid(raise_exception=True)
         attendance_date = serializer.save()
-        return Response({'attendance_date': str(attendance_date.date)}, status=status.HTTP_201_CREATED)
\ No newline at end of file
+        return Response({'attendance_date': str(attendance_date.date)}, status=status.HTTP_201_CREATED)
+
+
+
+class RecomputeJobViewSet(viewsets.ReadOnlyModelViewSet):
+    """Status of the background performance recomputes queued by target changes"""
+    queryset = RecomputeJob.objects.all().order_by('-id')
+    serializer_class = RecomputeJobSerializer
+    permission_classes = [IsAdminUser]
@@ -1,25 +1,206 @@
-from django.db.models import Avg, Q, Sum
-from datetime import datetime, timedelta
+from django.db.models import Avg, ExpressionWrapper, F, IntegerField, Sum
+from django.db.models.functions import ExtractMonth, ExtractQuarter, Round
+from datetime import datetime
 from rest_framework.views import APIView
 from rest_framework.response import Response
 from rest_framework import status
-from . models import FuelSales, ShopSales, AttendantEvaluation, AttendanceRegister
-from rest_framework.permissions import IsAuthenticated
+from . models import FuelSales, ShopSales, AttendantEvaluation
+from rest_framework.permissions import IsAuthenticated, IsAdminUser
 from datetime import date
 from django.utils.timezone import now
 from calendar import monthrange
 from decimal import Decimal
+import numpy as np
 from django.contrib.auth import get_user_model
-from .models import FuelSales, PumpTarget, Captain, ShopTarget
+from .models import (FuelSales, PumpTarget, Captain, ShopTarget, FuelSalesDaily, ShopSalesDaily, SITE_CHOICES,
+                     Employee, AttendanceRegister)
+from .caching import cached_response, local_cache_stats, model_scope, response_cache_stats
+from .targets import get_user_site
+from .periods import UNITS, Period
+from .leaderboard import METRICS, site_leaderboard
+from .scorecards import scorecard_summary
 
 
 
 
 User = get_user_model()
 
+
+def _average(rows):
+    """Average performance from rollup sums (mirrors Avg('performance') on the raw rows)"""
+    total, count = rows['performance_total'], rows['performance_rows']
+    return total / count if count else 0
+
+
+#per-row performance totals read from the daily rollups
+PERFORMANCE_SUMS = {
+    'performance_total': Sum('performance_sum'),
+    'performance_rows': Sum('performance_count'),
+}
+FUEL_TOTAL = Sum(F('pms_sales') + F('dx_sales') + F('vp_sales'))
+
+
+#data scopes each cached summary depends on (bumped by employee/signals.py and the rollups)
+def _user_id(request, user_id):
+    return user_id or request.user.id
+
+
+def combined_scopes(view, request, user_id=None):
+    user_id = _user_id(request, user_id)
+    return [f'fuel:user:{user_id}', 'evaluation', f'evaluation:employee:{user_id}']
+
+
+def fuel_user_scopes(view, request, user_id=None):
+    return [f'fuel:user:{user_id or 3}']
+
+
+def evaluation_scopes(view, request, user_id=None):
+    return ['evaluation', f'evaluation:employee:{_user_id(request, user_id)}']
+
+
+def attendance_scopes(view, request, user_id=None):
+    return ['attendance', f'attendance:employee:{_user_id(request, user_id)}']
+
+
+def fuel_site_scopes(view, request):
+    site = get_user_site(request.user.id)
+    return [f'fuel:site:{site}'] if site else None
+
+
+def shop_site_scopes(view, request):
+    site = get_user_site(request.user.id)
+    return [f'shop:site:{site}'] if site else None
+
+
+def _leaderboard_site(request):
+    return request.query_params.get('site') or get_user_site(request.user.id)
+
+
+def leaderboard_scopes(view, request):
+    site = _leaderboard_site(request)
+    if not site:
+        return None
+    # score rows of any employee can move a site's ranking, so those use the model-wide versions
+    return [f'fuel:site:{site}', f'shop:site:{site}', 'evaluation', 'attendance',
+            model_scope(AttendantEvaluation), model_scope(AttendanceRegister), model_scope(Employee)]
+
+
+def _performance_columns(user_id, period):
+    """
+    The user's daily rollup rows within ``period`` as columns: day
+    (datetime64[D]), performance sum in integer cents and performance row
+    count. One range query on the (user, day) index, no GROUP BY.
+    """
+    # cents (rounded in SQL) keep the sums exact and skip per-row Decimal conversion
+    cents = ExpressionWrapper(Round(F('performance_sum') * 100), output_field=IntegerField())
+    rows = list(FuelSalesDaily.objects.filter(period.q('day'), user_id=user_id)
+                .values_list('day', cents, 'performance_count'))
+    if not rows:
+        return np.array([], dtype='datetime64[D]'), np.array([], dtype=np.int64), np.array([], dtype=np.int64)
+    days, sums, counts = zip(*rows)
+    return np.array(days, dtype='datetime64[D]'), np.array(sums, dtype=np.int64), np.array(counts, dtype=np.int64)
+
+
+def _bucket_averages(buckets, cents, counts, size):
+    """Average performance per bucket index (0 where a bucket has no performance rows)"""
+    totals = np.bincount(buckets, weights=cents, minlength=size)
+    rows = np.bincount(buckets, weights=counts, minlength=size)
+    return np.divide(totals, rows * 100, out=np.zeros(size), where=rows > 0)
+
+
+def combined_performance(user_id, year, last_n_days):
+    """
+    CombinedPerformanceView payload: the all-years average aggregated in SQL,
+    one fetch of the selected year's rollup days and one of evaluations
+    """
+    # ===== 1. Fuel Performance Data (daily rollups of the selected year) =====
+    selected_year = Period.year(year)
+    year_days, year_cents, year_counts = _performance_columns(user_id, selected_year)
+
+    # Average performance (all years, aggregated in SQL)
+    avg_performance = _average(FuelSalesDaily.objects.filter(user_id=user_id).aggregate(**PERFORMANCE_SUMS))
+
+    month_index = year_days.astype('datetime64[M]').astype(np.int64) % 12  # 0 = January
+
+    # Quarterly breakdown
+    quarter_averages = _bucket_averages(month_index // 3, year_cents, year_counts, 4)
+    quarters = [
+        {
+            'quarter': quarter.label,
+            'average': round(float(quarter_averages[index]), 2)
+        }
+        for index, quarter in enumerate(selected_year.buckets('quarter'))
+    ]
+
+    # Monthly data (months with rollup rows only)
+    month_periods = selected_year.buckets('month')
+    month_averages = _bucket_averages(month_index, year_cents, year_counts, 12)
+    monthly_data = [
+        {
+            'month': month_periods[index].label,
+            'performance': round(float(month_averages[index]), 2)
+        }
+        for index in np.flatnonzero(np.bincount(month_index, minlength=12))
+    ]
+
+    # Daily data (last N days; later-dated entries in the year are kept, as before)
+    recent = year_days >= np.datetime64(Period.rolling_days(last_n_days).start)
+    unique_days, day_index = np.unique(year_days[recent], return_inverse=True)
+    day_averages = _bucket_averages(day_index, year_cents[recent], year_counts[recent], len(unique_days))
+    daily_data = [
+        {
+            'date': day.strftime('%Y-%m-%d'),
+            'day': day.strftime('%a'),
+            'performance': round(float(average), 2)
+        }
+        for day, average in zip(unique_days.astype(object), day_averages)
+    ]
+
+    # ===== 2. Evaluation Data (last 10, one query) =====
+    evaluations = list(
+        AttendantEvaluation.objects.filter(attendant=user_id)
+        .order_by('-weekly_evaluation__date')
+        .values_list('weekly_evaluation__date', 'percentage_score')[:10]
+    )
+
+    average_score = round(
+        sum(score for _, score in evaluations) / len(evaluations), 2
+    ) if evaluations else 0.0
+
+    performance_history = [
+        {
+            'date': evaluated_on.strftime('%Y-%m-%d'),
+            'performance': score
+        }
+        for evaluated_on, score in evaluations
+    ]
+
+    # ===== 3. Final Response =====
+    return {
+        # Core metrics
+        'average_performance': round(float(avg_performance), 2),
+        'average_score': average_score,
+
+        # Time-based data
+        'quarterly_performance': quarters,
+        'monthly_performance': monthly_data,
+        'daily_performance': daily_data,
+        'performance_history': performance_history,
+
+        # Metadata
+        'meta': {
+            'year': year,
+            'last_n_days': last_n_days,
+            'current_quarter': Period.of('quarter').label,
+            'generated_at': datetime.now().isoformat()
+        }
+    }
+
+
 class CombinedPerformanceView(APIView):
     permission_classes = [IsAuthenticated]
     
+    @cached_response(combined_scopes)
     def get(self, request, user_id=None):
         if not user_id:
             user_id = request.user.id
@@ -28,100 +209,12 @@ class CombinedPerformanceView(APIView):
         year = int(request.query_params.get('year', datetime.now().year))
         last_n_days = int(request.query_params.get('last_n_days', 30))
 
-        # ===== 1. Fuel Performance Data =====
-        # Average performance
-        avg_performance = FuelSales.objects.filter(user_id=user_id).aggregate(
-            avg_performance=Avg('performance')
-        )['avg_performance'] or 0
-
-        # Quarterly breakdown
-        quarters = []
-        for quarter in range(1, 5):
-            start_month = 3 * quarter - 2
-            end_month = 3 * quarter
-            quarterly_avg = FuelSales.objects.filter(
-                Q(user_id=user_id) & 
-                Q(date__year=year) &
-                Q(date__month__gte=start_month) & 
-                Q(date__month__lte=end_month)
-            ).aggregate(avg=Avg('performance'))['avg'] or 0
-            quarters.append({
-                'quarter': f'Q{quarter}',
-                'average': round(float(quarterly_avg), 2)
-            })
-
-        # Monthly data
-        monthly_data = [
-            {
-                'month': datetime(year, item['date__month'], 1).strftime('%b'),
-                'performance': round(float(item['avg_performance'] or 0), 2)
-            }
-            for item in FuelSales.objects.filter(
-                user_id=user_id,
-                date__year=year
-            ).values('date__month').annotate(
-                avg_performance=Avg('performance')
-            ).order_by('date__month')
-        ]
-
-        # Daily data (last N days)
-        date_threshold = datetime.now() - timedelta(days=last_n_days)
-        daily_data = [
-            {
-                'date': item['date'].strftime('%Y-%m-%d'),
-                'day': item['date'].strftime('%a'),
-                'performance': round(float(item['performance'] or 0), 2)
-            }
-            for item in FuelSales.objects.filter(
-                user_id=user_id,
-                date__year=year,
-                date__gte=date_threshold
-            ).values('date').annotate(
-                performance=Avg('performance')
-            ).order_by('date')
-        ]
-
-        # ===== 2. Evaluation Data =====
-        evaluations = AttendantEvaluation.objects.filter(
-            attendant=user_id
-        ).order_by('-weekly_evaluation__date')[:10]  # Last 10 evaluations
-
-        average_score = round(
-            sum(e.percentage_score for e in evaluations) / evaluations.count(), 2
-        ) if evaluations.exists() else 0.0
-
-        performance_history = [
-            {
-                'date': eval.weekly_evaluation.date.strftime('%Y-%m-%d'),
-                'performance': eval.percentage_score
-            }
-            for eval in evaluations
-        ]
-
-        # ===== 3. Final Response =====
-        return Response({
-            # Core metrics
-            'average_performance': round(float(avg_performance), 2),
-            'average_score': average_score,
-            
-            # Time-based data
-            'quarterly_performance': quarters,
-            'monthly_performance': monthly_data,
-            'daily_performance': daily_data,
-            'performance_history': performance_history,
-            
-            # Metadata
-            'meta': {
-                'year': year,
-                'last_n_days': last_n_days,
-                'current_quarter': f"Q{(datetime.now().month-1)//3 + 1}",
-                'generated_at': datetime.now().isoformat()
-            }
-        }, status=status.HTTP_200_OK)        
+        return Response(combined_performance(user_id, year, last_n_days), status=status.HTTP_200_OK)
         
 
 
 class UserPerformanceSummaryFuel(APIView):
+    @cached_response(fuel_user_scopes)
     def get(self, request, user_id=None):
         if not user_id:
             user_id = 3 #request.user.id
@@ -135,46 +228,34 @@ class UserPerformanceSummaryFuel(APIView):
             avg_performance=Avg('performance')
         )['avg_performance'] or 0
 
-        # 2. Quarterly performance breakdown
-        quarters = []
-        for quarter in range(1, 5):
-            start_month = 3 * quarter - 2
-            end_month = 3 * quarter
-            q_filter = Q(user_id=user_id) & Q(
-                date__year=year,
-                date__month__gte=start_month,
-                date__month__lte=end_month
-            )
-            quarterly_avg = FuelSales.objects.filter(q_filter).aggregate(
+        selected_year = Period.year(year)
+        year_sales = FuelSales.objects.filter(selected_year.q('date'), user_id=user_id)
+
+        # 2. Quarterly performance breakdown (one GROUP BY; the year is still a range on the bare column)
+        by_quarter = {
+            item['quarter'] - 1: item['avg']
+            for item in year_sales.values(quarter=ExtractQuarter('date')).annotate(
                 avg=Avg('performance')
-            )['avg'] or 0
-            quarters.append({
-                'quarter': f'Q{quarter}',
-                'average': round(float(quarterly_avg), 2)
-            })
+            ).order_by()
+        }
+        quarters = [{
+            'quarter': quarter.label,
+            'average': round(float(by_quarter.get(index) or 0), 2)
+        } for index, quarter in enumerate(selected_year.buckets('quarter'))]
 
         # 3. Monthly performance for graphing
-        monthly_performance = FuelSales.objects.filter(
-            user_id=user_id,
-            date__year=year
-        ).values('date__month').annotate(
+        month_periods = selected_year.buckets('month')
+        monthly_performance = year_sales.values(month=ExtractMonth('date')).annotate(
             avg_performance=Avg('performance')
-        ).order_by('date__month')
+        ).order_by('month')
 
         monthly_data = [{
-            'month': datetime(year, item['date__month'], 1).strftime('%b'),
+            'month': month_periods[item['month'] - 1].label,
             'performance': round(float(item['avg_performance'] or 0), 2)
         } for item in monthly_performance]
-  
-         # Calculate the date threshold
-        date_threshold = datetime.now() - timedelta(days=last_n_days)
-
-        # Filter by year and last N days
-        daily_performance = FuelSales.objects.filter(
-            user_id=user_id,
-            date__year=year,                # Filter by selected year
-            # date__gte=date_threshold        # Additionally filter by date range
-        ).values('date').annotate(
+
+        # Daily performance over the selected year (the last_n_days window is not applied here)
+        daily_performance = year_sales.values('date').annotate(
             performance=Avg('performance')  # Or any relevant field
         ).order_by('date')
 
@@ -199,109 +280,184 @@ class UserPerformanceSummaryFuel(APIView):
 class EvaluationSummaryView(APIView):
     permission_classes = [IsAuthenticated]
 
+    @cached_response(evaluation_scopes)
     def get(self, request, user_id=None):
         if not user_id:
             user_id = request.user.id
 
-        # Get current date and determine current quarter
-        today = date.today()
-        current_month = today.month
-
-        if current_month in [1, 2, 3]:
-            quarter_start = date(today.year, 1, 1)
-            quarter_end = date(today.year, 3, 31)
-        elif current_month in [4, 5, 6]:
-            quarter_start = date(today.year, 4, 1)
-            quarter_end = date(today.year, 6, 30)
-        elif current_month in [7, 8, 9]:
-            quarter_start = date(today.year, 7, 1)
-            quarter_end = date(today.year, 9, 30)
-        else:
-            quarter_start = date(today.year, 10, 1)
-            quarter_end = date(today.year, 12, 31)
-
-        # Fetch evaluations for this user in the current quarter
-        evaluations = AttendantEvaluation.objects.filter(
-            attendant=user_id,
-            weekly_evaluation__date__range=[quarter_start, quarter_end]
-        ).order_by('-weekly_evaluation__date')
-
-        # Calculate average score
-        if evaluations.exists():
-            total_score = sum([e.percentage_score for e in evaluations])
-            average_score = round(total_score / evaluations.count(), 2)
-        else:
-            average_score = 0.0
+        # one lookup on the employee's scorecard for the current quarter (see employee/scorecards.py)
+        return Response(scorecard_summary('evaluation', user_id, date.today()))
 
-        # Get last 10 evaluations
-        last_10 = evaluations[:10]
-        performance_history = [
-            {'date': eval.weekly_evaluation.date, 'score': eval.percentage_score}
-            for eval in last_10
-        ]
 
-        return Response({
-            'qtr_score': average_score,
-            'score_history': performance_history
-        })
-        
-        
 class AttendanceSummaryView(APIView):
     permission_classes = [IsAuthenticated]
 
+    @cached_response(attendance_scopes)
     def get(self, request, user_id=None):
         if not user_id:
             user_id = request.user.id
 
-        # Determine current quarter
-        today = date.today()
-        current_month = today.month
-
-        if current_month in [1, 2, 3]:
-            quarter_start = date(today.year, 1, 1)
-            quarter_end = date(today.year, 3, 31)
-        elif current_month in [4, 5, 6]:
-            quarter_start = date(today.year, 4, 1)
-            quarter_end = date(today.year, 6, 30)
-        elif current_month in [7, 8, 9]:
-            quarter_start = date(today.year, 7, 1)
-            quarter_end = date(today.year, 9, 30)
-        else:
-            quarter_start = date(today.year, 10, 1)
-            quarter_end = date(today.year, 12, 31)
-
-        # Fetch attendance records for this user in the current quarter
-        attendance_records = AttendanceRegister.objects.filter(
-            attendant_id=user_id,
-            attendance_date__date__range=[quarter_start, quarter_end]
-        ).order_by('-attendance_date__date')
-
-        # Calculate average attendance score
-        if attendance_records.exists():
-            total_score = sum([record.percentage_mark for record in attendance_records])
-            average_score = round(total_score / attendance_records.count(), 2)
+        return Response(scorecard_summary('attendance', user_id, date.today()), status=status.HTTP_200_OK)
+
+
+def _monthly_totals(rollups, site, year, total):
+    """{month: total sales} for one site/year in a single GROUP BY over the daily rollups"""
+    selected_year = Period.year(year)
+    return {
+        row['month']: row['total']
+        for row in rollups.objects.filter(selected_year.q('day'), site=site)
+        .values(month=ExtractMonth('day')).annotate(total=total).order_by()
+    }
+
+
+def _captain_totals(rollups, site, year, month, total):
+    """{captain_id: total sales} for one site/month in a single GROUP BY"""
+    return {
+        row['captain']: row['total']
+        for row in rollups.objects.filter(Period.month(year, month).q('day'), site=site)
+        .values('captain').annotate(total=total).order_by()
+    }
+
+
+def _add_growth(monthly_summary):
+    """Month-on-month growth, in place"""
+    for i in range(1, len(monthly_summary)):
+        prev_sales = monthly_summary[i - 1]['sales']
+        curr_sales = monthly_summary[i]['sales']
+
+        if prev_sales > 0:
+            growth = (curr_sales - prev_sales) / prev_sales
         else:
-            average_score = 0.0
+            growth = 0
+
+        monthly_summary[i]['growth'] = round(growth, 2)
+
+
+def fuel_sales_summary(site, year, month):
+    """Site fuel dashboard: current month, per-captain and 12-month summary (fixed query count)"""
+    # Daily site target (sum of all pump targets), fetched once
+    pump_daily_target = PumpTarget.objects.filter(site=site).aggregate(total_target=Sum('target'))['total_target'] or 0
+    monthly_target = pump_daily_target * monthrange(year, month)[1]
+
+    # 1. Month totals for the whole year (includes the current month)
+    month_totals = _monthly_totals(FuelSalesDaily, site, year, FUEL_TOTAL)
+    raw_score = month_totals.get(month) or 0
+    current_performance = (raw_score / int(monthly_target)) * 100 if monthly_target > 0 else 0
+
+    # 2. Performance per captain (only customer_champion at user's site)
+    captain_totals = _captain_totals(FuelSalesDaily, site, year, month, FUEL_TOTAL)
+    captains = Captain.objects.filter(
+        site=site,
+        user__employee_profile__job_description__iexact='customer_champion'
+    ).select_related('user__employee_profile')
+
+    captain_data = []
+    for captain in captains:
+        captain_raw_score = captain_totals.get(captain.id) or 0
+        captain_performance = (captain_raw_score / Decimal(monthly_target / 2)) * 100 if monthly_target > 0 else 0
+
+        captain_data.append({
+            'captain': captain.user.employee_profile.name,
+            'raw_score': captain_raw_score,
+            'target': monthly_target,
+            'performance': round(captain_performance, 2)
+        })
 
-        # Get last 10 attendance records
-        last_10 = attendance_records[:10]
-        attendance_history = [
-            {'date': record.attendance_date.date, 'score': record.percentage_mark}
-            for record in last_10
-        ]
+    # 3. Monthly summary for the selected year
+    monthly_summary = []
+    for m in range(1, 13):
+        month_raw_score = month_totals.get(m) or 0
+        month_target = pump_daily_target * monthrange(year, m)[1]
+        month_performance = (month_raw_score / Decimal(monthly_target)) * 100 if month_target > 0 else 0
+
+        monthly_summary.append({
+            'month': date(1900, m, 1).strftime('%b'),  # Jan, Feb, etc.
+            'sales': month_raw_score,
+            'target': month_target,
+            'percentage': round(month_performance, 2),
+            'growth': 0  # We will calculate growth next
+        })
 
-        return Response({
-            'qtr_score': average_score,
-            'score_history': attendance_history
-        }, status=status.HTTP_200_OK)
+    _add_growth(monthly_summary)
+
+    return {
+        'current_performance': {
+            'raw_score': raw_score,
+            'target': monthly_target,
+            'performance': round(current_performance, 2)
+        },
+        'captain_performance': captain_data,
+        'monthly_summary': monthly_summary
+    }
+
+
+def shop_sales_summary(site, year, month):
+    """Site shop dashboard: current month, per-captain and 12-month summary (fixed query count)"""
+    # Daily site target, fetched once
+    shop_daily_target = ShopTarget.objects.filter(site=site).values_list('target', flat=True).first()
+    if shop_daily_target is not None:
+        monthly_target = shop_daily_target * 30
+    else:
+        monthly_target = 13500 * 30
+
+    # 1. Month totals for the whole year (includes the current month)
+    month_totals = _monthly_totals(ShopSalesDaily, site, year, Sum('sales'))
+    raw_score = month_totals.get(month) or 0
+    current_performance = (raw_score / Decimal(monthly_target)) * 100 if monthly_target > 0 else 0
+
+    # 2. Performance per captain (only service_champion at user's site)
+    captain_totals = _captain_totals(ShopSalesDaily, site, year, month, Sum('sales'))
+    captains = Captain.objects.filter(
+        site=site,
+        user__employee_profile__job_description__iexact='service_champion'
+    ).select_related('user__employee_profile')
+
+    captain_data = []
+    for captain in captains:
+        captain_raw_score = captain_totals.get(captain.id) or 0
+        captain_performance = (captain_raw_score / Decimal(monthly_target/2)) * 100 if monthly_target > 0 else 0
+
+        captain_data.append({
+            'captain': captain.user.employee_profile.name,
+            'raw_score': captain_raw_score,
+            'target': monthly_target/2,
+            'performance': round(captain_performance, 2)
+        })
+
+    # 3. Monthly summary for the selected year
+    monthly_summary = []
+    for m in range(1, 13):
+        month_raw_score = month_totals.get(m) or 0
+        month_target = shop_daily_target * 30 if shop_daily_target is not None else 0
+        month_performance = (month_raw_score / Decimal(month_target)) * 100 if month_target > 0 else 0
+
+        monthly_summary.append({
+            'month': date(1900, m, 1).strftime('%b'),  # Jan, Feb, etc.
+            'sales': month_raw_score,
+            'target': month_target,
+            'percentage': round(month_performance, 2),
+            'growth': 0  # We will calculate growth next
+        })
+
+    _add_growth(monthly_summary)
+
+    return {
+        'current_performance': {
+            'raw_score': raw_score,
+            'target': monthly_target,
+            'performance': round(current_performance, 2)
+        },
+        'captain_performance': captain_data,
+        'monthly_summary': monthly_summary
+    }
 
 
 class FuelSalesSummaryView(APIView):
     permission_classes = [IsAuthenticated]
 
+    @cached_response(fuel_site_scopes)
     def get(self, request):
         user = request.user
-        print(user)
         site = user.employee_profile.site if hasattr(user, 'employee_profile') else None
 
         if not site:
@@ -309,84 +465,9 @@ class FuelSalesSummaryView(APIView):
 
         # Get the year from query params, default to current year
         year = int(request.query_params.get('year', now().year))
-        today = now().date()
-        month = today.month
-
-        # 1. Get all fuel sales for the user's site in the current month
-        fuel_sales = FuelSales.objects.filter(date__year=year, date__month=month, user__employee_profile__site=site)
-
-        # Sum of total sales for the current month
-        raw_score = sum(sale.pms_sales + sale.dx_sales + sale.vp_sales for sale in fuel_sales)
-
-        # Get monthly target for the user's site: sum of all pump targets * number of days in the month
-        pump_daily_target = PumpTarget.objects.filter(site=site).aggregate(total_target=Sum('target'))['total_target'] or 0
-        days_in_month = monthrange(year, month)[1]
-        monthly_target = pump_daily_target * days_in_month
+        month = now().date().month
 
-        current_performance = (raw_score / int(monthly_target)) * 100 if monthly_target > 0 else 0
-
-        # 2. Performance per captain (only customer_champion at user's site)
-        captain_data = []
-        
-        captains = Captain.objects.filter(
-            site=site,
-            user__employee_profile__job_description__iexact='customer_champion'
-        )
-        print(captains)
-        
-        for captain in captains:
-            captain_sales = fuel_sales.filter(captain=captain)
-            captain_raw_score = sum(sale.pms_sales + sale.dx_sales + sale.vp_sales for sale in captain_sales)
-            captain_performance = (captain_raw_score / Decimal(monthly_target / 2)) * 100 if monthly_target > 0 else 0
-
-            captain_data.append({
-                'captain': captain.user.employee_profile.name,
-                'raw_score': captain_raw_score,
-                'target': monthly_target,
-                'performance': round(captain_performance, 2)
-            })
-
-        # 3. Monthly summary for the selected year
-        monthly_summary = []
-        for m in range(1, 13):
-            month_sales = FuelSales.objects.filter(date__year=year, date__month=m,  user__employee_profile__site=site)
-            month_raw_score = sum(sale.pms_sales + sale.dx_sales + sale.vp_sales for sale in month_sales)
-
-            pump_target = PumpTarget.objects.filter(site=site).aggregate(total_target=Sum('target'))['total_target'] or 0
-            days_in_month = monthrange(year, m)[1]
-            month_target = pump_target * days_in_month
-
-            month_performance = (month_raw_score / Decimal(monthly_target)) * 100 if month_target > 0 else 0
-
-            monthly_summary.append({
-                'month': date(1900, m, 1).strftime('%b'),  # Jan, Feb, etc.
-                'sales': month_raw_score,
-                'target': month_target,
-                'percentage': round(month_performance, 2),
-                'growth': 0  # We will calculate growth next
-            })
-
-        # Calculate growth per month
-        for i in range(1, len(monthly_summary)):
-            prev_sales = monthly_summary[i - 1]['sales']
-            curr_sales = monthly_summary[i]['sales']
-
-            if prev_sales > 0:
-                growth = (curr_sales - prev_sales) / prev_sales
-            else:
-                growth = 0
-
-            monthly_summary[i]['growth'] = round(growth, 2)
-
-        return Response({
-            'current_performance': {
-                'raw_score': raw_score,
-                'target': monthly_target,
-                'performance': round(current_performance, 2)
-            },
-            'captain_performance': captain_data,
-            'monthly_summary': monthly_summary
-        })
+        return Response(fuel_sales_summary(site, year, month))
 
 
 
@@ -395,6 +476,7 @@ class FuelSalesSummaryView(APIView):
 class ShopSalesSummaryView(APIView):
     permission_classes = [IsAuthenticated]
 
+    @cached_response(shop_site_scopes)
     def get(self, request):
         user = request.user
         site = user.employee_profile.site if hasattr(user, 'employee_profile') else None
@@ -404,87 +486,50 @@ class ShopSalesSummaryView(APIView):
 
         # Get the year from query params, default to current year
         year = int(request.query_params.get('year', now().year))
-        today = now().date()
-        month = today.month
+        month = now().date().month
 
-        # 1. Get all shop sales for the user's site in the current month
-        shop_sales = ShopSales.objects.filter(date__year=year, date__month=month, user__employee_profile__site=site)
+        return Response(shop_sales_summary(site, year, month))
 
-        # Sum of total sales for the current month
-        raw_score = sum(sale.sales for sale in shop_sales)
 
-        # Get monthly target for the user's site
-        try:
-            shop_target = ShopTarget.objects.get(site=site)
-            monthly_target = shop_target.target * 30
-        except ShopTarget.DoesNotExist:
-            monthly_target = 13500 * 30
 
-        current_performance = (raw_score / Decimal(monthly_target)) * 100 if monthly_target > 0 else 0
+class LeaderboardView(APIView):
+    """
+    Site attendants ranked on fuel/shop performance, evaluation and attendance.
 
-        # 2. Performance per captain (only customer_champion at user's site)
-        captain_data = []
-        
-        captains = Captain.objects.filter(
-            site=site,
-            user__employee_profile__job_description__iexact='service_champion'
-        )
-        
-        captain_target = monthly_target / len(captains)
-        for captain in captains:
-            captain_sales = shop_sales.filter(captain=captain)
-            captain_raw_score = sum(sale.sales for sale in captain_sales)
-            captain_performance = (captain_raw_score / Decimal(monthly_target/2)) * 100 if monthly_target > 0 else 0
-
-            captain_data.append({
-                'captain': captain.user.employee_profile.name,
-                'raw_score': captain_raw_score,
-                'target': monthly_target/2,
-                'performance': round(captain_performance, 2)
-            })
-
-        # 3. Monthly summary for the selected year
-        monthly_summary = []
-        for m in range(1, 13):
-            month_sales = ShopSales.objects.filter(date__year=year, date__month=m, user__employee_profile__site=site)
-            month_raw_score = sum(sale.sales for sale in month_sales)
-
-            try:
-                shop_target = ShopTarget.objects.get(site=site)
-                days_in_month = monthrange(year, m)[1]
-                month_target = shop_target.target * 30
-              
-            except ShopTarget.DoesNotExist:
-                month_target = 0
-
-            month_performance = (month_raw_score / Decimal(month_target)) * 100 if month_target > 0 else 0
-
-            monthly_summary.append({
-                'month': date(1900, m, 1).strftime('%b'),  # Jan, Feb, etc.
-                'sales': month_raw_score,
-                'target': month_target,
-                'percentage': round(month_performance, 2),
-                'growth': 0  # We will calculate growth next
-            })
-
-        # Calculate growth per month
-        for i in range(1, len(monthly_summary)):
-            prev_sales = monthly_summary[i - 1]['sales']
-            curr_sales = monthly_summary[i]['sales']
-
-            if prev_sales > 0:
-                growth = (curr_sales - prev_sales) / prev_sales
+    Query params: site (default: the user's site), period (day/week/month/quarter/year,
+    default month) containing date (YYYY-MM-DD, default today) or an explicit
+    start/end range, order_by (fuel/shop/evaluation/attendance) and limit (1-100).
+    """
+    permission_classes = [IsAuthenticated]
+
+    @cached_response(leaderboard_scopes)
+    def get(self, request):
+        params = request.query_params
+        site = _leaderboard_site(request)
+        if site not in dict(SITE_CHOICES):
+            return Response({'detail': 'Unknown or missing site.'}, status=status.HTTP_400_BAD_REQUEST)
+
+        unit = params.get('period', 'month')
+        order_by = params.get('order_by', 'fuel')
+        if unit not in UNITS or order_by not in METRICS:
+            return Response({'detail': f'period must be one of {", ".join(UNITS)}; '
+                                       f'order_by one of {", ".join(METRICS)}.'}, status=status.HTTP_400_BAD_REQUEST)
+
+        try:
+            limit = min(max(int(params.get('limit', 10)), 1), 100)
+            if params.get('start') or params.get('end'):
+                period = Period.custom(date.fromisoformat(params['start']), date.fromisoformat(params['end']))
             else:
-                growth = 0
+                period = Period.of(unit, date.fromisoformat(params['date']) if params.get('date') else date.today())
+        except (KeyError, ValueError) as e:
+            return Response({'detail': f'Invalid leaderboard parameters: {e}'}, status=status.HTTP_400_BAD_REQUEST)
 
-            monthly_summary[i]['growth'] = round(growth, 2)
+        return Response(site_leaderboard(site, period, order_by, limit))
 
-        return Response({
-            'current_performance': {
-                'raw_score': raw_score,
-                'target': monthly_target,
-                'performance': round(current_performance, 2)
-            },
-            'captain_performance': captain_data,
-            'monthly_summary': monthly_summary
-        })
\ No newline at end of file
+
+class CacheStatsView(APIView):
+    """Hit/miss counters of this worker's in-process caches and summary response cache"""
+    permission_classes = [IsAdminUser]
+
+    def get(self, request):
+        return Response({'local': local_cache_stats(), 'responses': response_cache_stats()})